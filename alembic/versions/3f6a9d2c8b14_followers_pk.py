@@ -0,0 +1,47 @@
+"""followers pk
+
+Revision ID: 3f6a9d2c8b14
+Revises: f3b7d1e9a2c5
+Create Date: 2026-10-18 14:12:07.530941
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f6a9d2c8b14'
+down_revision: Union[str, None] = 'f3b7d1e9a2c5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        'DELETE FROM followers '
+        'WHERE user_id IS NULL OR following_id IS NULL'
+    )
+    op.execute(
+        'DELETE FROM followers AS duplicate USING followers AS kept '
+        'WHERE duplicate.user_id = kept.user_id '
+        'AND duplicate.following_id = kept.following_id '
+        'AND duplicate.ctid > kept.ctid'
+    )
+    op.alter_column('followers', 'user_id', existing_type=sa.Integer(), nullable=False)
+    op.alter_column('followers', 'following_id', existing_type=sa.Integer(), nullable=False)
+    op.create_primary_key('followers_pkey', 'followers', ['user_id', 'following_id'])
+    op.create_index(
+        'ix_followers_following_id_user_id',
+        'followers',
+        ['following_id', 'user_id'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_followers_following_id_user_id', table_name='followers')
+    op.drop_constraint('followers_pkey', 'followers', type_='primary')
+    op.alter_column('followers', 'following_id', existing_type=sa.Integer(), nullable=True)
+    op.alter_column('followers', 'user_id', existing_type=sa.Integer(), nullable=True)
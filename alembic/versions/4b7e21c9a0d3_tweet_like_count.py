@@ -0,0 +1,41 @@
+"""tweet like count
+
+Revision ID: 4b7e21c9a0d3
+Revises: de13035b9cfd
+Create Date: 2026-10-18 10:12:31.402114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b7e21c9a0d3'
+down_revision: Union[str, None] = 'de13035b9cfd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'tweet',
+        sa.Column('like_count', sa.Integer(), server_default='0', nullable=False),
+    )
+    op.execute(
+        'UPDATE tweet SET like_count = likes.total '
+        'FROM (SELECT tweet_id, count(*) AS total FROM likes_table GROUP BY tweet_id) AS likes '
+        'WHERE tweet.id = likes.tweet_id'
+    )
+    op.create_index(
+        'ix_tweet_like_count_id',
+        'tweet',
+        [sa.text('like_count DESC'), sa.text('id DESC')],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tweet_like_count_id', table_name='tweet')
+    op.drop_column('tweet', 'like_count')
@@ -0,0 +1,53 @@
+"""follow suggestion
+
+Revision ID: 7d2e5b9a1c63
+Revises: 3f6a9d2c8b14
+Create Date: 2026-10-18 15:02:41.274318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d2e5b9a1c63'
+down_revision: Union[str, None] = '3f6a9d2c8b14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'user',
+        sa.Column('suggestions_refreshed_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index(
+        'ix_user_suggestions_refreshed_at',
+        'user',
+        [sa.text('suggestions_refreshed_at ASC NULLS FIRST'), 'id'],
+        unique=False,
+    )
+    op.create_table('follow_suggestion',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('suggested_id', sa.Integer(), nullable=False),
+    sa.Column('mutual_count', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['suggested_id'], ['user.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'suggested_id')
+    )
+    op.create_index(
+        'ix_follow_suggestion_user_id_score',
+        'follow_suggestion',
+        ['user_id', sa.text('score DESC')],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_follow_suggestion_user_id_score', table_name='follow_suggestion')
+    op.drop_table('follow_suggestion')
+    op.drop_index('ix_user_suggestions_refreshed_at', table_name='user')
+    op.drop_column('user', 'suggestions_refreshed_at')
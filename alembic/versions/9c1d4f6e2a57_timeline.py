@@ -0,0 +1,55 @@
+"""timeline
+
+Revision ID: 9c1d4f6e2a57
+Revises: 4b7e21c9a0d3
+Create Date: 2026-10-18 11:03:54.118620
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c1d4f6e2a57'
+down_revision: Union[str, None] = '4b7e21c9a0d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'tweet',
+        sa.Column('fanout_on_read', sa.Boolean(), server_default=sa.false(), nullable=False),
+    )
+    op.create_index(
+        'ix_tweet_fanout_on_read',
+        'tweet',
+        [sa.text('id DESC')],
+        unique=False,
+        postgresql_where=sa.text('fanout_on_read'),
+    )
+    op.create_table('timeline',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('tweet_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['tweet_id'], ['tweet.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'tweet_id')
+    )
+    op.create_index(
+        'ix_timeline_user_id_score',
+        'timeline',
+        ['user_id', sa.text('score DESC'), sa.text('tweet_id DESC')],
+        unique=False,
+    )
+    op.create_index('ix_timeline_tweet_id', 'timeline', ['tweet_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_timeline_tweet_id', table_name='timeline')
+    op.drop_index('ix_timeline_user_id_score', table_name='timeline')
+    op.drop_table('timeline')
+    op.drop_index('ix_tweet_fanout_on_read', table_name='tweet')
+    op.drop_column('tweet', 'fanout_on_read')
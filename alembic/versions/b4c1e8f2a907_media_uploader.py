@@ -0,0 +1,35 @@
+"""media uploader
+
+Revision ID: b4c1e8f2a907
+Revises: 7d2e5b9a1c63
+Create Date: 2026-10-18 17:21:09.513804
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4c1e8f2a907'
+down_revision: Union[str, None] = '7d2e5b9a1c63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('media', sa.Column('uploader_id', sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        'media_uploader_id_fkey',
+        'media',
+        'user',
+        ['uploader_id'],
+        ['id'],
+        ondelete='CASCADE',
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('media_uploader_id_fkey', 'media', type_='foreignkey')
+    op.drop_column('media', 'uploader_id')
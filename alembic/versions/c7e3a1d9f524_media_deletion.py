@@ -0,0 +1,40 @@
+"""media deletion
+
+Revision ID: c7e3a1d9f524
+Revises: b4c1e8f2a907
+Create Date: 2026-10-18 19:04:52.860137
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e3a1d9f524'
+down_revision: Union[str, None] = 'b4c1e8f2a907'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('media_deletion',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('media_path', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_media_deletion_next_attempt_at',
+        'media_deletion',
+        ['next_attempt_at'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_media_deletion_next_attempt_at', table_name='media_deletion')
+    op.drop_table('media_deletion')
@@ -0,0 +1,46 @@
+"""timeline seed
+
+Revision ID: d2f6a8c4e1b3
+Revises: 9c1d4f6e2a57
+Create Date: 2026-10-18 21:37:15.402918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2f6a8c4e1b3'
+down_revision: Union[str, None] = '9c1d4f6e2a57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# settings.timeline_max_length на момент миграции
+TIMELINE_MAX_LENGTH: int = 800
+
+
+def upgrade() -> None:
+    # Ленты существующих подписок: свои твиты пользователя и твиты авторов,
+    # на которых он подписан, не больше TIMELINE_MAX_LENGTH последних.
+    op.execute(
+        'INSERT INTO timeline (user_id, tweet_id, score) '
+        'SELECT user_id, tweet_id, tweet_id FROM ('
+        'SELECT readers.user_id, tweet.id AS tweet_id, '
+        'row_number() OVER (PARTITION BY readers.user_id ORDER BY tweet.id DESC) AS position '
+        'FROM ('
+        'SELECT id AS user_id, id AS owner_id FROM "user" '
+        'UNION SELECT user_id, following_id FROM followers'
+        ') AS readers '
+        'JOIN tweet ON tweet.owner_id = readers.owner_id '
+        'WHERE NOT tweet.fanout_on_read OR readers.user_id = readers.owner_id'
+        ') AS entries '
+        'WHERE position <= {limit} '
+        'ON CONFLICT DO NOTHING'.format(limit=TIMELINE_MAX_LENGTH)
+    )
+
+
+def downgrade() -> None:
+    # Записи лент после миграции не отличить от созданных приложением,
+    # поэтому они не удаляются.
+    pass
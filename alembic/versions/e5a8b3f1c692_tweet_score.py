@@ -0,0 +1,67 @@
+"""tweet score
+
+Existing tweets have no creation time. It is estimated from id order,
+spread evenly between the first user registration and the migration,
+so historical tweets keep their relative order and do not all rank as
+brand new.
+
+Revision ID: e5a8b3f1c692
+Revises: d2f6a8c4e1b3
+Create Date: 2026-10-18 12:40:07.553931
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a8b3f1c692'
+down_revision: Union[str, None] = 'd2f6a8c4e1b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'tweet',
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    )
+    op.execute(
+        'UPDATE tweet SET created_at = bounds.first_at + (LOCALTIMESTAMP - bounds.first_at) '
+        '* ((tweet.id - bounds.min_id)::float / greatest(bounds.max_id - bounds.min_id, 1)) '
+        'FROM (SELECT coalesce((SELECT min(registered_at) FROM "user"), LOCALTIMESTAMP) AS first_at, '
+        'min(id) AS min_id, max(id) AS max_id FROM tweet) AS bounds'
+    )
+    op.add_column(
+        'tweet',
+        sa.Column('score', sa.Float(), server_default='0', nullable=False),
+    )
+    # existing tweets are marked dirty so the ranking task scores them
+    op.add_column(
+        'tweet',
+        sa.Column('score_dirty', sa.Boolean(), server_default=sa.true(), nullable=False),
+    )
+    op.alter_column('tweet', 'score_dirty', server_default=sa.false())
+    op.create_index(
+        'ix_tweet_score_id',
+        'tweet',
+        [sa.text('score DESC'), sa.text('id DESC')],
+        unique=False,
+    )
+    op.create_index(
+        'ix_tweet_score_dirty',
+        'tweet',
+        ['id'],
+        unique=False,
+        postgresql_where=sa.text('score_dirty'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tweet_score_dirty', table_name='tweet')
+    op.drop_index('ix_tweet_score_id', table_name='tweet')
+    op.drop_column('tweet', 'score_dirty')
+    op.drop_column('tweet', 'score')
+    op.drop_column('tweet', 'created_at')
@@ -0,0 +1,33 @@
+"""drop like count index
+
+Revision ID: f3b7d1e9a2c5
+Revises: e5a8b3f1c692
+Create Date: 2026-10-18 22:14:08.631470
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b7d1e9a2c5'
+down_revision: Union[str, None] = 'e5a8b3f1c692'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Лента сортируется по рейтингу (ix_tweet_score_id), индекс по лайкам
+    # больше не читается, но обновляется при каждом лайке.
+    op.drop_index('ix_tweet_like_count_id', table_name='tweet')
+
+
+def downgrade() -> None:
+    op.create_index(
+        'ix_tweet_like_count_id',
+        'tweet',
+        [sa.text('like_count DESC'), sa.text('id DESC')],
+        unique=False,
+    )
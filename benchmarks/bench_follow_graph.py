@@ -0,0 +1,111 @@
+"""
+Бенчмарк индекса графа подписок в памяти.
+
+Создает степенной граф подписок (как bench_suggestions), загружает его
+в FollowGraph и сравнивает занятую память с загрузкой тех же подписок
+через ORM объекты User со списками all_followers/all_following. Также
+замеряет скорость чтения счетчика и первой страницы подписчиков
+по индексу, как при открытии профиля. После замера удаляет созданные
+данные. Нужна база с примененными миграциями.
+
+Запуск:
+    python -m benchmarks.bench_follow_graph --users 100000 --degree 20
+"""
+import argparse
+import asyncio
+import random
+import tracemalloc
+from time import perf_counter
+from typing import Any
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import selectinload
+
+from benchmarks.bench_suggestions import create_graph, drop_graph
+from src.auth.graph import FollowGraph
+from src.auth.models import User
+from src.config import get_settings
+
+MIB: int = 1024 * 1024
+
+
+async def bench(dsn: str, users: int, degree: int, max_degree: int, lookups: int) -> None:
+    engine: Any = create_async_engine(dsn)
+    session_maker: async_sessionmaker = async_sessionmaker(
+        engine, expire_on_commit=False, class_=AsyncSession,
+    )
+    async with session_maker() as session:
+        first_id, last_id = await create_graph(session, users, degree, max_degree)
+        edges: int = await session.scalar(text('SELECT count(*) FROM followers'))
+        print('graph: {users} users, {edges} follows'.format(users=users, edges=edges))
+
+        graph: FollowGraph = FollowGraph()
+        tracemalloc.start()
+        started: float = perf_counter()
+        await graph.load(session=session)
+        elapsed: float = perf_counter() - started
+        graph_bytes: int = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(
+            'FollowGraph: loaded in {elapsed:.2f}s, arrays {arrays:.1f} MiB, '
+            'retained {retained:.1f} MiB'.format(
+                elapsed=elapsed,
+                arrays=graph.memory_bytes() / MIB,
+                retained=graph_bytes / MIB,
+            ),
+        )
+
+        user_ids: list = [random.randint(first_id, last_id) for _ in range(lookups)]
+        started = perf_counter()
+        for user_id in user_ids:
+            graph.followers.count(user_id)
+            graph.followers.page(user_id, after=None, limit=50)
+        elapsed = perf_counter() - started
+        print('FollowGraph: {rate:,.0f} profile reads/s'.format(rate=lookups / elapsed))
+
+    async with session_maker() as session:
+        tracemalloc.start()
+        started = perf_counter()
+        orm_users: list = list(await session.scalars(
+            select(User).
+            where(User.id.between(first_id, last_id)).
+            options(
+                selectinload(User.all_followers),
+                selectinload(User.all_following),
+            ),
+        ))
+        elapsed = perf_counter() - started
+        orm_bytes: int = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(
+            'ORM User: loaded {count} users in {elapsed:.2f}s, '
+            'retained {retained:.1f} MiB ({ratio:.0f}x FollowGraph)'.format(
+                count=len(orm_users),
+                elapsed=elapsed,
+                retained=orm_bytes / MIB,
+                ratio=orm_bytes / graph_bytes,
+            ),
+        )
+        del orm_users
+
+    async with session_maker() as session:
+        await drop_graph(session, first_id, last_id)
+    await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--degree', type=int, default=20, help='среднее количество подписок')
+    parser.add_argument('--max-degree', type=int, default=5000)
+    parser.add_argument('--lookups', type=int, default=1_000_000)
+    parser.add_argument('--dsn', default=None, help='SQLAlchemy URL, по умолчанию из .env')
+    args = parser.parse_args()
+    asyncio.run(bench(
+        dsn=args.dsn or get_settings().db_url,
+        users=args.users,
+        degree=args.degree,
+        max_degree=args.max_degree,
+        lookups=args.lookups,
+    ))
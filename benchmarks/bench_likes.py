@@ -0,0 +1,162 @@
+"""
+Бенчмарк лайка и отмены лайка популярного твита.
+
+Создает твит с N лайками и замеряет пары "лайк + отмена лайка" от
+другого пользователя двумя способами:
+
+* orm - проверка существования твита через ORM объект Tweet с загрузкой
+  users_likes и tweet_media_ids (как было до перехода на Core), затем
+  отдельные INSERT/DELETE и UPDATE счетчика;
+* core - add_new_like и delete_like: один запрос на каждое действие.
+
+После замера удаляет созданные данные. Нужна база с примененными
+миграциями.
+
+Запуск:
+    python -m benchmarks.bench_likes --likes 10000
+"""
+import argparse
+import asyncio
+from time import perf_counter
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import and_, delete, insert, select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import selectinload
+
+from src.auth.models import User
+from src.config import get_settings
+from src.tweet.crud import add_new_like, delete_like
+from src.tweet.models import Tweet, likes_table
+
+EMAIL_PATTERN: str = 'bench_likes_%@bench.local'
+
+
+async def orm_like(tweet_id: int, user_id: int, session: AsyncSession) -> None:
+    exist_tweet: Any = await session.scalar(
+        select(Tweet).
+        where(Tweet.id == tweet_id).
+        options(selectinload(Tweet.users_likes), selectinload(Tweet.tweet_media_ids)).
+        execution_options(populate_existing=True),
+    )
+    if exist_tweet.owner_id != user_id:
+        added: Any = await session.scalar(
+            pg_insert(likes_table).
+            values(tweet_id=tweet_id, user_id=user_id).
+            on_conflict_do_nothing().
+            returning(likes_table.c.tweet_id),
+        )
+        if added:
+            await session.execute(
+                update(Tweet).
+                where(Tweet.id == tweet_id).
+                values(like_count=Tweet.like_count + 1, score_dirty=True),
+            )
+        await session.commit()
+
+
+async def orm_unlike(tweet_id: int, user_id: int, session: AsyncSession) -> None:
+    await session.scalar(
+        select(Tweet).
+        where(Tweet.id == tweet_id).
+        options(selectinload(Tweet.users_likes), selectinload(Tweet.tweet_media_ids)).
+        execution_options(populate_existing=True),
+    )
+    deleted: Any = await session.scalar(
+        likes_table.delete().
+        where(
+            and_(
+                likes_table.c.tweet_id == tweet_id,
+                likes_table.c.user_id == user_id,
+            ),
+        ).
+        returning(likes_table.c.tweet_id),
+    )
+    if deleted:
+        await session.execute(
+            update(Tweet).
+            where(Tweet.id == tweet_id).
+            values(like_count=Tweet.like_count - 1, score_dirty=True),
+        )
+    await session.commit()
+
+
+async def measure(
+    name: str,
+    like: Callable[..., Awaitable[None]],
+    unlike: Callable[..., Awaitable[None]],
+    session: AsyncSession,
+    tweet_id: int,
+    user_id: int,
+    rounds: int,
+) -> None:
+    started: float = perf_counter()
+    for _ in range(rounds):
+        await like(tweet_id=tweet_id, user_id=user_id, session=session)
+        await unlike(tweet_id=tweet_id, user_id=user_id, session=session)
+    elapsed: float = perf_counter() - started
+    print(
+        '{name}: {rate:,.1f} like+unlike/s, {latency:.2f} ms per request'.format(
+            name=name,
+            rate=rounds / elapsed,
+            latency=elapsed / rounds / 2 * 1000,
+        ),
+    )
+
+
+async def bench(dsn: str, likes: int, rounds: int) -> None:
+    engine: Any = create_async_engine(dsn)
+    session_maker: async_sessionmaker = async_sessionmaker(
+        engine, expire_on_commit=False, class_=AsyncSession,
+    )
+    async with session_maker() as session:
+        await session.execute(
+            text(
+                'INSERT INTO "user" (name, email, password, registered_at) '
+                "SELECT 'bench', 'bench_likes_' || i || '@bench.local', '-', now() "
+                'FROM generate_series(0, :likes) AS i',
+            ),
+            {'likes': likes + 1},
+        )
+        first_id, last_id = (await session.execute(
+            text('SELECT min(id), max(id) FROM "user" WHERE email LIKE :pattern'),
+            {'pattern': EMAIL_PATTERN},
+        )).one()
+        tweet_id: int = await session.scalar(
+            insert(Tweet).
+            values(tweet_data='bench', owner_id=first_id, like_count=likes).
+            returning(Tweet.id),
+        )
+        await session.execute(
+            text(
+                'INSERT INTO likes_table (tweet_id, user_id) '
+                'SELECT :tweet_id, id FROM "user" '
+                'WHERE id > :first_id AND id < :last_id',
+            ),
+            {'tweet_id': tweet_id, 'first_id': first_id, 'last_id': last_id},
+        )
+        await session.commit()
+        print('tweet {tweet_id} with {likes} likes'.format(tweet_id=tweet_id, likes=likes))
+
+        await measure('orm', orm_like, orm_unlike, session, tweet_id, last_id, rounds)
+        session.expunge_all()
+        await measure('core', add_new_like, delete_like, session, tweet_id, last_id, rounds)
+
+        await session.execute(delete(Tweet).where(Tweet.id == tweet_id))
+        await session.execute(delete(User).where(User.id.between(first_id, last_id)))
+        await session.commit()
+    await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--likes', type=int, default=10_000)
+    parser.add_argument('--rounds', type=int, default=200)
+    parser.add_argument('--dsn', default=None, help='SQLAlchemy URL, по умолчанию из .env')
+    args = parser.parse_args()
+    asyncio.run(bench(
+        dsn=args.dsn or get_settings().db_url,
+        likes=args.likes,
+        rounds=args.rounds,
+    ))
@@ -0,0 +1,75 @@
+"""
+Бенчмарк проверки паролей для разных параметров хэширования.
+
+Для каждой конфигурации хэширует пароль и в одном потоке проверяет его
+в течение заданного времени. Результат - количество проверок в секунду
+на одно ядро; емкость входа примерно равна этому числу, умноженному на
+password_pool_workers. База данных не нужна.
+
+Запуск:
+    python -m benchmarks.bench_password --bcrypt-rounds 10 11 12 13 --argon2
+"""
+import argparse
+from time import perf_counter
+from typing import Any
+
+from passlib.context import CryptContext
+
+from src.auth.utils_user import make_crypt_context
+from src.config import get_settings
+
+PASSWORD: str = 'correct horse battery staple'
+
+
+def bench(name: str, context: CryptContext, duration: float) -> None:
+    hashed_password: str = context.hash(PASSWORD)
+    verified: int = 0
+    started: float = perf_counter()
+    while perf_counter() - started < duration:
+        context.verify(PASSWORD, hashed_password)
+        verified += 1
+    elapsed: float = perf_counter() - started
+    print(
+        '{name:<32} {rate:8.1f} verifications/s per core '
+        '({latency:.1f} ms each)'.format(
+            name=name,
+            rate=verified / elapsed,
+            latency=elapsed / verified * 1000,
+        ),
+    )
+
+
+def main(args: Any) -> None:
+    settings: Any = get_settings()
+    for rounds in args.bcrypt_rounds:
+        bench(
+            name='bcrypt rounds={rounds}'.format(rounds=rounds),
+            context=make_crypt_context(
+                'bcrypt', rounds,
+                settings.password_argon2_time_cost,
+                settings.password_argon2_memory_cost,
+            ),
+            duration=args.duration,
+        )
+    if args.argon2:
+        for time_cost in args.argon2_time_cost:
+            bench(
+                name='argon2 t={time_cost} m={memory}KiB'.format(
+                    time_cost=time_cost, memory=args.argon2_memory_cost,
+                ),
+                context=make_crypt_context(
+                    'argon2', settings.password_bcrypt_rounds,
+                    time_cost, args.argon2_memory_cost,
+                ),
+                duration=args.duration,
+            )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--bcrypt-rounds', type=int, nargs='*', default=[10, 11, 12, 13])
+    parser.add_argument('--argon2', action='store_true', help='нужен пакет argon2-cffi')
+    parser.add_argument('--argon2-time-cost', type=int, nargs='*', default=[1, 2, 3])
+    parser.add_argument('--argon2-memory-cost', type=int, default=get_settings().password_argon2_memory_cost)
+    parser.add_argument('--duration', type=float, default=3)
+    main(parser.parse_args())
@@ -0,0 +1,82 @@
+"""
+Бенчмарк пересчета рейтинга твитов.
+
+Создает тестового автора и N твитов с случайными лайками и временем
+создания, помечает их score_dirty и замеряет скорость recompute_scores.
+После замера удаляет созданные данные. Нужна база с примененными
+миграциями.
+
+Запуск:
+    python -m benchmarks.bench_ranking --tweets 1000000
+"""
+import argparse
+import asyncio
+from time import perf_counter
+from typing import Any
+
+from sqlalchemy import delete, insert, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from src.auth.models import User
+from src.config import get_settings
+from src.tweet.models import Tweet
+from src.tweet.ranking import recompute_scores
+
+
+async def bench(dsn: str, tweets: int, batch_size: int) -> None:
+    engine: Any = create_async_engine(dsn)
+    session_maker: async_sessionmaker = async_sessionmaker(
+        engine, expire_on_commit=False, class_=AsyncSession,
+    )
+    async with session_maker() as session:
+        user_id: int = await session.scalar(
+            insert(User).
+            values(email='bench_ranking@bench.local', name='bench', password='-').
+            returning(User.id),
+        )
+        await session.execute(
+            text(
+                'INSERT INTO tweet (tweet_data, owner_id, like_count, created_at, score_dirty) '
+                "SELECT 'bench', :user_id, (random() * 1000)::int, "
+                "now() - random() * interval '30 days', true "
+                'FROM generate_series(1, :tweets)',
+            ),
+            {'user_id': user_id, 'tweets': tweets},
+        )
+        await session.commit()
+
+        recomputed: int = 0
+        started: float = perf_counter()
+        while True:
+            batch: int = await recompute_scores(session=session, batch_size=batch_size)
+            recomputed += batch
+            if batch == 0:
+                break
+        elapsed: float = perf_counter() - started
+        print(
+            'recomputed {count} tweets in {elapsed:.2f}s: '
+            '{rate:,.0f} tweets/s (batch {batch_size})'.format(
+                count=recomputed,
+                elapsed=elapsed,
+                rate=recomputed / elapsed,
+                batch_size=batch_size,
+            ),
+        )
+
+        await session.execute(delete(Tweet).where(Tweet.owner_id == user_id))
+        await session.execute(delete(User).where(User.id == user_id))
+        await session.commit()
+    await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tweets', type=int, default=1_000_000)
+    parser.add_argument('--batch-size', type=int, default=get_settings().ranking_batch_size)
+    parser.add_argument('--dsn', default=None, help='SQLAlchemy URL, по умолчанию из .env')
+    args = parser.parse_args()
+    asyncio.run(bench(
+        dsn=args.dsn or get_settings().db_url,
+        tweets=args.tweets,
+        batch_size=args.batch_size,
+    ))
@@ -0,0 +1,158 @@
+"""
+Бенчмарк пересчета рекомендаций "кого читать".
+
+Создает N пользователей и граф подписок со степенным распределением:
+количество подписок пользователя распределено по Парето со средним
+--degree, а популярность аккаунтов убывает с ростом id (малые id -
+"знаменитости"). Затем пересчитывает рекомендации для всех пользователей
+пачками и выводит время, пиковую память процесса и объем временных
+файлов Postgres. После замера удаляет созданные данные. Нужна база с
+примененными миграциями.
+
+Запуск:
+    python -m benchmarks.bench_suggestions --users 100000 --degree 20
+"""
+import argparse
+import asyncio
+import resource
+from time import perf_counter
+from typing import Any, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from src.auth.suggestions import refresh_suggestions
+from src.config import get_settings
+
+EMAIL_PATTERN: str = 'bench_suggest_%@bench.local'
+
+
+async def temp_bytes(session: AsyncSession) -> int:
+    return await session.scalar(text(
+        'SELECT temp_bytes FROM pg_stat_database WHERE datname = current_database()',
+    ))
+
+
+async def create_graph(
+    session: AsyncSession,
+    users: int,
+    degree: int,
+    max_degree: int,
+) -> Tuple[int, int]:
+    """
+    Создает пользователей и степенной граф подписок между ними.
+
+    Returns:
+        Tuple[int, int]: первый и последний id созданных пользователей
+    """
+    await session.execute(
+        text(
+            'INSERT INTO "user" (name, email, password, registered_at) '
+            "SELECT 'bench' || i, 'bench_suggest_' || i || '@bench.local', '-', now() "
+            'FROM generate_series(1, :users) AS i',
+        ),
+        {'users': users},
+    )
+    first_id, last_id = (await session.execute(
+        text('SELECT min(id), max(id) FROM "user" WHERE email LIKE :pattern'),
+        {'pattern': EMAIL_PATTERN},
+    )).one()
+    await session.execute(
+        text(
+            'INSERT INTO followers (user_id, following_id) '
+            'SELECT user_id, following_id FROM ('
+            '  SELECT u.id AS user_id, '
+            '    :first_id + floor(:users * power(random(), 3))::int AS following_id '
+            '  FROM "user" AS u CROSS JOIN LATERAL generate_series(1, least('
+            '    :max_degree, floor(:half_degree * power(random(), -0.5))::int + 0 * u.id'
+            '  )) '
+            '  WHERE u.id BETWEEN :first_id AND :last_id'
+            ') AS edges WHERE user_id <> following_id '
+            'ON CONFLICT DO NOTHING',
+        ),
+        {
+            'first_id': first_id,
+            'last_id': last_id,
+            'users': users,
+            'half_degree': degree / 2,
+            'max_degree': max_degree,
+        },
+    )
+    await session.commit()
+    await session.execute(text('ANALYZE followers'))
+    await session.commit()
+
+    return first_id, last_id
+
+
+async def drop_graph(session: AsyncSession, first_id: int, last_id: int) -> None:
+    """Удаляет созданных пользователей, их подписки и рекомендации."""
+    for query in (
+        'DELETE FROM follow_suggestion WHERE user_id BETWEEN :first_id AND :last_id '
+        'OR suggested_id BETWEEN :first_id AND :last_id',
+        'DELETE FROM followers WHERE user_id BETWEEN :first_id AND :last_id '
+        'OR following_id BETWEEN :first_id AND :last_id',
+        'DELETE FROM "user" WHERE id BETWEEN :first_id AND :last_id',
+    ):
+        await session.execute(text(query), {'first_id': first_id, 'last_id': last_id})
+    await session.commit()
+
+
+async def bench(dsn: str, users: int, degree: int, max_degree: int, batch_size: int) -> None:
+    engine: Any = create_async_engine(dsn)
+    session_maker: async_sessionmaker = async_sessionmaker(
+        engine, expire_on_commit=False, class_=AsyncSession,
+    )
+    async with session_maker() as session:
+        first_id, last_id = await create_graph(session, users, degree, max_degree)
+        edges: int = await session.scalar(text('SELECT count(*) FROM followers'))
+        print('graph: {users} users, {edges} follows'.format(users=users, edges=edges))
+
+        temp_before: int = await temp_bytes(session)
+        refreshed: int = 0
+        started: float = perf_counter()
+        while True:
+            batch: int = await refresh_suggestions(session=session, batch_size=batch_size)
+            refreshed += batch
+            if batch == 0:
+                break
+        elapsed: float = perf_counter() - started
+        temp_after: int = await temp_bytes(session)
+        suggestions: int = await session.scalar(text('SELECT count(*) FROM follow_suggestion'))
+        print(
+            'refreshed {count} users in {elapsed:.2f}s: {rate:,.0f} users/s '
+            '(batch {batch_size}), {suggestions} suggestions stored'.format(
+                count=refreshed,
+                elapsed=elapsed,
+                rate=refreshed / elapsed,
+                batch_size=batch_size,
+                suggestions=suggestions,
+            ),
+        )
+        print(
+            'memory: process peak RSS {rss:.1f} MiB, '
+            'postgres temp files {temp:.1f} MiB'.format(
+                rss=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                temp=(temp_after - temp_before) / 1024 / 1024,
+            ),
+        )
+
+        await drop_graph(session, first_id, last_id)
+    await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--degree', type=int, default=20, help='среднее количество подписок')
+    parser.add_argument('--max-degree', type=int, default=5000)
+    parser.add_argument('--batch-size', type=int, default=get_settings().suggestions_batch_size)
+    parser.add_argument('--dsn', default=None, help='SQLAlchemy URL, по умолчанию из .env')
+    args = parser.parse_args()
+    asyncio.run(bench(
+        dsn=args.dsn or get_settings().db_url,
+        users=args.users,
+        degree=args.degree,
+        max_degree=args.max_degree,
+        batch_size=args.batch_size,
+    ))
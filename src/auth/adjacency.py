@@ -0,0 +1,286 @@
+"""
+Модуль списков смежности графа в формате CSR (compressed sparse row).
+
+Для узла с id N его связи лежат в отсортированном массиве
+targets[offsets[N]:offsets[N + 1]]. Изменения после построения хранятся
+в небольших множествах added/removed поверх неизменяемых массивов
+и учитываются при каждом чтении.
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+from heapq import merge
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+
+class CsrIndex(object):
+    """Класс неизменяемых списков смежности в формате CSR."""
+
+    __slots__ = ('offsets', 'targets')
+
+    def __init__(self, offsets: array, targets: array) -> None:
+        """
+        Метод инициализации списков смежности.
+
+        Args:
+            offsets: начало связей каждого узла в targets, длина - узлы + 1
+            targets: отсортированные внутри каждого узла id связанных узлов
+        """
+        self.offsets: array = offsets
+        self.targets: array = targets
+
+    @classmethod
+    def build(cls, sources: array, targets: array, size: int) -> 'CsrIndex':
+        """
+        Метод построения списков смежности сортировкой подсчетом.
+
+        Связи с одинаковым источником должны идти в порядке возрастания
+        targets, тогда каждый список смежности получается отсортированным.
+
+        Args:
+            sources: id источников связей
+            targets: id целей связей
+            size: количество узлов (максимальный id + 1)
+
+        Returns:
+            CsrIndex: списки смежности
+        """
+        offsets: array = count_offsets(sources, size)
+        positions: array = array('q', offsets)
+        ordered: array = array('i', bytes(4 * len(targets)))
+        for source, target in zip(sources, targets):
+            ordered[positions[source]] = target
+            positions[source] += 1
+
+        return cls(offsets, ordered)
+
+    def bounds(self, node: int) -> Tuple[int, int]:
+        """
+        Метод получения границ связей узла в targets.
+
+        Args:
+            node: id узла
+
+        Returns:
+            Tuple[int, int]: начало и конец связей узла
+        """
+        if node < 0 or node + 1 >= len(self.offsets):
+            return 0, 0
+
+        return self.offsets[node], self.offsets[node + 1]
+
+    def contains(self, node: int, target: int) -> bool:
+        """
+        Метод проверки наличия связи.
+
+        Args:
+            node: id узла
+            target: id связанного узла
+
+        Returns:
+            bool: True, если связь есть
+        """
+        start, end = self.bounds(node)
+        index: int = bisect_left(self.targets, target, start, end)
+
+        return index < end and self.targets[index] == target
+
+    def memory_bytes(self) -> int:
+        """
+        Метод подсчета памяти, занятой массивами.
+
+        Returns:
+            int: размер массивов в байтах
+        """
+        offsets_bytes: int = self.offsets.itemsize * len(self.offsets)
+
+        return offsets_bytes + self.targets.itemsize * len(self.targets)
+
+
+class Adjacency(object):
+    """
+    Класс списков смежности одного направления графа.
+
+    Изменения после загрузки хранятся в множествах added/removed поверх
+    неизменяемого CsrIndex.
+    """
+
+    __slots__ = ('base', 'added', 'removed')
+
+    def __init__(self, base: CsrIndex) -> None:
+        """
+        Метод инициализации списков смежности.
+
+        Args:
+            base: загруженные из базы списки смежности
+        """
+        self.base: CsrIndex = base
+        self.added: Dict[int, Set[int]] = {}
+        self.removed: Dict[int, Set[int]] = {}
+
+    def count(self, node: int) -> int:
+        """
+        Метод подсчета связей узла.
+
+        Args:
+            node: id узла
+
+        Returns:
+            int: количество связей
+        """
+        start, end = self.base.bounds(node)
+        delta: int = len(self.added.get(node, ()))
+        delta -= len(self.removed.get(node, ()))
+
+        return end - start + delta
+
+    def contains(self, node: int, target: int) -> bool:
+        """
+        Метод проверки наличия связи с учетом изменений.
+
+        Args:
+            node: id узла
+            target: id связанного узла
+
+        Returns:
+            bool: True, если связь есть
+        """
+        if target in self.added.get(node, ()):
+            return True
+        if target in self.removed.get(node, ()):
+            return False
+
+        return self.base.contains(node, target)
+
+    def page(
+        self,
+        node: int,
+        after: Optional[int],
+        limit: Optional[int],
+    ) -> List[int]:
+        """
+        Метод получения страницы связей узла по возрастанию id.
+
+        Args:
+            node: id узла
+            after: id, после которого начинается страница
+            limit: размер страницы, None - все связи после after
+
+        Returns:
+            List[int]: id связанных узлов
+        """
+        start, end = self.base.bounds(node)
+        if after is not None:
+            start = bisect_right(self.base.targets, after, start, end)
+        removed: Set[int] = self.removed.get(node, set())
+        base: Iterator[int] = (
+            self.base.targets[index]
+            for index in range(start, end)
+            if self.base.targets[index] not in removed
+        )
+        added: List[int] = sorted(
+            target
+            for target in self.added.get(node, ())
+            if after is None or target > after
+        )
+
+        return list(islice(merge(base, added), limit))
+
+    def add(self, node: int, target: int) -> None:
+        """
+        Метод добавления связи в слой изменений.
+
+        Args:
+            node: id узла
+            target: id связанного узла
+        """
+        if self.base.contains(node, target):
+            discard_target(self.removed, node, target)
+        else:
+            self.added.setdefault(node, set()).add(target)
+
+    def remove(self, node: int, target: int) -> None:
+        """
+        Метод удаления связи в слое изменений.
+
+        Args:
+            node: id узла
+            target: id связанного узла
+        """
+        if self.base.contains(node, target):
+            self.removed.setdefault(node, set()).add(target)
+        else:
+            discard_target(self.added, node, target)
+
+
+def count_offsets(sources: array, size: int) -> array:
+    """
+    Функция подсчета начала связей каждого узла для CSR.
+
+    Args:
+        sources: id источников связей
+        size: количество узлов (максимальный id + 1)
+
+    Returns:
+        array: начало связей каждого узла, длина - узлы + 1
+    """
+    offsets: array = array('q', bytes(8 * (size + 1)))
+    for source in sources:
+        offsets[source + 1] += 1
+    for node in range(size):
+        offsets[node + 1] += offsets[node]
+
+    return offsets
+
+
+def discard_target(
+    delta: Dict[int, Set[int]],
+    node: int,
+    target: int,
+) -> None:
+    """
+    Функция удаления связи из слоя изменений.
+
+    Args:
+        delta: слой изменений added или removed
+        node: id узла
+        target: id связанного узла
+    """
+    targets: Optional[Set[int]] = delta.get(node)
+    if targets is not None:
+        targets.discard(target)
+        if not targets:
+            delta.pop(node)
+
+
+def empty_adjacency() -> Adjacency:
+    """
+    Функция создания пустых списков смежности.
+
+    Returns:
+        Adjacency: списки смежности без связей
+    """
+    return Adjacency(CsrIndex(array('q', [0]), array('i')))
+
+
+def build_adjacency(
+    sources: array,
+    targets: array,
+) -> Tuple[Adjacency, Adjacency]:
+    """
+    Функция построения списков смежности подписок и подписчиков.
+
+    Args:
+        sources: id подписчиков по возрастанию (user_id, following_id)
+        targets: id пользователей, на которых подписка
+
+    Returns:
+        Tuple[Adjacency, Adjacency]: подписки и подписчики
+    """
+    last_source: int = max(sources, default=0)
+    size: int = max(last_source, max(targets, default=0)) + 1
+
+    return (
+        Adjacency(CsrIndex.build(sources, targets, size)),
+        Adjacency(CsrIndex.build(targets, sources, size)),
+    )
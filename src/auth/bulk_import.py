@@ -0,0 +1,364 @@
+"""
+Модуль массового импорта пользователей из CSV или NDJSON.
+
+Пароли хэшируются в пуле процессов, строки user и api_key загружаются
+через COPY пачками, каждая пачка - отдельная транзакция. После каждой
+пачки номер последней обработанной записи сохраняется в файл checkpoint,
+поэтому после сбоя повторный запуск продолжает с этого места.
+Пользователи с уже существующим email пропускаются.
+
+Сгенерированные api-key дописываются в файл output (по умолчанию
+<path>.keys) строками ``email,apikey`` и сбрасываются на диск до
+фиксации пачки, поэтому сбой после фиксации не теряет api-key. Если
+сбой случился до фиксации, после повторного запуска для email в файле
+будет вторая строка; действует последняя. Ход импорта и пропущенные
+записи (включая строки NDJSON, которые не являются JSON-объектом)
+пишутся в stderr.
+
+Запуск:
+    python -m src.auth.bulk_import users.csv --batch-size 1000 --workers 8
+"""
+import argparse
+import asyncio
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import AsyncExitStack
+from itertools import islice
+from typing import Any, Iterator, List, Optional, TextIO, Tuple
+
+import asyncpg
+from pydantic import BaseModel
+
+from src.auth.bulk_records import (
+    hash_batch,
+    make_rows,
+    read_records,
+    validate_records,
+)
+from src.config import get_settings
+
+
+class ImportOptions(BaseModel):
+    """Класс-схема параметров импорта."""
+
+    file_format: str
+    batch_size: int
+    workers: int
+    checkpoint: str
+    output: str
+
+
+async def import_batch(
+    connection: asyncpg.Connection,
+    users: List[Any],
+    hashed_passwords: List[str],
+    output: TextIO,
+) -> int:
+    """
+    Функция загрузки пачки пользователей и их api-key через COPY.
+
+    id пользователей заранее берутся из последовательности таблицы user,
+    чтобы связать их с api_key без чтения вставленных строк. api-key
+    записываются в output до фиксации транзакции.
+
+    Args:
+        connection: подключение asyncpg
+        users: корректные записи пользователей
+        hashed_passwords: хэшированные пароли в порядке users
+        output: файл для строк email,apikey
+
+    Returns:
+        int: количество созданных пользователей
+    """
+    async with connection.transaction():
+        new_users: list = await skip_existing(
+            connection, users, hashed_passwords,
+        )
+        if not new_users:
+            return 0
+        ids: list = await connection.fetch(
+            "SELECT nextval('user_id_seq') AS id FROM generate_series(1, $1)",
+            len(new_users),
+        )
+        user_rows, key_rows = make_rows(new_users, ids)
+        await connection.copy_records_to_table(
+            'user',
+            records=user_rows,
+            columns=['id', 'name', 'email', 'password', 'registered_at'],
+        )
+        await connection.copy_records_to_table(
+            'api_key',
+            records=key_rows,
+            columns=['apikey', 'user_id'],
+        )
+        write_keys(output, user_rows, key_rows)
+
+    return len(key_rows)
+
+
+async def skip_existing(
+    connection: asyncpg.Connection,
+    users: List[Any],
+    hashed_passwords: List[str],
+) -> List[Tuple[Any, str]]:
+    """
+    Функция отбора пользователей, которых еще нет в базе данных.
+
+    Args:
+        connection: подключение asyncpg
+        users: корректные записи пользователей
+        hashed_passwords: хэшированные пароли в порядке users
+
+    Returns:
+        List[Tuple[Any, str]]: новые пользователи и хэши их паролей
+    """
+    existing: set = {
+        row['email'] for row in await connection.fetch(
+            'SELECT email FROM "user" WHERE email = ANY($1::varchar[])',
+            [user.email for user in users],
+        )
+    }
+
+    return [
+        (user, hashed)
+        for user, hashed in zip(users, hashed_passwords)
+        if user.email not in existing
+    ]
+
+
+def write_keys(output: TextIO, user_rows: list, key_rows: list) -> None:
+    """
+    Функция надежной записи api-key созданных пользователей.
+
+    Строки email,apikey сбрасываются на диск до фиксации транзакции
+    пачки, поэтому api-key не теряются при сбое между фиксацией и записью.
+
+    Args:
+        output: файл для строк email,apikey
+        user_rows: строки таблицы user
+        key_rows: строки таблицы api_key в порядке user_rows
+    """
+    output.writelines(
+        '{email},{apikey}\n'.format(email=user_row[2], apikey=key_row[0])
+        for user_row, key_row in zip(user_rows, key_rows)
+    )
+    output.flush()
+    os.fsync(output.fileno())
+
+
+def read_checkpoint(path: str) -> int:
+    """
+    Функция чтения номера последней импортированной записи.
+
+    Args:
+        path: путь к файлу checkpoint
+
+    Returns:
+        int: количество уже обработанных записей
+    """
+    if not os.path.exists(path):
+        return 0
+    with open(path, encoding='utf-8') as checkpoint:
+        return int(checkpoint.read().strip() or 0)
+
+
+def write_checkpoint(path: str, offset: int) -> None:
+    """
+    Функция атомарной записи номера последней импортированной записи.
+
+    Args:
+        path: путь к файлу checkpoint
+        offset: количество обработанных записей
+    """
+    tmp_path: str = '{path}.tmp'.format(path=path)
+    with open(tmp_path, 'w', encoding='utf-8') as checkpoint:
+        checkpoint.write(str(offset))
+    os.replace(tmp_path, path)
+
+
+class BulkImporter(object):
+    """
+    Класс загрузки пачек пользователей.
+
+    Хэширование следующей пачки идет параллельно с загрузкой текущей.
+    """
+
+    def __init__(
+        self,
+        connection: asyncpg.Connection,
+        pool: ProcessPoolExecutor,
+        output: TextIO,
+        options: ImportOptions,
+    ) -> None:
+        """
+        Метод инициализации загрузки.
+
+        Args:
+            connection: подключение asyncpg
+            pool: пул процессов для хэширования
+            output: файл для строк email,apikey
+            options: параметры импорта
+        """
+        self.options: ImportOptions = options
+        self.read: int = 0
+        self.offset: int = 0
+        self.created: int = 0
+        self._connection: asyncpg.Connection = connection
+        self._pool: ProcessPoolExecutor = pool
+        self._output: TextIO = output
+        self._pending: Optional[asyncio.Future] = None
+
+    async def run(self, path: str) -> int:
+        """
+        Метод загрузки всех пачек, начиная с записи из checkpoint.
+
+        Args:
+            path: путь к файлу с пользователями
+
+        Returns:
+            int: количество созданных пользователей
+        """
+        self.offset = read_checkpoint(self.options.checkpoint)
+        self.read = self.offset
+        records: Iterator[Any] = islice(
+            read_records(path, self.options.file_format), self.offset, None,
+        )
+        self._pending = asyncio.ensure_future(self.prepare(records))
+        prepared: Optional[tuple] = await self._pending
+        while prepared is not None:
+            self._pending = asyncio.ensure_future(self.prepare(records))
+            await self.load(*prepared)
+            prepared = await self._pending
+
+        return self.created
+
+    async def prepare(self, records: Iterator[Any]) -> Optional[tuple]:
+        """
+        Метод чтения, проверки и хэширования следующей пачки.
+
+        Args:
+            records: записи пользователей
+
+        Returns:
+            tuple: размер пачки, корректные записи и хэши паролей
+            None: если записи закончились
+        """
+        batch: list = list(islice(records, self.options.batch_size))
+        if not batch:
+            return None
+        users: list = validate_records(batch, self.read)
+        self.read += len(batch)
+        hashed: list = await hash_batch(
+            self._pool,
+            self.options.workers,
+            [user.password for user in users],
+        )
+
+        return len(batch), users, hashed
+
+    async def load(self, size: int, users: list, hashed: list) -> None:
+        """
+        Метод загрузки пачки и сохранения checkpoint.
+
+        Args:
+            size: количество записей пачки в файле
+            users: корректные записи пачки
+            hashed: хэши паролей в порядке users
+        """
+        self.created += await import_batch(
+            self._connection, users, hashed, self._output,
+        )
+        self.offset += size
+        write_checkpoint(self.options.checkpoint, self.offset)
+        sys.stderr.write(
+            'imported {offset} records, created {created} users\n'.format(
+                offset=self.offset, created=self.created,
+            ),
+        )
+
+    def cancel(self) -> None:
+        """Метод отмены подготовки следующей пачки при ошибке загрузки."""
+        if self._pending is not None:
+            self._pending.cancel()
+
+
+async def bulk_import(path: str, dsn: str, options: ImportOptions) -> int:
+    """
+    Функция импорта пользователей из файла.
+
+    api-key созданных пользователей дописываются в файл options.output.
+
+    Args:
+        path: путь к файлу с пользователями
+        dsn: строка подключения asyncpg
+        options: параметры импорта
+
+    Returns:
+        int: количество созданных пользователей
+    """
+    with open(options.output, 'a', encoding='utf-8') as output:
+        async with AsyncExitStack() as stack:
+            connection: asyncpg.Connection = await asyncpg.connect(dsn)
+            stack.push_async_callback(connection.close)
+            importer: BulkImporter = BulkImporter(
+                connection=connection,
+                pool=stack.enter_context(
+                    ProcessPoolExecutor(max_workers=options.workers),
+                ),
+                output=output,
+                options=options,
+            )
+            stack.callback(importer.cancel)
+            return await importer.run(path)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Функция создания парсера аргументов командной строки.
+
+    Returns:
+        argparse.ArgumentParser: парсер аргументов
+    """
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('path', help='CSV (email,password) или NDJSON')
+    parser.add_argument('--format', choices=['csv', 'ndjson'], default=None)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--checkpoint', help='по умолчанию <path>.checkpoint')
+    parser.add_argument('--output', help='по умолчанию <path>.keys')
+    parser.add_argument('--dsn', help='строка подключения asyncpg')
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Функция запуска импорта из командной строки.
+
+    Args:
+        argv: аргументы командной строки
+    """
+    args: Any = build_parser().parse_args(argv)
+    file_format: str = args.format
+    if file_format is None:
+        file_format = 'csv' if args.path.endswith('.csv') else 'ndjson'
+    options: ImportOptions = ImportOptions(
+        file_format=file_format,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        checkpoint=args.checkpoint or '{0}.checkpoint'.format(args.path),
+        output=args.output or '{0}.keys'.format(args.path),
+    )
+    asyncio.run(bulk_import(
+        path=args.path,
+        dsn=args.dsn or get_settings().db_url.replace('+asyncpg', ''),
+        options=options,
+    ))
+
+
+if __name__ == '__main__':
+    main()
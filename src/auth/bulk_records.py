@@ -0,0 +1,178 @@
+"""
+Модуль подготовки записей для массового импорта пользователей.
+
+Записи читаются из CSV или NDJSON, проверяются схемой UserLoginSchema,
+пароли хэшируются в пуле процессов. Некорректные записи пропускаются
+с сообщением в stderr.
+"""
+import asyncio
+import csv
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from re import match
+from typing import Any, Iterator, List, Tuple
+from uuid import uuid4
+
+from pydantic import ValidationError
+
+from src.auth.schemas import UserLoginSchema
+from src.auth.utils_user import hash_password
+
+
+def read_records(path: str, file_format: str) -> Iterator[Any]:
+    """
+    Функция чтения записей пользователей из файла.
+
+    Строка NDJSON, которая не разбирается как JSON, возвращается как None,
+    чтобы номера записей совпадали с номерами непустых строк файла.
+
+    Args:
+        path: путь к файлу
+        file_format: формат файла (csv или ndjson)
+
+    Yields:
+        Any: запись пользователя с полями email и password или None
+    """
+    with open(path, newline='', encoding='utf-8') as source:
+        if file_format == 'csv':
+            yield from csv.DictReader(source)
+            return
+        for line in source:
+            if line.strip():
+                yield parse_line(line)
+
+
+def parse_line(line: str) -> Any:
+    """
+    Функция разбора строки NDJSON.
+
+    Args:
+        line: строка файла
+
+    Returns:
+        Any: значение из строки или None, если строка не JSON
+    """
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None
+
+
+def validate_records(records: List[Any], offset: int) -> List[UserLoginSchema]:
+    """
+    Функция проверки записей пачки.
+
+    Некорректные записи и повторы email внутри пачки пропускаются
+    с сообщением в stderr.
+
+    Args:
+        records: записи пользователей из файла
+        offset: номер первой записи пачки в файле
+
+    Returns:
+        List[UserLoginSchema]: корректные записи
+    """
+    users: List[UserLoginSchema] = []
+    emails: set = set()
+    for number, record in enumerate(records, start=offset + 1):
+        if not isinstance(record, dict):
+            skip_record(number, 'record is not a JSON object')
+            continue
+        try:
+            user: UserLoginSchema = UserLoginSchema(
+                email=record.get('email'),
+                password=record.get('password'),
+            )
+        except ValidationError as exc:
+            skip_record(number, exc.errors()[0]['msg'])
+            continue
+        if user.email not in emails:
+            emails.add(user.email)
+            users.append(user)
+
+    return users
+
+
+def skip_record(number: int, reason: str) -> None:
+    """
+    Функция сообщения о пропущенной записи.
+
+    Args:
+        number: номер записи в файле
+        reason: причина пропуска
+    """
+    sys.stderr.write('skip record {number}: {reason}\n'.format(
+        number=number, reason=reason,
+    ))
+
+
+def hash_passwords(passwords: List[str]) -> List[str]:
+    """
+    Функция хэширования списка паролей в процессе пула.
+
+    Args:
+        passwords: пароли пользователей
+
+    Returns:
+        List[str]: хэшированные пароли
+    """
+    return [hash_password(password) for password in passwords]
+
+
+async def hash_batch(
+    pool: ProcessPoolExecutor,
+    workers: int,
+    passwords: List[str],
+) -> List[str]:
+    """
+    Функция хэширования пачки паролей, разделенной между процессами пула.
+
+    Args:
+        pool: пул процессов
+        workers: количество процессов в пуле
+        passwords: пароли пользователей
+
+    Returns:
+        List[str]: хэшированные пароли в исходном порядке
+    """
+    loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+    chunk_size: int = max(-(-len(passwords) // workers), 1)
+    chunks: list = await asyncio.gather(*[
+        loop.run_in_executor(
+            pool, hash_passwords, passwords[start:start + chunk_size],
+        )
+        for start in range(0, len(passwords), chunk_size)
+    ])
+
+    return [hashed for chunk in chunks for hashed in chunk]
+
+
+def make_rows(
+    new_users: List[Tuple[UserLoginSchema, str]],
+    ids: List[Any],
+) -> Tuple[list, list]:
+    """
+    Функция формирования строк таблиц user и api_key для COPY.
+
+    Args:
+        new_users: пары из записи пользователя и хэша его пароля
+        ids: строки с заранее выданными id пользователей
+
+    Returns:
+        Tuple[list, list]: строки user и строки api_key
+    """
+    registered_at: datetime = datetime.utcnow()
+    user_rows: list = [
+        (
+            row['id'],
+            match(r'\w*', user.email).group(0),
+            user.email,
+            hashed,
+            registered_at,
+        )
+        for row, (user, hashed) in zip(ids, new_users)
+    ]
+
+    return user_rows, [(str(uuid4()), row['id']) for row in ids]
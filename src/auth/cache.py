@@ -0,0 +1,138 @@
+"""Модуль с in-process кэшами и версиями данных пользователей."""
+from typing import Optional
+
+from src.auth.schemas import UserSchema
+from src.cache import TTLCache
+from src.config import Settings, get_settings
+
+settings: Settings = get_settings()
+
+
+class ApiKeyCache(object):
+    """
+    Класс кэша соответствия api-key и пользователя.
+
+    Хранит легкий объект пользователя (id, name), а для неизвестных
+    api-key - отдельную запись с коротким временем жизни, чтобы перебор
+    ключей не приводил к запросам в базу данных.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, negative_ttl: float) -> None:
+        """
+        Метод инициализации кэша api-key.
+
+        Args:
+            maxsize: максимальное количество записей каждого вида
+            ttl: время жизни записи известного api-key в секундах
+            negative_ttl: время жизни записи неизвестного api-key в секундах
+        """
+        self.users: TTLCache = TTLCache(
+            name='apikey',
+            maxsize=maxsize,
+            ttl=ttl,
+        )
+        self.unknown: TTLCache = TTLCache(
+            name='apikey_unknown',
+            maxsize=maxsize,
+            ttl=negative_ttl,
+        )
+
+    def get(self, apikey: str) -> Optional[UserSchema]:
+        """
+        Метод получения пользователя по api-key.
+
+        Args:
+            apikey: api-key пользователя
+
+        Returns:
+            UserSchema: пользователь, если api-key есть в кэше
+            None: если api-key нет в кэше
+        """
+        return self.users.get(apikey)
+
+    def is_unknown(self, apikey: str) -> bool:
+        """
+        Метод проверки, что api-key недавно не был найден в базе данных.
+
+        Args:
+            apikey: api-key пользователя
+
+        Returns:
+            bool: True, если api-key неизвестен
+        """
+        return self.unknown.get(apikey) is not None
+
+    def set(self, apikey: str, user: Optional[UserSchema]) -> None:
+        """
+        Метод сохранения результата поиска пользователя по api-key.
+
+        Args:
+            apikey: api-key пользователя
+            user: найденный пользователь или None
+        """
+        if user is None:
+            self.unknown.set(apikey, value=True)
+        else:
+            self.users.set(apikey, user)
+
+    def invalidate(self, apikey: str) -> None:
+        """
+        Метод удаления api-key из кэша при его выпуске или отзыве.
+
+        Args:
+            apikey: api-key пользователя
+        """
+        self.users.pop(apikey)
+        self.unknown.pop(apikey)
+
+    def invalidate_user(self, user_id: int) -> None:
+        """
+        Метод удаления из кэша всех api-key пользователя.
+
+        Args:
+            user_id: id пользователя
+        """
+        self.users.pop_if(lambda user: user.id == user_id)
+
+
+class ProfileVersions(object):
+    """
+    Класс версий профилей пользователей.
+
+    Версия профиля увеличивается при каждом изменении подписок
+    пользователя и используется для ETag профиля.
+    """
+
+    def __init__(self) -> None:
+        """Метод инициализации версий профилей."""
+        self._versions: dict[int, int] = {}
+
+    def get(self, user_id: int) -> int:
+        """
+        Метод получения версии профиля пользователя.
+
+        Args:
+            user_id: id пользователя
+
+        Returns:
+            int: текущая версия профиля
+        """
+        return self._versions.get(user_id, 0)
+
+    def bump(self, *user_ids: int) -> None:
+        """
+        Метод увеличения версий профилей после их изменения.
+
+        Args:
+            user_ids: id пользователей, чьи профили изменились
+        """
+        for user_id in user_ids:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
+
+profile_versions: ProfileVersions = ProfileVersions()
+apikey_cache: ApiKeyCache = ApiKeyCache(
+    maxsize=settings.apikey_cache_size,
+    ttl=settings.apikey_cache_ttl,
+    negative_ttl=settings.apikey_negative_ttl,
+)
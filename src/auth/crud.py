@@ -3,13 +3,18 @@ from re import match
 from typing import Any, Optional
 
 from fastapi import HTTPException, status
-from sqlalchemy import insert, select
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from src.auth.graph import follow_graph
 from src.auth.models import ApiKey, User, followers
-from src.auth.schemas import UserRegisterSchema
-from src.auth.utils_user import hash_password
+from src.auth.schemas import UserRegisterSchema, UserSchema
+from src.auth.utils_user import hash_password_async
+from src.config import Settings, get_settings
+from src.pagination import decode_cursor, encode_cursor
+
+settings: Settings = get_settings()
 
 
 async def get_user_by_email(email: str, session: AsyncSession) -> User:
@@ -28,22 +33,38 @@ async def get_user_by_email(email: str, session: AsyncSession) -> User:
     return await session.scalar(query)
 
 
-async def create_user_apikey(user_id: int, session: AsyncSession) -> str:
+async def upgrade_user_password(
+    user_id: int,
+    password: str,
+    hashed_password: str,
+    session_maker: async_sessionmaker,
+) -> None:
     """
-    Функция генерации apikey для пользователя при регистрации.
+    Функция перехэширования пароля пользователя с текущими параметрами.
+
+    Пароль обновляется, только если в базе все еще лежит старый хэш.
+    Если пул хэширования занят, обновление откладывается до следующего входа.
+    Функция выполняется в фоне после ответа, когда сессия запроса уже
+    закрыта, поэтому открывает свою сессию.
 
     Args:
         user_id: id пользователя
-        session: сессия подключения к базе данных
-
-    Returns:
-        str: сгенерированный apikey пользователя
+        password: пароль введенный пользователем
+        hashed_password: текущий хэш пароля в базе данных
+        session_maker: фабрика асинхронных сессий
     """
-    query: Any = insert(ApiKey).values(user_id=user_id).returning(ApiKey)
-    api_key: str = await session.scalar(query)
-    await session.commit()
-
-    return api_key
+    try:
+        new_password: str = await hash_password_async(password)
+    except HTTPException:
+        return
+    query: Any = (
+        update(User).
+        where(User.id == user_id, User.password == hashed_password).
+        values(password=new_password)
+    )
+    async with session_maker() as session:
+        await session.execute(query)
+        await session.commit()
 
 
 async def get_user_apikey(user_id: int, session: AsyncSession) -> ApiKey:
@@ -69,32 +90,54 @@ async def create_user(
     """
     Функция создания пользователя при регистрации.
 
+    Пользователь и его apikey создаются одним запросом: INSERT пользователя
+    в CTE передает id в INSERT apikey. Повторный email определяется
+    по уникальному ограничению на колонке email.
+
     Args:
         user: данные пользователя для регистрации
         session: сессия подключения к базе данных
 
     Returns:
         ApiKey: сгенерированный apikey для зарегистрированного пользователя
+
+    Raises:
+        HTTPException: если пользователь с таким email уже существует
     """
-    hashed_password: str = hash_password(user.password)
+    hashed_password: str = await hash_password_async(user.password)
     username = match(r'\w*', user.email)
-    query: Any = (
+    new_user: Any = (
         insert(User).
         values(
             email=user.email,
             name=username.group(0),
             password=hashed_password,
         ).
-        returning(User.id)
+        returning(User.id).
+        cte('new_user')
+    )
+    query: Any = (
+        insert(ApiKey).
+        from_select(['user_id'], select(new_user.c.id)).
+        returning(ApiKey)
     )
-    user_id: int = await session.scalar(query)
-    await create_user_apikey(user_id=user_id, session=session)
+    try:
+        api_key: ApiKey = await session.scalar(query)
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='User with this email already exists',
+        )
     await session.commit()
 
-    return await get_user_apikey(user_id=user_id, session=session)
+    return api_key
 
 
-async def get_user_by_apikey(apikey: str, session: AsyncSession) -> User:
+async def get_user_by_apikey(
+    apikey: str,
+    session: AsyncSession,
+) -> Optional[UserSchema]:
     """
     Функция получения пользователя из базы данных по его ApiKey.
 
@@ -103,122 +146,149 @@ async def get_user_by_apikey(apikey: str, session: AsyncSession) -> User:
         session: сессия подключения к базе данных
 
     Returns:
-        User: текущий пользователь полученный из базы данных
+        UserSchema: текущий пользователь полученный из базы данных
+        None: если apikey нет в базе данных
     """
-    query: Any = select(User).join(ApiKey).where(ApiKey.apikey == apikey)
+    query: Any = (
+        select(User.id, User.name).
+        join(ApiKey).
+        where(ApiKey.apikey == apikey)
+    )
+    user: Optional[Any] = (await session.execute(query)).first()
+    if user is None:
+        return None
 
-    return await session.scalar(query)
+    return UserSchema(id=user.id, name=user.name)
 
 
-async def get_all_info_user(
+async def get_follow_page(
     user_id: int,
+    following: bool,
     session: AsyncSession,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
 ) -> dict:
     """
-    Функция получения всей информации о пользователе из базы данных по его id.
+    Функция получения страницы подписчиков или подписок пользователя.
+
+    Страницы упорядочены по id пользователя, курсор - id последнего
+    пользователя страницы. Если загружен граф подписок в памяти, id
+    страницы берутся из него, а из базы читаются только имена.
 
     Args:
         user_id: id пользователя
+        following: True - подписки пользователя, False - его подписчики
         session: сессия подключения к базе данных
+        limit: количество пользователей на странице
+        cursor: курсор, полученный вместе с предыдущей страницей
 
     Returns:
-        dict: словарь с информацией о запрошенном пользователе
-        None: если пользователя нет в базе данных
-
-    Raises:
-        HTTPException: если пользователя нет в базе данных
+        dict: пользователи страницы и курсор следующей страницы
     """
-    query: Any = (
-        select(User).
-        where(User.id == user_id).
-        options(
-            selectinload(User.all_followers),
-            selectinload(User.all_following),
-        )
-    )
-    user_info: Optional[User] = await session.scalar(query)
-    if not user_info:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
-
-    all_followers: list = [
-        follower.to_json() for follower in user_info.all_followers
-    ]
-    all_following: list = [
-        following.to_json() for following in user_info.all_following
-    ]
-    user: dict = user_info.to_json()
+    limit = limit or settings.follow_page_size
+    last_id: Optional[int] = None
+    if cursor is not None:
+        last_id = decode_cursor(cursor, size=1)[0]
+    rows: list = list(await session.execute(
+        follow_page_query(user_id, following, last_id, limit + 1),
+    ))
+    if not rows:
+        await ensure_user_exists(user_id, session)
+    next_cursor: Optional[str] = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].id)
 
     return {
-        'id': user['id'],
-        'name': user['name'],
-        'followers': all_followers,
-        'following': all_following,
+        'result': 'true',
+        'users': [{'id': row.id, 'name': row.name} for row in rows],
+        'next_cursor': next_cursor,
     }
 
 
-async def delete_follower_by_id(
-    idx: int,
+def follow_page_query(
     user_id: int,
-    session: AsyncSession,
-) -> None:
+    following: bool,
+    last_id: Optional[int],
+    limit: Optional[int],
+) -> Any:
     """
-    Функция удаления подписки на другого пользователя.
+    Функция построения запроса страницы подписчиков или подписок.
 
     Args:
-        idx: id пользователя, подписку на которого хотим удалить
-        user_id: id текущего пользователя
+        user_id: id пользователя
+        following: True - подписки пользователя, False - его подписчики
+        last_id: id последнего пользователя предыдущей страницы
+        limit: количество пользователей в запросе, None - все
+
+    Returns:
+        Any: запрос id и имен пользователей страницы
+    """
+    if follow_graph.loaded:
+        adjacency: Any = (
+            follow_graph.following if following else follow_graph.followers
+        )
+        return (
+            select(User.id, User.name).
+            where(User.id.in_(adjacency.page(user_id, last_id, limit))).
+            order_by(User.id)
+        )
+
+    query: Any = follow_list_query(user_id=user_id, following=following)
+    if last_id is not None:
+        query = query.where(User.id > last_id)
+
+    return query.limit(limit)
+
+
+async def ensure_user_exists(user_id: int, session: AsyncSession) -> None:
+    """
+    Функция проверки, что пользователь есть в базе данных.
+
+    Args:
+        user_id: id пользователя
         session: сессия подключения к базе данных
 
     Raises:
-        HTTPException: если текущий пользователь не подписан на пользователя,
-        от которого хочет отписаться
+        HTTPException: если пользователя нет в базе данных
     """
-    follower: Optional[Any] = await session.scalar(
-        followers.select().where(
-            followers.c.user_id == user_id, followers.c.following_id == idx,
-        ),
-    )
-    if not follower:
+    query: Any = select(User.id).where(User.id == user_id)
+    if not await session.scalar(query):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
 
-    await session.execute(
-        followers.delete().where(
-            followers.c.user_id == user_id,
-            followers.c.following_id == idx,
-        ),
+
+def follow_list_query(user_id: int, following: bool) -> Any:
+    """
+    Функция построения запроса подписчиков или подписок пользователя.
+
+    Args:
+        user_id: id пользователя
+        following: True - подписки пользователя, False - его подписчики
+
+    Returns:
+        Any: запрос id и имен пользователей, упорядоченных по id
+    """
+    owner, other = follow_columns(following)
+
+    return (
+        select(User.id, User.name).
+        join(followers, other == User.id).
+        where(owner == user_id).
+        order_by(other)
     )
-    await session.commit()
 
 
-async def add_follower_by_id(
-    idx: int,
-    user_id: int,
-    session: AsyncSession,
-) -> None:
+def follow_columns(following: bool) -> tuple:
     """
-    Функция добавления подписки на другого пользователя.
+    Функция выбора колонок таблицы подписок для направления связи.
 
     Args:
-        idx: id пользователя, подписку на которого хотим добавить
-        user_id: id текущего пользователя
-        session: сессия подключения к базе данных
+        following: True - подписки пользователя, False - его подписчики
 
-    Raises:
-        HTTPException: если текущий пользователь уже подписан на пользователя,
-        на которого хочет подписаться
+    Returns:
+        tuple: колонка с id пользователя и колонка с id связанных пользователей
     """
-    follower: Optional[Any] = await session.scalar(
-        followers.select().where(
-            followers.c.user_id == user_id, followers.c.following_id == idx,
-        ),
-    )
-    if follower:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail='You are already subscribed',
-        )
+    if following:
+        return followers.c.user_id, followers.c.following_id
 
-    await session.execute(
-        followers.insert().values(user_id=user_id, following_id=idx),
-    )
-    await session.commit()
+    return followers.c.following_id, followers.c.user_id
@@ -0,0 +1,77 @@
+"""Модуль с зависимостями для получения текущего пользователя."""
+from typing import Annotated, Optional
+from uuid import UUID
+
+from fastapi import Depends, status
+from fastapi.exceptions import HTTPException
+from fastapi.security import APIKeyHeader
+
+from src.auth.cache import apikey_cache
+from src.auth.crud import get_user_by_apikey
+from src.auth.schemas import UserSchema
+from src.auth.utils_user import get_apikey_from_headers
+from src.database import SessionDep
+
+api_key_header: APIKeyHeader = APIKeyHeader(name='api-key')
+
+
+async def get_current_user(
+    api_key: Annotated[str, Depends(get_apikey_from_headers)],
+    session: SessionDep,
+) -> Optional[UserSchema]:
+    """
+    Функция для получения текущего пользователя.
+
+    Результат поиска по api-key кэшируется, поэтому при попадании в кэш
+    запросов к базе данных нет.
+
+    Args:
+        api_key: api-key текущего пользователя, полученный из headers
+        session: асинхронная сессия для подключения к базе данных
+
+    Returns:
+        UserSchema: текущий пользователь
+        None: если api-key не передан или не найден
+
+    Raises:
+        HTTPException: если api-key не UUID
+    """
+    if api_key is None:
+        return None
+
+    user: Optional[UserSchema] = apikey_cache.get(api_key)
+    if user is not None or apikey_cache.is_unknown(api_key):
+        return user
+
+    try:
+        key: UUID = UUID(api_key)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='Invalid ApiKey',
+        )
+    user = await get_user_by_apikey(apikey=str(key), session=session)
+    apikey_cache.set(api_key, user)
+
+    return user
+
+
+async def get_authorized_user(
+    user: Annotated[Optional[UserSchema], Depends(get_current_user)],
+) -> UserSchema:
+    """
+    Функция для получения обязательного текущего пользователя.
+
+    Args:
+        user: текущий пользователь или None
+
+    Returns:
+        UserSchema: текущий пользователь
+
+    Raises:
+        HTTPException: если api-key не передан или не найден
+    """
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+
+    return user
@@ -0,0 +1,240 @@
+"""Модуль с эндпоинтами подписок пользователей."""
+from typing import Annotated, Optional, Type
+
+from fastapi import APIRouter, Depends, Query, Security
+
+from src.auth.crud import get_follow_page
+from src.auth.dependencies import api_key_header, get_authorized_user
+from src.auth.follows import (
+    delete_follower_by_id,
+    add_follower_by_id,
+    add_followers_by_ids,
+    delete_followers_by_ids,
+)
+from src.auth.suggestions import get_user_suggestions
+from src.auth.schemas import (
+    UserSchema,
+    UserListSchema,
+    SuggestionListSchema,
+    FollowBatchSchema,
+    FollowBatchResultSchema,
+    ResultSchema,
+)
+from src.config import ODD_RESPONSES, Settings, get_settings
+from src.database import SessionDep
+
+settings: Settings = get_settings()
+router: APIRouter = APIRouter(prefix='', tags=['Auth'])
+FollowLimit = Annotated[
+    Optional[int], Query(ge=1, le=settings.follow_max_page_size),
+]
+SuggestionLimit = Annotated[
+    Optional[int], Query(ge=1, le=settings.suggestions_size),
+]
+
+
+@router.get(
+    '/users/{idx}/followers',
+    response_model=UserListSchema,
+    responses=ODD_RESPONSES,
+    dependencies=[Security(api_key_header)],
+)
+async def get_user_followers(
+    idx: int,
+    session: SessionDep,
+    limit: FollowLimit = None,
+    cursor: Optional[str] = None,
+) -> dict:
+    """
+    Endpoint для получения страницы подписчиков пользователя.
+
+    Args:
+        idx: id пользователя
+        session: асинхронная сессия для подключения к базе данных
+        limit: количество пользователей на странице
+        cursor: курсор следующей страницы из предыдущего ответа
+
+    Returns:
+        dict: подписчики пользователя и курсор следующей страницы
+    """
+    return await get_follow_page(
+        user_id=idx,
+        following=False,
+        session=session,
+        limit=limit,
+        cursor=cursor,
+    )
+
+
+@router.get(
+    '/users/{idx}/following',
+    response_model=UserListSchema,
+    responses=ODD_RESPONSES,
+    dependencies=[Security(api_key_header)],
+)
+async def get_user_following(
+    idx: int,
+    session: SessionDep,
+    limit: FollowLimit = None,
+    cursor: Optional[str] = None,
+) -> dict:
+    """
+    Endpoint для получения страницы подписок пользователя.
+
+    Args:
+        idx: id пользователя
+        session: асинхронная сессия для подключения к базе данных
+        limit: количество пользователей на странице
+        cursor: курсор следующей страницы из предыдущего ответа
+
+    Returns:
+        dict: подписки пользователя и курсор следующей страницы
+    """
+    return await get_follow_page(
+        user_id=idx,
+        following=True,
+        session=session,
+        limit=limit,
+        cursor=cursor,
+    )
+
+
+@router.post(
+    '/users/{idx}/follow',
+    response_model=ResultSchema,
+    responses=ODD_RESPONSES,
+    dependencies=[Security(api_key_header)],
+)
+async def add_new_follower(
+    idx: int,
+    user: Annotated[UserSchema, Depends(get_authorized_user)],
+    session: SessionDep,
+) -> Type[ResultSchema]:
+    """
+    Endpoint для подписки на пользователя по его id.
+
+    Args:
+        idx: id пользователя на которого нужно подписаться
+        user: текущий авторизованный пользователь
+        session: асинхронная сессия для подключения к базе данных
+
+    Returns:
+        ResultSchema: простой ответ, что подписка прошла успешно
+    """
+    await add_follower_by_id(idx=idx, user_id=user.id, session=session)
+    return ResultSchema
+
+
+@router.delete(
+    '/users/{idx}/follow',
+    response_model=ResultSchema,
+    responses=ODD_RESPONSES,
+    dependencies=[Security(api_key_header)],
+)
+async def delete_follower(
+    idx: int,
+    user: Annotated[UserSchema, Depends(get_authorized_user)],
+    session: SessionDep,
+) -> Type[ResultSchema]:
+    """
+    Endpoint для удаления подписки на пользователя по его id.
+
+    Args:
+        idx: id пользователя по которому запрашивается информация
+        user: текущий авторизованный пользователь
+        session: асинхронная сессия для подключения к базе данных
+
+    Returns:
+        ResultSchema: простой ответ, что подписка удалена успешно
+    """
+    await delete_follower_by_id(idx=idx, user_id=user.id, session=session)
+
+    return ResultSchema
+
+
+@router.post(
+    '/users/follow:batch',
+    response_model=FollowBatchResultSchema,
+    responses=ODD_RESPONSES,
+    dependencies=[Security(api_key_header)],
+)
+async def add_new_followers_batch(
+    batch: FollowBatchSchema,
+    user: Annotated[UserSchema, Depends(get_authorized_user)],
+    session: SessionDep,
+) -> dict:
+    """
+    Endpoint для подписки сразу на несколько пользователей.
+
+    Args:
+        batch: id пользователей, на которых нужно подписаться
+        user: текущий авторизованный пользователь
+        session: асинхронная сессия для подключения к базе данных
+
+    Returns:
+        dict: результат подписки для каждого id
+    """
+    results: list = await add_followers_by_ids(
+        ids=batch.ids, user_id=user.id, session=session,
+    )
+    return {'result': 'true', 'results': results}
+
+
+@router.delete(
+    '/users/follow:batch',
+    response_model=FollowBatchResultSchema,
+    responses=ODD_RESPONSES,
+    dependencies=[Security(api_key_header)],
+)
+async def delete_followers_batch(
+    batch: FollowBatchSchema,
+    user: Annotated[UserSchema, Depends(get_authorized_user)],
+    session: SessionDep,
+) -> dict:
+    """
+    Endpoint для отписки сразу от нескольких пользователей.
+
+    Args:
+        batch: id пользователей, от которых нужно отписаться
+        user: текущий авторизованный пользователь
+        session: асинхронная сессия для подключения к базе данных
+
+    Returns:
+        dict: результат отписки для каждого id
+    """
+    results: list = await delete_followers_by_ids(
+        ids=batch.ids, user_id=user.id, session=session,
+    )
+    return {'result': 'true', 'results': results}
+
+
+@router.get(
+    '/users/me/suggestions',
+    response_model=SuggestionListSchema,
+    responses=ODD_RESPONSES,
+    dependencies=[Security(api_key_header)],
+)
+async def get_my_suggestions(
+    user: Annotated[UserSchema, Depends(get_authorized_user)],
+    session: SessionDep,
+    limit: SuggestionLimit = None,
+) -> dict:
+    """
+    Endpoint для получения рекомендаций "кого читать" текущему пользователю.
+
+    Рекомендации заранее рассчитываются фоновой задачей.
+
+    Args:
+        user: текущий авторизованный пользователь
+        session: асинхронная сессия для подключения к базе данных
+        limit: количество рекомендаций
+
+    Returns:
+        dict: рекомендованные пользователи
+    """
+    users: list = await get_user_suggestions(
+        user_id=user.id,
+        limit=limit or settings.suggestions_size,
+        session=session,
+    )
+    return {'result': 'true', 'users': users}
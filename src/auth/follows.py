@@ -0,0 +1,223 @@
+"""Модуль подписки и отписки пользователей."""
+from typing import Any, List, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import literal, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.auth.cache import profile_versions
+from src.auth.graph import follow_graph
+from src.auth.models import User, followers
+from src.tweet.timeline import backfill_timelines, clear_timelines
+
+FOLLOW_STATUSES: dict = {
+    None: 'not_found',
+    True: 'followed',
+    False: 'already_following',
+}
+UNFOLLOW_STATUSES: dict = {True: 'unfollowed', False: 'not_following'}
+
+
+async def delete_follower_by_id(
+    idx: int,
+    user_id: int,
+    session: AsyncSession,
+) -> None:
+    """
+    Функция удаления подписки на другого пользователя.
+
+    Args:
+        idx: id пользователя, подписку на которого хотим удалить
+        user_id: id текущего пользователя
+        session: сессия подключения к базе данных
+
+    Raises:
+        HTTPException: если текущий пользователь не подписан на пользователя,
+        от которого хочет отписаться
+    """
+    deleted: Optional[int] = await session.scalar(
+        unfollow_query(user_id=user_id, ids=[idx]),
+    )
+    if not deleted:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+
+    await session.commit()
+    follow_graph.remove(user_id, idx)
+    profile_versions.bump(user_id, idx)
+
+
+async def add_follower_by_id(
+    idx: int,
+    user_id: int,
+    session: AsyncSession,
+) -> None:
+    """
+    Функция добавления подписки на другого пользователя.
+
+    Args:
+        idx: id пользователя, подписку на которого хотим добавить
+        user_id: id текущего пользователя
+        session: сессия подключения к базе данных
+
+    Raises:
+        HTTPException: если пользователя нет в базе данных или текущий
+        пользователь уже подписан на пользователя, на которого хочет
+        подписаться
+    """
+    inserted: Any = (
+        pg_insert(followers).
+        values(user_id=user_id, following_id=idx).
+        on_conflict_do_nothing().
+        returning(followers.c.user_id, followers.c.following_id).
+        cte('inserted')
+    )
+    query: Any = (
+        select(inserted.c.following_id).
+        add_cte(backfill_timelines(inserted))
+    )
+    try:
+        added: Optional[int] = await session.scalar(query)
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    if not added:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='You are already subscribed',
+        )
+
+    await session.commit()
+    follow_graph.add(user_id, idx)
+    profile_versions.bump(user_id, idx)
+
+
+async def add_followers_by_ids(
+    ids: List[int],
+    user_id: int,
+    session: AsyncSession,
+) -> List[dict]:
+    """
+    Функция пакетной подписки на пользователей.
+
+    Все подписки добавляются одним запросом: INSERT в CTE вставляет
+    подписки на существующих пользователей, а внешний SELECT сообщает,
+    какие из них были новыми.
+
+    Args:
+        ids: id пользователей, на которых нужно подписаться
+        user_id: id текущего пользователя
+        session: сессия подключения к базе данных
+
+    Returns:
+        List[dict]: результат для каждого id (followed, already_following
+        или not_found)
+    """
+    ids = list(dict.fromkeys(ids))
+    result: Any = await session.execute(follow_batch_query(user_id, ids))
+    found: dict = dict(result.tuples().all())
+    await session.commit()
+    added: List[int] = [idx for idx in ids if found.get(idx)]
+    for following_id in added:
+        follow_graph.add(user_id, following_id)
+    if added:
+        profile_versions.bump(user_id, *added)
+
+    return [
+        {'id': idx, 'status': FOLLOW_STATUSES[found.get(idx)]}
+        for idx in ids
+    ]
+
+
+def follow_batch_query(user_id: int, ids: List[int]) -> Any:
+    """
+    Функция построения запроса пакетной подписки на пользователей.
+
+    Args:
+        user_id: id текущего пользователя
+        ids: id пользователей, на которых нужно подписаться
+
+    Returns:
+        Any: запрос id существующих пользователей и признака новой подписки
+    """
+    inserted: Any = (
+        pg_insert(followers).
+        from_select(
+            ['user_id', 'following_id'],
+            select(literal(user_id), User.id).where(User.id.in_(ids)),
+        ).
+        on_conflict_do_nothing().
+        returning(followers.c.user_id, followers.c.following_id).
+        cte('inserted')
+    )
+    is_new: Any = inserted.c.following_id.is_not(None)
+
+    return (
+        select(User.id, is_new).
+        outerjoin(inserted, inserted.c.following_id == User.id).
+        where(User.id.in_(ids)).
+        add_cte(backfill_timelines(inserted))
+    )
+
+
+async def delete_followers_by_ids(
+    ids: List[int],
+    user_id: int,
+    session: AsyncSession,
+) -> List[dict]:
+    """
+    Функция пакетной отписки от пользователей одним запросом.
+
+    Args:
+        ids: id пользователей, от которых нужно отписаться
+        user_id: id текущего пользователя
+        session: сессия подключения к базе данных
+
+    Returns:
+        List[dict]: результат для каждого id (unfollowed или not_following)
+    """
+    ids = list(dict.fromkeys(ids))
+    deleted: set = set(
+        await session.scalars(unfollow_query(user_id=user_id, ids=ids)),
+    )
+    await session.commit()
+    for following_id in deleted:
+        follow_graph.remove(user_id, following_id)
+    if deleted:
+        profile_versions.bump(user_id, *deleted)
+
+    return [
+        {'id': idx, 'status': UNFOLLOW_STATUSES[idx in deleted]}
+        for idx in ids
+    ]
+
+
+def unfollow_query(user_id: int, ids: List[int]) -> Any:
+    """
+    Функция построения запроса отписки от пользователей.
+
+    Подписки удаляются в CTE вместе с твитами этих пользователей из
+    ленты (timeline) текущего пользователя.
+
+    Args:
+        user_id: id текущего пользователя
+        ids: id пользователей, от которых нужно отписаться
+
+    Returns:
+        Any: запрос, возвращающий id пользователей, от которых отписались
+    """
+    deleted: Any = (
+        followers.delete().
+        where(
+            followers.c.user_id == user_id,
+            followers.c.following_id.in_(ids),
+        ).
+        returning(followers.c.user_id, followers.c.following_id).
+        cte('deleted')
+    )
+
+    return (
+        select(deleted.c.following_id).
+        add_cte(clear_timelines(deleted))
+    )
@@ -0,0 +1,195 @@
+"""
+Модуль индекса графа подписок в памяти.
+
+Граф хранится в формате CSR (src.auth.adjacency) для обоих направлений.
+Одна связь занимает 4 байта в каждом направлении, против нескольких
+сотен байт у ORM объекта User в коллекции relationship.
+
+Изменения после загрузки учитываются при каждом чтении. Граф
+перезагружается из базы фоновой задачей каждые
+follow_graph_reload_interval секунд, при этом изменения, сделанные во
+время загрузки, переносятся в новый граф.
+
+Пока граф загружен, все чтения подписок (количества, списки и страницы
+подписчиков и подписок, проверка "подписан ли A на B") идут из него.
+Подписки этого процесса видны в них сразу, а сделанные другими
+процессами приложения - после ближайшей перезагрузки.
+"""
+import asyncio
+from array import array
+from logging import getLogger
+from typing import Any, List, Optional, Tuple
+
+from prometheus_client import Gauge
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.auth.adjacency import Adjacency, build_adjacency, empty_adjacency
+from src.auth.models import followers
+from src.config import Settings, get_settings
+
+settings: Settings = get_settings()
+logger: Any = getLogger(__name__)
+
+FOLLOW_GRAPH_EDGES: Gauge = Gauge(
+    'app_follow_graph_edges',
+    'Number of follows in the in-memory follow graph',
+)
+FOLLOW_GRAPH_BYTES: Gauge = Gauge(
+    'app_follow_graph_bytes',
+    'Memory used by the arrays of the in-memory follow graph',
+)
+
+FollowChange = Tuple[int, int, bool]
+
+
+class FollowGraph(object):
+    """
+    Класс индекса графа подписок в памяти.
+
+    Количество и страницы подписок читаются из following, подписчиков -
+    из followers.
+    """
+
+    def __init__(self) -> None:
+        """Метод инициализации пустого, еще не загруженного графа."""
+        self.following: Adjacency = empty_adjacency()
+        self.followers: Adjacency = empty_adjacency()
+        self.loaded: bool = False
+        self._journal: Optional[List[FollowChange]] = None
+
+    async def load(
+        self,
+        session: AsyncSession,
+        batch_size: int = 10000,
+    ) -> None:
+        """
+        Метод загрузки графа из таблицы followers.
+
+        Подписки, измененные во время загрузки, записываются в журнал
+        и применяются к новому графу перед заменой.
+
+        Args:
+            session: асинхронная сессия подключения к базе данных
+            batch_size: количество строк, читаемых за один раз
+        """
+        journal: List[FollowChange] = []
+        self._journal = journal
+        # Журнал снимается и после ошибки чтения, иначе он рос бы без конца.
+        try:  # noqa: WPS501
+            following, graph_followers = build_adjacency(
+                *await read_follows(session, batch_size),
+            )
+        finally:
+            self._journal = None
+
+        self.following = following
+        self.followers = graph_followers
+        for change in journal:
+            self._apply(*change)
+        self.loaded = True
+        FOLLOW_GRAPH_EDGES.set(len(following.base.targets))
+        FOLLOW_GRAPH_BYTES.set(self.memory_bytes())
+
+    def add(self, user_id: int, following_id: int) -> None:
+        """
+        Метод добавления подписки после ее записи в базу данных.
+
+        Args:
+            user_id: id подписчика
+            following_id: id пользователя, на которого подписка
+        """
+        self._apply(user_id, following_id, added=True)
+
+    def remove(self, user_id: int, following_id: int) -> None:
+        """
+        Метод удаления подписки после ее удаления из базы данных.
+
+        Args:
+            user_id: id подписчика
+            following_id: id пользователя, на которого была подписка
+        """
+        self._apply(user_id, following_id, added=False)
+
+    def memory_bytes(self) -> int:
+        """
+        Метод подсчета памяти, занятой массивами графа.
+
+        Returns:
+            int: размер массивов в байтах
+        """
+        following_bytes: int = self.following.base.memory_bytes()
+
+        return following_bytes + self.followers.base.memory_bytes()
+
+    def _apply(self, user_id: int, following_id: int, added: bool) -> None:
+        if self._journal is not None:
+            self._journal.append((user_id, following_id, added))
+        if added:
+            self.following.add(user_id, following_id)
+            self.followers.add(following_id, user_id)
+        else:
+            self.following.remove(user_id, following_id)
+            self.followers.remove(following_id, user_id)
+
+
+async def read_follows(
+    session: AsyncSession,
+    batch_size: int,
+) -> Tuple[array, array]:
+    """
+    Функция чтения всех подписок из таблицы followers.
+
+    Args:
+        session: асинхронная сессия подключения к базе данных
+        batch_size: количество строк, читаемых за один раз
+
+    Returns:
+        Tuple[array, array]: id подписчиков и id пользователей, на которых
+        подписка, по возрастанию (user_id, following_id)
+    """
+    sources: array = array('i')
+    targets: array = array('i')
+    result: Any = await session.stream(follows_query(batch_size))
+    async for rows in result.partitions():
+        for row in rows:
+            sources.append(row.user_id)
+            targets.append(row.following_id)
+
+    return sources, targets
+
+
+def follows_query(batch_size: int) -> Any:
+    """
+    Функция построения запроса всех подписок.
+
+    Args:
+        batch_size: количество строк, читаемых за один раз
+
+    Returns:
+        Any: запрос подписок по возрастанию (user_id, following_id)
+    """
+    return (
+        select(followers.c.user_id, followers.c.following_id).
+        order_by(followers.c.user_id, followers.c.following_id).
+        execution_options(yield_per=batch_size)
+    )
+
+
+follow_graph: FollowGraph = FollowGraph()
+
+
+async def run_follow_graph(session_maker: async_sessionmaker) -> None:
+    """
+    Фоновая задача загрузки и периодической перезагрузки графа подписок.
+
+    Args:
+        session_maker: фабрика асинхронных сессий
+    """
+    while True:
+        try:
+            async with session_maker() as session:
+                await follow_graph.load(session=session)
+        except Exception:
+            logger.exception('Follow graph load failed')
+        await asyncio.sleep(settings.follow_graph_reload_interval)
@@ -2,15 +2,8 @@
 from datetime import datetime
 from typing import Any
 
-from sqlalchemy import (
-    Column,
-    DateTime,
-    ForeignKey,
-    Integer,
-    String,
-    Table,
-    text,
-)
+from sqlalchemy import Column, ForeignKey, Index, Table, text
+from sqlalchemy.types import DateTime, Float, Integer, String
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import declarative_base, relationship
 
@@ -19,8 +12,13 @@ BaseAuth: Any = declarative_base()
 followers: Table = Table(
     'followers',
     BaseAuth.metadata,
-    Column('user_id', Integer, ForeignKey('user.id')),
-    Column('following_id', Integer, ForeignKey('user.id')),
+    Column('user_id', Integer, ForeignKey('user.id'), primary_key=True),
+    Column('following_id', Integer, ForeignKey('user.id'), primary_key=True),
+    Index(
+        'ix_followers_following_id_user_id',
+        'following_id',
+        'user_id',
+    ),
 )
 
 
@@ -34,13 +32,14 @@ class User(BaseAuth):
     email = Column(String, nullable=False, unique=True)
     password = Column(String, nullable=False)
     registered_at = Column(DateTime, default=datetime.utcnow())
+    suggestions_refreshed_at = Column(DateTime, nullable=True)
     all_followers = relationship(
         'User',
         secondary=followers,
         primaryjoin=(followers.c.following_id == id),
         secondaryjoin=(followers.c.user_id == id),
         back_populates='all_following',
-        lazy='selectin',
+        lazy='raise',
     )
     all_following = relationship(
         'User',
@@ -48,7 +47,7 @@ class User(BaseAuth):
         primaryjoin=(followers.c.user_id == id),
         secondaryjoin=(followers.c.following_id == id),
         back_populates='all_followers',
-        lazy='selectin',
+        lazy='raise',
     )
 
     def to_json(self) -> dict:
@@ -79,3 +78,34 @@ class ApiKey(BaseAuth):
         index=True,
     )  # CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
     user_id = Column(Integer, ForeignKey('user.id'))
+
+
+follow_suggestion: Table = Table(
+    'follow_suggestion',
+    BaseAuth.metadata,
+    Column(
+        'user_id',
+        Integer,
+        ForeignKey('user.id', ondelete='CASCADE'),
+        primary_key=True,
+    ),
+    Column(
+        'suggested_id',
+        Integer,
+        ForeignKey('user.id', ondelete='CASCADE'),
+        primary_key=True,
+    ),
+    Column('mutual_count', Integer, nullable=False),
+    Column('score', Float, nullable=False),
+    Index(
+        'ix_follow_suggestion_user_id_score',
+        'user_id',
+        text('score DESC'),
+    ),
+)
+
+Index(
+    'ix_user_suggestions_refreshed_at',
+    User.suggestions_refreshed_at.asc().nulls_first(),
+    User.id,
+)
@@ -0,0 +1,215 @@
+"""Модуль чтения профиля пользователя из базы данных."""
+from typing import Any, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import exists, func, literal, literal_column, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.auth.cache import profile_versions
+from src.auth.crud import follow_columns, follow_page_query
+from src.auth.graph import follow_graph
+from src.auth.models import User, followers
+from src.config import Settings, get_settings
+from src.etag import make_etag
+
+settings: Settings = get_settings()
+
+
+async def get_all_info_user(
+    user_id: int,
+    session: AsyncSession,
+    viewer_id: Optional[int] = None,
+) -> dict:
+    """
+    Функция получения всей информации о пользователе из базы данных по его id.
+
+    Кроме полных списков подписчиков и подписок возвращаются их количество
+    и первые profile_preview_size из каждого списка, все одним запросом.
+    Если загружен граф подписок в памяти, количества, списки и is_followed
+    берутся из него.
+    Если профиль запрашивает другой пользователь, is_followed показывает,
+    подписан ли он.
+
+    Args:
+        user_id: id пользователя
+        session: сессия подключения к базе данных
+        viewer_id: id пользователя, который запрашивает профиль
+
+    Returns:
+        dict: словарь с информацией о запрошенном пользователе
+
+    Raises:
+        HTTPException: если пользователя нет в базе данных
+    """
+    preview_size: int = settings.profile_preview_size
+    query: Any = (
+        select(
+            User.id,
+            User.name,
+            *follow_counts(user_id),
+            is_followed_query(user_id, viewer_id),
+            *follow_lists(user_id, following=False, size=preview_size),
+            *follow_lists(user_id, following=True, size=preview_size),
+        ).
+        where(User.id == user_id)
+    )
+    user_info: Optional[Any] = (await session.execute(query)).first()
+    if not user_info:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+
+    return {
+        'id': user_info.id,
+        'name': user_info.name,
+        'followers_count': user_info.followers_count,
+        'following_count': user_info.following_count,
+        'is_followed': user_info.is_followed,
+        'followers': user_info.followers,
+        'following': user_info.following,
+        'followers_preview': user_info.followers_preview,
+        'following_preview': user_info.following_preview,
+    }
+
+
+def follow_counts(user_id: int) -> tuple:
+    """
+    Функция построения колонок количества подписчиков и подписок.
+
+    Args:
+        user_id: id пользователя
+
+    Returns:
+        tuple: колонки followers_count и following_count
+    """
+    if follow_graph.loaded:
+        return (
+            literal(follow_graph.followers.count(user_id)).
+            label('followers_count'),
+            literal(follow_graph.following.count(user_id)).
+            label('following_count'),
+        )
+
+    return (
+        follow_count_query(user_id=user_id, following=False),
+        follow_count_query(user_id=user_id, following=True),
+    )
+
+
+def is_followed_query(user_id: int, viewer_id: Optional[int]) -> Any:
+    """
+    Функция построения колонки подписки пользователя на профиль.
+
+    Args:
+        user_id: id пользователя профиля
+        viewer_id: id пользователя, который запрашивает профиль
+
+    Returns:
+        Any: колонка is_followed
+    """
+    if follow_graph.loaded:
+        following: Any = follow_graph.following
+        followed: Any = literal(
+            viewer_id is not None and following.contains(viewer_id, user_id),
+        )
+    else:
+        followed = exists().where(
+            followers.c.user_id == viewer_id,
+            followers.c.following_id == user_id,
+        )
+
+    return followed.label('is_followed')
+
+
+def follow_count_query(user_id: int, following: bool) -> Any:
+    """
+    Функция построения подзапроса количества подписчиков или подписок.
+
+    Args:
+        user_id: id пользователя
+        following: True - подписки пользователя, False - его подписчики
+
+    Returns:
+        Any: скалярный подзапрос количества
+    """
+    owner, _ = follow_columns(following)
+
+    return (
+        select(func.count()).
+        select_from(followers).
+        where(owner == user_id).
+        scalar_subquery().
+        label('following_count' if following else 'followers_count')
+    )
+
+
+def follow_lists(user_id: int, following: bool, size: int) -> tuple:
+    """
+    Функция построения колонок списка и превью подписчиков или подписок.
+
+    Args:
+        user_id: id пользователя
+        following: True - подписки пользователя, False - его подписчики
+        size: количество пользователей в превью
+
+    Returns:
+        tuple: колонки followers и followers_preview или following
+        и following_preview
+    """
+    name: str = 'following' if following else 'followers'
+
+    return (
+        follow_json_query(user_id, following).label(name),
+        follow_json_query(user_id, following, size).label(
+            '{name}_preview'.format(name=name),
+        ),
+    )
+
+
+def follow_json_query(
+    user_id: int,
+    following: bool,
+    size: Optional[int] = None,
+) -> Any:
+    """
+    Функция построения подзапроса подписчиков или подписок в json.
+
+    Args:
+        user_id: id пользователя
+        following: True - подписки пользователя, False - его подписчики
+        size: количество первых пользователей, None - все пользователи
+
+    Returns:
+        Any: скалярный подзапрос json-списка пользователей
+    """
+    users: Any = follow_page_query(user_id, following, None, size).subquery()
+
+    return (
+        select(
+            func.coalesce(
+                func.json_agg(
+                    aggregate_order_by(
+                        func.json_build_object(
+                            'id', users.c.id, 'name', users.c.name,
+                        ),
+                        users.c.id,
+                    ),
+                ),
+                literal_column("'[]'::json"),
+            ),
+        ).
+        scalar_subquery()
+    )
+
+
+def profile_etag(user_id: int, *parts: object) -> str:
+    """
+    Функция формирования ETag профиля пользователя.
+
+    Args:
+        user_id: id пользователя профиля
+        parts: дополнительные части ETag, например id запрашивающего
+
+    Returns:
+        str: значение заголовка ETag
+    """
+    return make_etag('user', user_id, profile_versions.get(user_id), *parts)
@@ -1,7 +1,11 @@
 """Модуль содержащий схемы для пользователя."""
 from typing import List, Optional
 
-from pydantic import BaseModel, UUID4, EmailStr
+from pydantic import BaseModel, UUID4, EmailStr, Field
+
+from src.config import Settings, get_settings
+
+settings: Settings = get_settings()
 
 
 class ApiKeySchema(BaseModel):
@@ -26,8 +30,13 @@ class ResultSchema(BaseModel):
 class UserFollowSchema(UserSchema):
     """Расширенный класс-схема пользователя с подписчиками."""
 
+    followers_count: int = 0
+    following_count: int = 0
+    is_followed: bool = False
     followers: Optional[List[UserSchema]] = []
     following: Optional[List[UserSchema]] = []
+    followers_preview: List[UserSchema] = []
+    following_preview: List[UserSchema] = []
 
 
 class UserMeSchema(ResultSchema):
@@ -36,6 +45,47 @@ class UserMeSchema(ResultSchema):
     user: UserFollowSchema
 
 
+class UserListSchema(ResultSchema):
+    """Класс-схема страницы подписчиков или подписок пользователя."""
+
+    users: List[UserSchema]
+    next_cursor: Optional[str] = None
+
+
+class SuggestionSchema(UserSchema):
+    """Класс-схема рекомендованного пользователя."""
+
+    mutual_count: int
+
+
+class SuggestionListSchema(ResultSchema):
+    """Класс-схема рекомендаций "кого читать"."""
+
+    users: List[SuggestionSchema]
+
+
+class FollowBatchSchema(BaseModel):
+    """Класс-схема списка id пользователей для пакетной подписки."""
+
+    ids: List[int] = Field(
+        min_length=1,
+        max_length=settings.follow_batch_max_size,
+    )
+
+
+class FollowOutcomeSchema(BaseModel):
+    """Класс-схема результата подписки на одного пользователя из пакета."""
+
+    id: int
+    status: str
+
+
+class FollowBatchResultSchema(ResultSchema):
+    """Класс-схема результатов пакетной подписки или отписки."""
+
+    results: List[FollowOutcomeSchema]
+
+
 class UserLoginSchema(BaseModel):
     """Класс-схема для валидации входящих данных.
 
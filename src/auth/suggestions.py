@@ -0,0 +1,289 @@
+"""
+Модуль рекомендаций "кого читать".
+
+Кандидаты для пользователя - те, на кого подписаны его подписки
+(друзья друзей), кроме него самого и тех, на кого он уже подписан.
+Рейтинг кандидата:
+
+    score = количество подписок пользователя, подписанных на кандидата
+        + suggestions_popularity_weight * log10(1 + подписчики кандидата)
+
+Первые suggestions_size кандидатов сохраняются в таблицу
+follow_suggestion фоновой задачей. Сначала обрабатываются пользователи
+без рекомендаций, затем те, чьи рекомендации старше suggestions_ttl.
+Эндпоинт только читает готовую таблицу.
+"""
+import asyncio
+from datetime import datetime, timedelta
+from logging import getLogger
+from typing import Any, List
+
+from sqlalchemy import delete, exists, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.auth.models import User, follow_suggestion, followers
+from src.config import Settings, get_settings
+
+settings: Settings = get_settings()
+logger: Any = getLogger(__name__)
+
+
+def suggestions_query(user_ids: List[int], size: int) -> Any:
+    """
+    Функция построения запроса лучших кандидатов для пачки пользователей.
+
+    Args:
+        user_ids: id пользователей пачки
+        size: количество кандидатов на пользователя
+
+    Returns:
+        Any: запрос (user_id, suggested_id, mutual_count, score)
+    """
+    candidates: Any = candidates_query(user_ids)
+    popularity: Any = popularity_query(candidates)
+    scored: Any = (
+        select(
+            candidates.c.user_id,
+            candidates.c.suggested_id,
+            candidates.c.mutual_count,
+            suggestion_score(
+                candidates.c.mutual_count, popularity.c.followers_count,
+            ),
+        ).
+        join(
+            popularity,
+            popularity.c.following_id == candidates.c.suggested_id,
+        ).
+        subquery('scored')
+    )
+    ranked: Any = select(
+        scored,
+        func.row_number().over(
+            partition_by=scored.c.user_id,
+            order_by=(scored.c.score.desc(), scored.c.suggested_id),
+        ).label('position'),
+    ).subquery('ranked')
+
+    return (
+        select(
+            ranked.c.user_id,
+            ranked.c.suggested_id,
+            ranked.c.mutual_count,
+            ranked.c.score,
+        ).
+        where(ranked.c.position <= size)
+    )
+
+
+def candidates_query(user_ids: List[int]) -> Any:
+    """
+    Функция построения CTE кандидатов (друзей друзей) для пачки пользователей.
+
+    Args:
+        user_ids: id пользователей пачки
+
+    Returns:
+        Any: CTE (user_id, suggested_id, mutual_count)
+    """
+    mine: Any = followers.alias('mine')
+    theirs: Any = followers.alias('theirs')
+    already: Any = followers.alias('already')
+
+    return (
+        select(
+            mine.c.user_id,
+            theirs.c.following_id.label('suggested_id'),
+            func.count().label('mutual_count'),
+        ).
+        join(theirs, theirs.c.user_id == mine.c.following_id).
+        where(
+            mine.c.user_id.in_(user_ids),
+            theirs.c.following_id != mine.c.user_id,
+            ~exists().where(
+                already.c.user_id == mine.c.user_id,
+                already.c.following_id == theirs.c.following_id,
+            ),
+        ).
+        group_by(mine.c.user_id, theirs.c.following_id).
+        cte('candidates')
+    )
+
+
+def popularity_query(candidates: Any) -> Any:
+    """
+    Функция построения CTE количества подписчиков кандидатов.
+
+    Args:
+        candidates: CTE кандидатов с колонкой suggested_id
+
+    Returns:
+        Any: CTE (following_id, followers_count)
+    """
+    popular: Any = followers.alias('popular')
+
+    return (
+        select(
+            popular.c.following_id,
+            func.count().label('followers_count'),
+        ).
+        where(popular.c.following_id.in_(select(candidates.c.suggested_id))).
+        group_by(popular.c.following_id).
+        cte('popularity')
+    )
+
+
+def suggestion_score(mutual_count: Any, followers_count: Any) -> Any:
+    """
+    Функция построения SQL выражения рейтинга кандидата.
+
+    Args:
+        mutual_count: количество общих подписок с кандидатом
+        followers_count: количество подписчиков кандидата
+
+    Returns:
+        Any: выражение рейтинга с меткой score
+    """
+    popularity: Any = func.log(1 + followers_count)
+    weighted: Any = settings.suggestions_popularity_weight * popularity
+
+    return (mutual_count + weighted).label('score')
+
+
+async def refresh_suggestions(session: AsyncSession, batch_size: int) -> int:
+    """
+    Функция пересчета рекомендаций для пачки пользователей.
+
+    Пачка выбирается с FOR NO KEY UPDATE SKIP LOCKED, поэтому несколько
+    процессов приложения могут пересчитывать рекомендации одновременно,
+    а блокировка строк user не мешает подпискам на этих пользователей
+    и другим вставкам со ссылкой на них.
+
+    Args:
+        session: асинхронная сессия подключения к базе данных
+        batch_size: максимальное количество пользователей в пачке
+
+    Returns:
+        int: количество пользователей, для которых пересчитаны рекомендации
+    """
+    user_ids: List[int] = list(
+        await session.scalars(stale_users_query(batch_size)),
+    )
+    if user_ids:
+        await store_suggestions(session, user_ids)
+    await session.commit()
+
+    return len(user_ids)
+
+
+def stale_users_query(batch_size: int) -> Any:
+    """
+    Функция построения запроса пачки пользователей для пересчета.
+
+    Args:
+        batch_size: максимальное количество пользователей в пачке
+
+    Returns:
+        Any: запрос id пользователей без рекомендаций или с устаревшими
+    """
+    stale_before: datetime = datetime.utcnow() - timedelta(
+        seconds=settings.suggestions_ttl,
+    )
+    refreshed_at: Any = User.suggestions_refreshed_at
+
+    return (
+        select(User.id).
+        where(or_(refreshed_at.is_(None), refreshed_at < stale_before)).
+        order_by(refreshed_at.asc().nulls_first(), User.id).
+        limit(batch_size).
+        with_for_update(skip_locked=True, key_share=True)
+    )
+
+
+async def store_suggestions(
+    session: AsyncSession,
+    user_ids: List[int],
+) -> None:
+    """
+    Функция замены рекомендаций пачки пользователей.
+
+    Args:
+        session: асинхронная сессия подключения к базе данных
+        user_ids: id пользователей пачки
+    """
+    await session.execute(
+        delete(follow_suggestion).
+        where(follow_suggestion.c.user_id.in_(user_ids)),
+    )
+    await session.execute(
+        follow_suggestion.insert().from_select(
+            ['user_id', 'suggested_id', 'mutual_count', 'score'],
+            suggestions_query(user_ids, size=settings.suggestions_size),
+        ),
+    )
+    await session.execute(
+        update(User).
+        where(User.id.in_(user_ids)).
+        values(suggestions_refreshed_at=datetime.utcnow()),
+    )
+
+
+async def get_user_suggestions(
+    user_id: int,
+    limit: int,
+    session: AsyncSession,
+) -> List[dict]:
+    """
+    Функция получения рекомендаций пользователя из готовой таблицы.
+
+    Пользователи, на которых он подписался после пересчета, пропускаются.
+
+    Args:
+        user_id: id пользователя
+        limit: количество рекомендаций
+        session: асинхронная сессия подключения к базе данных
+
+    Returns:
+        List[dict]: рекомендованные пользователи и количество общих подписок
+    """
+    suggested: Any = select(
+        User.id, User.name, follow_suggestion.c.mutual_count,
+    ).join(follow_suggestion, follow_suggestion.c.suggested_id == User.id)
+    followed: Any = exists().where(
+        followers.c.user_id == user_id,
+        followers.c.following_id == User.id,
+    )
+    query: Any = (
+        suggested.
+        where(follow_suggestion.c.user_id == user_id, ~followed).
+        order_by(follow_suggestion.c.score.desc(), User.id).
+        limit(limit)
+    )
+
+    return [
+        {'id': row.id, 'name': row.name, 'mutual_count': row.mutual_count}
+        for row in await session.execute(query)
+    ]
+
+
+async def run_suggestions(session_maker: async_sessionmaker) -> None:
+    """
+    Фоновая задача пересчета рекомендаций.
+
+    Пересчитывает пачки, пока есть пользователи с устаревшими
+    рекомендациями, затем ждет suggestions_interval секунд.
+
+    Args:
+        session_maker: фабрика асинхронных сессий
+    """
+    while True:
+        try:
+            async with session_maker() as session:
+                refreshed: int = await refresh_suggestions(
+                    session=session,
+                    batch_size=settings.suggestions_batch_size,
+                )
+        except Exception:
+            logger.exception('Follow suggestions refresh failed')
+            refreshed = 0
+        if refreshed < settings.suggestions_batch_size:
+            await asyncio.sleep(settings.suggestions_interval)
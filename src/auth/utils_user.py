@@ -1,9 +1,147 @@
 """Модуль с дополнительными функциями."""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from typing import Any, Callable
 
-from fastapi import Request
+from fastapi import HTTPException, Request, status
 from passlib.context import CryptContext
+from prometheus_client import Counter, Gauge, Histogram
 
-pwd_context: CryptContext = CryptContext(schemes=['bcrypt'], deprecated='auto')
+from src.config import Settings, get_settings
+
+settings: Settings = get_settings()
+
+PASSWORD_SCHEMES: tuple = ('bcrypt', 'argon2')
+
+
+def make_crypt_context(
+    scheme: str,
+    bcrypt_rounds: int,
+    argon2_time_cost: int,
+    argon2_memory_cost: int,
+) -> CryptContext:
+    """
+    Функция создания контекста хэширования паролей.
+
+    Хэши со схемой или параметрами, отличными от выбранных, считаются
+    устаревшими: они проверяются, но needs_update для них возвращает True.
+    Для схемы argon2 нужен пакет argon2-cffi.
+
+    Args:
+        scheme: схема хэширования новых паролей (bcrypt или argon2)
+        bcrypt_rounds: стоимость bcrypt (log2 количества раундов)
+        argon2_time_cost: количество итераций argon2
+        argon2_memory_cost: объем памяти argon2 в KiB
+
+    Returns:
+        CryptContext: контекст хэширования паролей
+    """
+    return CryptContext(
+        schemes=list(PASSWORD_SCHEMES),
+        default=scheme,
+        deprecated='auto',
+        bcrypt__default_rounds=bcrypt_rounds,
+        bcrypt__min_rounds=bcrypt_rounds,
+        bcrypt__max_rounds=bcrypt_rounds,
+        argon2__time_cost=argon2_time_cost,
+        argon2__memory_cost=argon2_memory_cost,
+    )
+
+
+pwd_context: CryptContext = make_crypt_context(
+    scheme=settings.password_scheme,
+    bcrypt_rounds=settings.password_bcrypt_rounds,
+    argon2_time_cost=settings.password_argon2_time_cost,
+    argon2_memory_cost=settings.password_argon2_memory_cost,
+)
+
+PASSWORD_QUEUE_DEPTH: Gauge = Gauge(
+    'app_password_queue_depth',
+    'Number of password hash operations waiting for a worker',
+)
+PASSWORD_LATENCY: Histogram = Histogram(
+    'app_password_latency_seconds',
+    'Time of password hash operation including queue wait',
+    ['operation'],
+)
+PASSWORD_REJECTED: Counter = Counter(
+    'app_password_rejected_total',
+    'Number of password hash operations rejected because the queue is full',
+)
+
+
+class PasswordPool(object):
+    """
+    Класс пула потоков для хэширования и проверки паролей.
+
+    bcrypt выполняется вне event loop, а количество ожидающих операций
+    ограничено: при переполнении очереди запрос получает 503.
+    """
+
+    def __init__(self, workers: int, queue_size: int) -> None:
+        """
+        Метод инициализации пула.
+
+        Args:
+            workers: количество потоков для хэширования
+            queue_size: максимальное количество ожидающих операций
+        """
+        self.workers: int = workers
+        self.queue_size: int = queue_size
+        self.pending: int = 0
+        self._executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix='password',
+        )
+
+    async def run(self, operation: str, func: Callable, *args: Any) -> Any:
+        """
+        Метод выполнения операции с паролем в пуле.
+
+        Args:
+            operation: название операции для метрик
+            func: функция для выполнения
+            args: аргументы функции
+
+        Returns:
+            Any: результат функции
+
+        Raises:
+            HTTPException: если очередь пула переполнена
+        """
+        if self.pending >= self.workers + self.queue_size:
+            PASSWORD_REJECTED.inc()
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail='Server is busy, try again later',
+            )
+
+        self._change_pending(1)
+        started: float = perf_counter()
+        # Место в очереди освобождается и при ошибке, и при отмене запроса.
+        try:  # noqa: WPS501
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, func, *args,
+            )
+        finally:
+            self._change_pending(-1)
+            latency: float = perf_counter() - started
+            PASSWORD_LATENCY.labels(operation).observe(latency)
+
+    def shutdown(self) -> None:
+        """Метод остановки потоков пула."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _change_pending(self, delta: int) -> None:
+        self.pending += delta
+        PASSWORD_QUEUE_DEPTH.set(max(self.pending - self.workers, 0))
+
+
+password_pool: PasswordPool = PasswordPool(
+    workers=settings.password_pool_workers,
+    queue_size=settings.password_queue_size,
+)
 
 
 def hash_password(password) -> str:
@@ -33,6 +171,48 @@ def validate_password(password: str, hashed_password: str) -> bool:
     return pwd_context.verify(password, hashed_password)
 
 
+def password_needs_update(hashed_password: str) -> bool:
+    """
+    Функция проверки, нужно ли перехэшировать пароль с текущими параметрами.
+
+    Args:
+        hashed_password: пароль в базе данных
+
+    Returns:
+        bool: True, если хэш получен устаревшей схемой или параметрами
+    """
+    return pwd_context.needs_update(hashed_password)
+
+
+async def hash_password_async(password: str) -> str:
+    """
+    Функция получения хэшированного пароля в пуле потоков.
+
+    Args:
+        password: пароль введенный пользователем
+
+    Returns:
+        str: хэшированный пароль
+    """
+    return await password_pool.run('hash', hash_password, password)
+
+
+async def validate_password_async(password: str, hashed_password: str) -> bool:
+    """
+    Функция проверки пароля в пуле потоков.
+
+    Args:
+        password: пароль введенный пользователем
+        hashed_password: пароль в базе данных
+
+    Returns:
+        bool: True, если пароли совпадают, False, если нет
+    """
+    return await password_pool.run(
+        'verify', validate_password, password, hashed_password,
+    )
+
+
 async def get_apikey_from_headers(request: Request) -> str:
     """
     Функция получения api-key текущего пользователя из headers.
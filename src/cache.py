@@ -0,0 +1,135 @@
+"""Модуль с in-process кэшем для ответов и справочных данных."""
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Callable, Hashable, Optional
+
+from prometheus_client import Counter
+
+CACHE_HITS: Counter = Counter(
+    'app_cache_hits_total',
+    'Number of cache hits',
+    ['cache'],
+)
+CACHE_MISSES: Counter = Counter(
+    'app_cache_misses_total',
+    'Number of cache misses',
+    ['cache'],
+)
+CACHE_EVICTIONS: Counter = Counter(
+    'app_cache_evictions_total',
+    'Number of entries evicted from cache by size limit',
+    ['cache'],
+)
+
+
+class TTLCache(object):
+    """
+    Класс LRU-кэша с ограниченным временем жизни записей.
+
+    Кэш живет в памяти процесса и не требует блокировок, так как
+    используется только из event loop.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float) -> None:
+        """
+        Метод инициализации кэша.
+
+        Args:
+            name: название кэша для метрик
+            maxsize: максимальное количество записей
+            ttl: время жизни записи в секундах
+        """
+        self.name: str = name
+        self.maxsize: int = maxsize
+        self.ttl: float = ttl
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Метод получения записи из кэша.
+
+        Args:
+            key: ключ записи
+
+        Returns:
+            Any: значение записи
+            None: если записи нет или ее время жизни истекло
+        """
+        entry: Optional[tuple] = self._entries.get(key)
+        if entry is not None and entry[0] < monotonic():
+            self._entries.pop(key)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            CACHE_MISSES.labels(self.name).inc()
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        CACHE_HITS.labels(self.name).inc()
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Метод добавления записи в кэш с вытеснением самой старой записи.
+
+        Args:
+            key: ключ записи
+            value: значение записи
+        """
+        self._entries[key] = (monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+            CACHE_EVICTIONS.labels(self.name).inc()
+
+    def pop(self, key: Hashable) -> None:
+        """
+        Метод удаления записи из кэша.
+
+        Args:
+            key: ключ записи
+        """
+        self._entries.pop(key, None)
+
+    def pop_if(self, predicate: Callable[[Any], bool]) -> int:
+        """
+        Метод удаления всех записей, значения которых подходят под условие.
+
+        Args:
+            predicate: условие для значения записи
+
+        Returns:
+            int: количество удаленных записей
+        """
+        keys: list = [
+            key
+            for key, (_, entry_value) in self._entries.items()
+            if predicate(entry_value)
+        ]
+        for key in keys:
+            self._entries.pop(key)
+        return len(keys)
+
+    def clear(self) -> None:
+        """Метод удаления всех записей из кэша."""
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Метод получения статистики кэша.
+
+        Returns:
+            dict: размер кэша и счетчики попаданий, промахов и вытеснений
+        """
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
@@ -1,6 +1,6 @@
 """Модуль с настройками приложения."""
 from functools import lru_cache
-from typing import ClassVar
+from typing import ClassVar, Literal
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -43,6 +43,50 @@ class Settings(BaseSettings):
     postgres_password: str
     postgres_db: str
     host_db: str
+    feed_page_size: int = 20
+    feed_max_page_size: int = 100
+    feed_cache_size: int = 256
+    feed_cache_ttl: float = 5
+    feed_raw_snapshots: bool = False
+    feed_stream_batch_size: int = 500
+    tweet_batch_max_size: int = 100
+    like_buffer_enabled: bool = False
+    like_buffer_interval: float = 0.01
+    like_buffer_max_events: int = 1000
+    media_cleanup_enabled: bool = False
+    media_cleanup_batch_size: int = 100
+    media_cleanup_interval: float = 5
+    media_cleanup_retry_delay: float = 60
+    media_cleanup_max_attempts: int = 10
+    password_pool_workers: int = 2
+    password_queue_size: int = 32
+    password_scheme: Literal['bcrypt', 'argon2'] = 'bcrypt'
+    password_bcrypt_rounds: int = 12
+    password_argon2_time_cost: int = 2
+    password_argon2_memory_cost: int = 19456
+    apikey_cache_size: int = 10000
+    apikey_cache_ttl: float = 60
+    apikey_negative_ttl: float = 5
+    profile_preview_size: int = 10
+    follow_page_size: int = 50
+    follow_max_page_size: int = 500
+    follow_batch_max_size: int = 100
+    follow_graph_enabled: bool = False
+    follow_graph_reload_interval: float = 300
+    suggestions_enabled: bool = False
+    suggestions_size: int = 20
+    suggestions_batch_size: int = 500
+    suggestions_interval: float = 60
+    suggestions_ttl: float = 3600
+    suggestions_popularity_weight: float = 0.5
+    timeline_max_length: int = 800
+    timeline_fanout_limit: int = 1000
+    timeline_backfill_size: int = 20
+    ranking_enabled: bool = False
+    ranking_batch_size: int = 5000
+    ranking_interval: float = 1
+    ranking_decay_seconds: float = 45000
+    ranking_author_weight: float = 0.5
 
     @property
     def db_url(self) -> str:
@@ -1,6 +1,7 @@
 """Модуль для создания подключения к базе данных."""
-from typing import AsyncGenerator
+from typing import Annotated, AsyncGenerator
 
+from fastapi import Depends
 from sqlalchemy.ext.asyncio import (
     AsyncSession,
     create_async_engine,
@@ -29,3 +30,20 @@ async def get_session() -> AsyncGenerator:
     """
     async with async_session() as session:
         yield session
+
+
+def get_session_maker() -> async_sessionmaker:
+    """
+    Функция для получения фабрики сессий.
+
+    Нужна фоновым задачам, которые выполняются после ответа, когда
+    сессия запроса уже закрыта.
+
+    Returns:
+         async_sessionmaker: фабрика асинхронных сессий
+    """
+    return async_session
+
+
+SessionDep = Annotated[AsyncSession, Depends(get_session)]
+SessionMakerDep = Annotated[async_sessionmaker, Depends(get_session_maker)]
@@ -0,0 +1,65 @@
+"""Модуль с функциями для условных запросов по ETag."""
+from typing import Optional
+from uuid import uuid4
+
+from fastapi import Request, Response, status
+
+# Версии данных хранятся в памяти процесса и начинаются заново после
+# перезапуска, поэтому в ETag входит идентификатор запуска процесса.
+BOOT_ID_LENGTH: int = 12
+BOOT_ID: str = uuid4().hex[:BOOT_ID_LENGTH]
+
+
+def make_etag(*parts: object) -> str:
+    """
+    Функция формирования сильного ETag из версий данных.
+
+    Args:
+        parts: название ресурса и его версии
+
+    Returns:
+        str: значение заголовка ETag
+    """
+    tag: str = '-'.join([BOOT_ID, *map(str, parts)])
+    return '"{tag}"'.format(tag=tag)
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Функция проверки заголовка If-None-Match.
+
+    Args:
+        request: request
+        etag: текущий ETag ресурса
+
+    Returns:
+        bool: True, если у клиента актуальная версия ресурса
+    """
+    header: str = request.headers.get('if-none-match', '')
+    if header.strip() == '*':
+        return True
+
+    return etag in {
+        client_tag.strip().removeprefix('W/')
+        for client_tag in header.split(',')
+    }
+
+
+def not_modified(etag: str, vary: Optional[str] = None) -> Response:
+    """
+    Функция формирования ответа 304 Not Modified.
+
+    Args:
+        etag: текущий ETag ресурса
+        vary: значение заголовка Vary, если ответ зависит от заголовков
+
+    Returns:
+        Response: пустой ответ 304 с заголовком ETag
+    """
+    headers: dict = {'etag': etag}
+    if vary is not None:
+        headers['vary'] = vary
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers=headers,
+    )
@@ -1,4 +1,7 @@
 """Основной модуль приложения."""
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 from fastapi import FastAPI, status
 from fastapi.exceptions import (
     RequestValidationError,
@@ -6,11 +9,33 @@ from fastapi.exceptions import (
     ResponseValidationError,
 )
 from fastapi.responses import JSONResponse
+from prometheus_client import make_asgi_app
 
+from src.auth.follow_router import router as follow_router
 from src.auth.router import router as auth_router
+from src.database import async_session
+from src.tweet.feed_router import router as feed_router
 from src.tweet.router import router as tweet_router
+from src.workers import start_workers, stop_workers
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    Функция запуска и остановки фоновых задач приложения.
+
+    Args:
+        app: приложение FastAPI
+
+    Yields:
+        None: приложение работает между запуском и остановкой
+    """
+    background_tasks: list = start_workers(session_maker=async_session)
+    yield
+    await stop_workers(background_tasks, session_maker=async_session)
+
 
-app_api: FastAPI = FastAPI(title='Tweeter Clone')
+app_api: FastAPI = FastAPI(title='Tweeter Clone', lifespan=lifespan)
 
 
 @app_api.exception_handler(ResponseValidationError)
@@ -80,4 +105,7 @@ async def http_exception_handler(request, exc) -> JSONResponse:
 
 
 app_api.include_router(prefix='/api', router=auth_router)
+app_api.include_router(prefix='/api', router=follow_router)
 app_api.include_router(prefix='/api', router=tweet_router)
+app_api.include_router(prefix='/api', router=feed_router)
+app_api.mount('/metrics', make_asgi_app())
@@ -0,0 +1,70 @@
+"""Модуль с функциями для keyset-пагинации."""
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as DecodeError
+from typing import Any
+
+from fastapi import HTTPException, status
+
+
+def encode_cursor(*keys: Any) -> str:
+    """
+    Функция кодирования ключа сортировки последней записи в курсор.
+
+    Args:
+        keys: значения ключа сортировки последней записи страницы
+
+    Returns:
+        str: непрозрачный курсор для запроса следующей страницы
+    """
+    raw: bytes = json.dumps(keys, separators=(',', ':')).encode()
+
+    return urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def is_sort_key(keys: Any, size: int) -> bool:
+    """
+    Функция проверки декодированного курсора.
+
+    Args:
+        keys: значения из курсора
+        size: количество значений в ключе сортировки
+
+    Returns:
+        bool: True, если это список из size чисел
+    """
+    if not isinstance(keys, list) or len(keys) != size:
+        return False
+
+    return all(
+        isinstance(key, (int, float)) and not isinstance(key, bool)
+        for key in keys
+    )
+
+
+def decode_cursor(cursor: str, size: int) -> tuple:
+    """
+    Функция декодирования курсора в значения ключа сортировки.
+
+    Args:
+        cursor: курсор, полученный от клиента
+        size: количество значений в ключе сортировки
+
+    Returns:
+        tuple: значения ключа сортировки
+
+    Raises:
+        HTTPException: если курсор поврежден или не подходит к запросу
+    """
+    padding: str = '=' * (-len(cursor) % 4)
+    try:
+        keys: Any = json.loads(urlsafe_b64decode(cursor + padding))
+    except (ValueError, DecodeError):
+        keys = None
+    if not is_sort_key(keys, size):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail='Invalid cursor',
+        )
+
+    return tuple(keys)
@@ -0,0 +1,176 @@
+"""Модуль с кэшем ленты твитов."""
+from gzip import compress
+from typing import Any, Optional
+
+import orjson
+from fastapi import Request, Response
+
+from src.cache import TTLCache
+from src.config import Settings, get_settings
+from src.etag import make_etag
+
+settings: Settings = get_settings()
+
+VARY: str = 'Accept-Encoding'
+
+
+def accepts_gzip(request: Request) -> bool:
+    """
+    Функция проверки, принимает ли клиент ответ в gzip.
+
+    Args:
+        request: request
+
+    Returns:
+        bool: True, если в Accept-Encoding есть gzip
+    """
+    return 'gzip' in request.headers.get('accept-encoding', '')
+
+
+def feed_etag(request: Request, version: int) -> str:
+    """
+    Функция формирования ETag страницы ленты.
+
+    Сжатый снимок страницы - другое представление ресурса, поэтому его
+    ETag отличается суффиксом -gz.
+
+    Args:
+        request: request
+        version: версия ленты
+
+    Returns:
+        str: значение заголовка ETag
+    """
+    if settings.feed_raw_snapshots and accepts_gzip(request):
+        return make_etag('feed', version, 'gz')
+    return make_etag('feed', version)
+
+
+class FeedSnapshot(object):
+    """
+    Класс страницы ленты, сериализованной в JSON один раз.
+
+    Хранит готовые байты ответа и заголовки, а gzip-вариант сжимает при
+    первом запросе с Accept-Encoding: gzip. У gzip-варианта свой ETag
+    с суффиксом -gz, оба варианта отдаются с Vary: Accept-Encoding.
+    """
+
+    __slots__ = ('body', 'headers', '_gzip_body', '_gzip_headers')
+
+    def __init__(self, feed: dict) -> None:
+        """
+        Метод сериализации страницы ленты.
+
+        Args:
+            feed: страница ленты в виде TweetAllSchema
+        """
+        self.body: bytes = orjson.dumps(feed)
+        self.headers: dict = {
+            'content-length': str(len(self.body)),
+            'vary': VARY,
+        }
+        self._gzip_body: Optional[bytes] = None
+        self._gzip_headers: Optional[dict] = None
+
+    def response(self, request: Request, etag: str) -> Response:
+        """
+        Метод формирования ответа из сохраненных байтов.
+
+        Args:
+            request: request
+            etag: ETag страницы, полученный из feed_etag
+
+        Returns:
+            Response: ответ с JSON страницы ленты
+        """
+        if not accepts_gzip(request):
+            return Response(
+                content=self.body,
+                headers={**self.headers, 'etag': etag},
+                media_type='application/json',
+            )
+
+        if self._gzip_body is None:
+            self._gzip_body = compress(self.body, compresslevel=6)
+            self._gzip_headers = {
+                'content-length': str(len(self._gzip_body)),
+                'content-encoding': 'gzip',
+                'vary': VARY,
+            }
+        return Response(
+            content=self._gzip_body,
+            headers={**self._gzip_headers, 'etag': etag},
+            media_type='application/json',
+        )
+
+
+class FeedCache(object):
+    """
+    Класс кэша страниц ленты.
+
+    Для каждой пары (limit, cursor) хранится своя запись. Любое изменение
+    твитов или лайков увеличивает версию ленты, и записи прошлых версий
+    больше не читаются, а вытесняются из кэша по LRU или по TTL.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        """
+        Метод инициализации кэша ленты.
+
+        Args:
+            maxsize: максимальное количество страниц в кэше
+            ttl: время жизни страницы в секундах
+        """
+        self.version: int = 0
+        self.pages: TTLCache = TTLCache(name='feed', maxsize=maxsize, ttl=ttl)
+
+    def get(
+        self,
+        version: int,
+        limit: Optional[int],
+        cursor: Optional[str],
+    ) -> Any:
+        """
+        Метод получения страницы ленты.
+
+        Args:
+            version: версия ленты, прочитанная до запроса к базе данных
+            limit: количество твитов на странице
+            cursor: курсор страницы
+
+        Returns:
+            Any: сохраненная страница ленты или None
+        """
+        return self.pages.get((version, limit, cursor))
+
+    def set(
+        self,
+        version: int,
+        limit: Optional[int],
+        cursor: Optional[str],
+        page: Any,
+    ) -> None:
+        """
+        Метод сохранения страницы ленты.
+
+        Страница не сохраняется, если лента изменилась после того, как
+        была прочитана version: запрос мог вернуть данные до изменения.
+
+        Args:
+            version: версия ленты, прочитанная до запроса к базе данных
+            limit: количество твитов на странице
+            cursor: курсор страницы
+            page: страница ленты
+        """
+        if version == self.version:
+            self.pages.set((version, limit, cursor), page)
+
+    def invalidate(self) -> None:
+        """Метод увеличения версии ленты после изменения твитов или лайков."""
+        self.version += 1
+
+
+feed_cache: FeedCache = FeedCache(
+    maxsize=settings.feed_cache_size,
+    ttl=settings.feed_cache_ttl,
+)
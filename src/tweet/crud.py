@@ -1,25 +1,33 @@
 """Модуль для работы с базой данных(tweet, likes)."""
-from typing import Any, Optional
+from typing import Any, Iterator, List, Optional, Set, Tuple
 
 from fastapi import HTTPException, status
 from sqlalchemy import (
+    column,
     insert,
     delete,
-    and_,
+    func,
+    literal,
     update,
     select,
+    values,
 )
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
-from src.auth.models import User
-from src.tweet.models import Media
-from src.tweet.models import Tweet, likes_table
-from src.tweet.utils import delete_medias
+from src.config import Settings, get_settings
+from src.tweet.cache import feed_cache
+from src.tweet.likes import like_buffer
+from src.tweet.models import Media, Tweet, likes_table, media_deletion
+from src.tweet.ranking import author_followers_count, score_expression
+from src.tweet.timeline import fan_out_tweet, is_fanout_on_read
+
+settings: Settings = get_settings()
 
 
 async def save_image_path(
     file_name: str,
+    user_id: int,
     session: AsyncSession,
 ) -> int:
     """
@@ -27,6 +35,7 @@ async def save_image_path(
 
     Args:
         file_name: название загруженного файла
+        user_id: id пользователя, загрузившего изображение
         session: асинхронная сессия подключения к базе данных
 
     Returns:
@@ -34,7 +43,10 @@ async def save_image_path(
     """
     query: Any = (
         insert(Media).
-        values(media_path='media/{file_name}'.format(file_name=file_name)).
+        values(
+            media_path='media/{file_name}'.format(file_name=file_name),
+            uploader_id=user_id,
+        ).
         returning(Media.id)
     )
     media_id: Optional[int] = await session.scalar(query)
@@ -51,6 +63,10 @@ async def create_tweet(
     """
     Функция для добавления твита в базу данных.
 
+    Изображения прикрепляются одним запросом в той же транзакции.
+    Прикрепить можно только свои, еще не прикрепленные изображения,
+    иначе attach_medias отвечает 404 и твит не сохраняется.
+
     Args:
         tweet: описание твита
         user_id: id пользователя, автора твита
@@ -59,24 +75,291 @@ async def create_tweet(
     Returns:
         int: id сохраненного твита
     """
+    fanout_on_read: bool = await is_fanout_on_read(
+        user_id=user_id,
+        session=session,
+    )
     query_tweet: Any = (
         insert(Tweet).
-        values(tweet_data=tweet['tweet_data'], owner_id=user_id).
+        values(
+            tweet_data=tweet['tweet_data'],
+            owner_id=user_id,
+            fanout_on_read=fanout_on_read,
+            score=score_expression(
+                like_count=0,
+                created_at=func.now(),
+                author_followers=author_followers_count(user_id),
+            ),
+        ).
         returning(Tweet.id)
     )
     tweet_id: Optional[int] = await session.scalar(query_tweet)
-    for media_id in tweet['tweet_media_ids']:
-        query_media: Any = (
-            update(Media).
-            values(tweet_id=tweet_id).
-            where(Media.id == media_id)
-        )
-        await session.execute(query_media)
+    await fan_out_tweet(
+        tweet_ids=[tweet_id],
+        owner_id=user_id,
+        to_followers=not fanout_on_read,
+        session=session,
+    )
+    await attach_medias(
+        tweet_id=tweet_id,
+        media_ids=tweet['tweet_media_ids'],
+        user_id=user_id,
+        session=session,
+    )
     await session.commit()
+    feed_cache.invalidate()
 
     return tweet_id
 
 
+async def create_tweets(
+    tweets: List[dict],
+    user_id: int,
+    session: AsyncSession,
+) -> List[dict]:
+    """
+    Функция пакетного добавления твитов одного автора.
+
+    Твиты сохраняются одним многострочным INSERT в одной транзакции,
+    изображения прикрепляются одним UPDATE. Твит, часть изображений
+    которого нельзя прикрепить, пропускается, остальные сохраняются.
+
+    Args:
+        tweets: описания твитов
+        user_id: id пользователя, автора твитов
+        session: асинхронная сессия подключения к базе данных
+
+    Returns:
+        List[dict]: id и статус каждого твита в порядке tweets
+    """
+    available: Set[int] = await available_medias(tweets, user_id, session)
+    results, accepted = split_tweets(tweets, available)
+    tweet_ids: List[int] = []
+    if accepted:
+        tweet_ids = await insert_tweets(accepted, user_id, session)
+        await attach_batch_medias(accepted, tweet_ids, session)
+    await session.commit()
+    if tweet_ids:
+        feed_cache.invalidate()
+
+    return fill_tweet_ids(results, tweet_ids)
+
+
+def fill_tweet_ids(results: List[dict], tweet_ids: List[int]) -> List[dict]:
+    """
+    Функция записи id сохраненных твитов в их статусы.
+
+    Args:
+        results: статусы твитов в порядке запроса
+        tweet_ids: id сохраненных твитов в порядке статусов created
+
+    Returns:
+        List[dict]: статусы твитов с id сохраненных твитов
+    """
+    created: Iterator[int] = iter(tweet_ids)
+    for result in results:
+        if result['status'] == 'created':
+            result['tweet_id'] = next(created)
+
+    return results
+
+
+async def available_medias(
+    tweets: List[dict],
+    user_id: int,
+    session: AsyncSession,
+) -> Set[int]:
+    """
+    Функция блокировки изображений, которые можно прикрепить к твитам.
+
+    Args:
+        tweets: описания твитов
+        user_id: id пользователя, автора твитов
+        session: асинхронная сессия подключения к базе данных
+
+    Returns:
+        Set[int]: id своих, еще не прикрепленных изображений из запроса
+    """
+    requested: Set[int] = {
+        media_id
+        for tweet in tweets
+        for media_id in tweet['tweet_media_ids'] or ()
+    }
+    if not requested:
+        return set()
+    query: Any = (
+        select(Media.id).
+        where(
+            Media.id.in_(requested),
+            Media.tweet_id.is_(None),
+            Media.uploader_id == user_id,
+        ).
+        with_for_update()
+    )
+
+    return set(await session.scalars(query))
+
+
+def split_tweets(
+    tweets: List[dict],
+    available: Set[int],
+) -> Tuple[List[dict], List[dict]]:
+    """
+    Функция отбора твитов, все изображения которых можно прикрепить.
+
+    Args:
+        tweets: описания твитов
+        available: id изображений, которые можно прикрепить
+
+    Returns:
+        Tuple[List[dict], List[dict]]: статусы твитов в порядке tweets
+        и принятые твиты с их изображениями
+    """
+    results: List[dict] = []
+    accepted: List[dict] = []
+    for tweet in tweets:
+        media_ids: Set[int] = set(tweet['tweet_media_ids'] or ())
+        if not media_ids.issubset(available):
+            results.append({'tweet_id': None, 'status': 'media_not_found'})
+            continue
+        available -= media_ids
+        results.append({'tweet_id': None, 'status': 'created'})
+        accepted.append(
+            {'tweet_data': tweet['tweet_data'], 'media_ids': media_ids},
+        )
+
+    return results, accepted
+
+
+async def insert_tweets(
+    accepted: List[dict],
+    user_id: int,
+    session: AsyncSession,
+) -> List[int]:
+    """
+    Функция сохранения твитов одним многострочным INSERT.
+
+    Args:
+        accepted: принятые твиты
+        user_id: id пользователя, автора твитов
+        session: асинхронная сессия подключения к базе данных
+
+    Returns:
+        List[int]: id сохраненных твитов в порядке accepted
+    """
+    fanout_on_read: bool = await is_fanout_on_read(
+        user_id=user_id,
+        session=session,
+    )
+    score: float = await session.scalar(
+        select(
+            score_expression(
+                like_count=0,
+                created_at=func.now(),
+                author_followers=author_followers_count(user_id),
+            ),
+        ),
+    )
+    tweet_ids: List[int] = list(
+        await session.scalars(
+            insert(Tweet).returning(Tweet.id, sort_by_parameter_order=True),
+            [
+                {
+                    'tweet_data': tweet['tweet_data'],
+                    'owner_id': user_id,
+                    'fanout_on_read': fanout_on_read,
+                    'score': score,
+                }
+                for tweet in accepted
+            ],
+        ),
+    )
+    await fan_out_tweet(
+        tweet_ids=tweet_ids,
+        owner_id=user_id,
+        to_followers=not fanout_on_read,
+        session=session,
+    )
+
+    return tweet_ids
+
+
+async def attach_batch_medias(
+    accepted: List[dict],
+    tweet_ids: List[int],
+    session: AsyncSession,
+) -> None:
+    """
+    Функция прикрепления изображений пачки твитов одним UPDATE.
+
+    Args:
+        accepted: принятые твиты с их изображениями
+        tweet_ids: id сохраненных твитов в порядке accepted
+        session: асинхронная сессия подключения к базе данных
+    """
+    attachments: List[tuple] = [
+        (media_id, tweet_id)
+        for tweet, tweet_id in zip(accepted, tweet_ids)
+        for media_id in tweet['media_ids']
+    ]
+    if not attachments:
+        return
+    attached: Any = values(
+        column('media_id', Media.id.type),
+        column('tweet_id', Media.tweet_id.type),
+        name='attached',
+    ).data(attachments)
+    await session.execute(
+        update(Media).
+        where(Media.id == attached.c.media_id).
+        values(tweet_id=attached.c.tweet_id),
+    )
+
+
+async def attach_medias(
+    tweet_id: int,
+    media_ids: List[int],
+    user_id: int,
+    session: AsyncSession,
+) -> None:
+    """
+    Функция прикрепления изображений к твиту одним запросом.
+
+    Args:
+        tweet_id: id твита
+        media_ids: id прикрепляемых изображений
+        user_id: id пользователя, автора твита
+        session: асинхронная сессия подключения к базе данных
+
+    Raises:
+        HTTPException: если изображения нет, оно уже прикреплено к другому
+            твиту или загружено другим пользователем
+    """
+    if not media_ids:
+        return
+    attached: Set[int] = set(
+        await session.scalars(
+            update(Media).
+            where(
+                Media.id.in_(media_ids),
+                Media.tweet_id.is_(None),
+                Media.uploader_id == user_id,
+            ).
+            values(tweet_id=tweet_id).
+            returning(Media.id),
+        ),
+    )
+    rejected: List[int] = sorted(set(media_ids) - attached)
+    if rejected:
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='Media not found: {ids}'.format(
+                ids=', '.join(str(media_id) for media_id in rejected),
+            ),
+        )
+
+
 async def delete_tweet_by_id(
     idx: int,
     user_id: int,
@@ -85,30 +368,59 @@ async def delete_tweet_by_id(
     """
     Функция для удаления твита из базы данных.
 
+    Проверка существования твита, удаление твита автора и постановка
+    файлов его изображений в очередь удаления (см. src.tweet.media_cleanup)
+    выполняются одним запросом. Лайки, записи лент и изображения
+    удаляются каскадно внешними ключами.
+
     Args:
         idx: id удаляемого твита
         user_id: id пользователя, автора твита
         session: асинхронная сессия подключения к базе данных
 
     Raises:
-        HTTPException: возникает при попытке удалить отсутвующий твит
+        HTTPException: возникает при попытке удалить отсутвующий или
+            чужой твит
     """
-    query_all_path_media: Any = select(Media).where(Media.tweet_id == idx)
-    medias: Any = await session.scalars(query_all_path_media)
-    exist_tweet: Optional[Any] = await session.scalar(
-        select(Tweet).where(Tweet.id == idx),
+    target: Any = (
+        select(Tweet.id).
+        where(Tweet.id == idx).
+        cte('target')
     )
-
-    if not exist_tweet:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
-
-    query_del_tweet: Any = delete(Tweet).where(
-        and_(Tweet.id == idx, Tweet.owner_id == user_id),
+    deleted: Any = (
+        delete(Tweet).
+        where(Tweet.id == idx, Tweet.owner_id == user_id).
+        returning(Tweet.id).
+        cte('deleted')
+    )
+    queued: Any = (
+        media_deletion.insert().
+        from_select(
+            ['media_path'],
+            select(Media.media_path).
+            where(
+                Media.tweet_id.in_(select(deleted.c.id)),
+                Media.media_path.is_not(None),
+            ),
+        ).
+        returning(media_deletion.c.id).
+        cte('queued')
     )
-    await session.execute(query_del_tweet)
-    await delete_medias(medias)
+    row: Any = (await session.execute(
+        select(
+            select(target.c.id).exists().label('found'),
+            select(deleted.c.id).exists().label('deleted'),
+        ).
+        add_cte(queued),
+    )).one()
     await session.commit()
 
+    if not row.found:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    if not row.deleted:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
+    feed_cache.invalidate()
+
 
 async def add_new_like(
     tweet_id: int,
@@ -118,6 +430,11 @@ async def add_new_like(
     """
     Функция для добавления лайка твиту.
 
+    Проверка существования твита, вставка лайка и изменение счетчика
+    выполняются одним запросом. Лайк своего твита не сохраняется.
+    При like_buffer_enabled лайк записывается в буфер (см. src.tweet.likes)
+    и попадает в базу при ближайшем сбросе.
+
     Args:
         tweet_id: id твита
         user_id: id пользователя, который добавляет лайк
@@ -126,20 +443,33 @@ async def add_new_like(
     Raises:
         HTTPException: возникает при попытке лайкнуть отсутвующий твит
     """
-    exist_tweet: Optional[Any] = await session.scalar(
-        select(Tweet).where(Tweet.id == tweet_id),
-    )
-    if not exist_tweet:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
-
-    if exist_tweet.owner_id != user_id:
-        query: Any = (
-            likes_table.
-            insert().
-            values(tweet_id=tweet_id, user_id=user_id)
+    if settings.like_buffer_enabled:
+        owner_id: Optional[int] = await session.scalar(
+            select(Tweet.owner_id).where(Tweet.id == tweet_id),
         )
-        await session.execute(query)
-        await session.commit()
+        if owner_id is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+        if owner_id != user_id:
+            like_buffer.add(tweet_id=tweet_id, user_id=user_id, liked=True)
+        return
+
+    target: Any = (
+        select(Tweet.id, Tweet.owner_id).
+        where(Tweet.id == tweet_id).
+        cte('target')
+    )
+    added: Any = (
+        pg_insert(likes_table).
+        from_select(
+            ['tweet_id', 'user_id'],
+            select(target.c.id, literal(user_id)).
+            where(target.c.owner_id != user_id),
+        ).
+        on_conflict_do_nothing().
+        returning(likes_table.c.tweet_id).
+        cte('added')
+    )
+    await change_like(target=target, changed=added, delta=1, session=session)
 
 
 async def delete_like(
@@ -150,6 +480,11 @@ async def delete_like(
     """
     Функция для удаления лайка у твита.
 
+    Проверка существования твита, удаление лайка и изменение счетчика
+    выполняются одним запросом.
+    При like_buffer_enabled отмена лайка записывается в буфер
+    (см. src.tweet.likes) и попадает в базу при ближайшем сбросе.
+
     Args:
         tweet_id: id твита
         user_id: id пользователя, который удаляет лайк
@@ -158,70 +493,73 @@ async def delete_like(
     Raises:
         HTTPException: возникает при попытке удалить лайк отсутвующего твита
     """
-    exist_tweet = await session.scalar(
-        select(Tweet).where(Tweet.id == tweet_id),
+    if settings.like_buffer_enabled:
+        found: bool = await session.scalar(
+            select(Tweet.id).where(Tweet.id == tweet_id).exists().select(),
+        )
+        if not found:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+        like_buffer.add(tweet_id=tweet_id, user_id=user_id, liked=False)
+        return
+
+    target: Any = (
+        select(Tweet.id).
+        where(Tweet.id == tweet_id).
+        cte('target')
     )
-    if not exist_tweet:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
-
-    query: Any = likes_table.delete().where(
-        and_(
+    removed: Any = (
+        likes_table.
+        delete().
+        where(
             likes_table.c.tweet_id == tweet_id,
             likes_table.c.user_id == user_id,
-        ),
+        ).
+        returning(likes_table.c.tweet_id).
+        cte('removed')
     )
-    await session.execute(query)
-    await session.commit()
-
-
-async def get_all_tweets(session: AsyncSession) -> dict | None:
-    """
-    Функция для получения всех твитов из базы данных.
-
-    Args:
-        session: асинхронная сессия подключения к базе данных
-
-    Returns:
-        dict: полная информация по всем твитам
-    """
-    tweets: Any = await session.scalars(
-        select(Tweet).options(
-            selectinload(Tweet.users_likes),
-            selectinload(Tweet.tweet_media_ids),
-        ),
+    await change_like(
+        target=target, changed=removed, delta=-1, session=session,
     )
-    all_tweets: list = []
-    for tweet in tweets.all():
-        owner: User = await session.scalar(
-            select(User).where(User.id == tweet.owner_id),
-        )
-        all_tweets.append(create_tweet_info(tweet, owner))
-        all_tweets.sort(key=lambda like: len(like['likes']), reverse=True)
-    return {'result': 'true', 'tweets': all_tweets}
 
 
-def create_tweet_info(tweet: Tweet, owner: User) -> dict:
+async def change_like(
+    target: Any,
+    changed: Any,
+    delta: int,
+    session: AsyncSession,
+) -> None:
     """
-    Вспомогательная функция.
+    Функция изменения счетчика лайков твита и фиксации изменения лайка.
 
-    Приведение твита к нужному виду и добавления дополнительной информации.
+    Счетчик меняется в том же запросе, что и likes_table, только если
+    лайк действительно добавлен или удален, рейтинг твита помечается
+    для пересчета.
 
     Args:
-        tweet: твит, по которому нужно получить информацию
-        owner: пользователь, владелец твита
+        target: CTE с id твита, если он существует
+        changed: CTE вставки или удаления в likes_table с RETURNING tweet_id
+        delta: на сколько изменить счетчик
+        session: асинхронная сессия подключения к базе данных
 
-    Returns:
-        dict: информация по твиту в dict формате
+    Raises:
+        HTTPException: если твита не существует
     """
-    media_links: list = [link.media_path for link in tweet.tweet_media_ids]
-    likes: list[dict] = [
-        {'user_id': like.id, 'name': like.name} for like in tweet.users_likes
-    ]
+    counted: Any = (
+        update(Tweet).
+        where(Tweet.id.in_(select(changed.c.tweet_id))).
+        values(like_count=Tweet.like_count + delta, score_dirty=True).
+        returning(Tweet.id).
+        cte('counted')
+    )
+    row: Any = (await session.execute(
+        select(
+            select(target.c.id).exists().label('found'),
+            select(counted.c.id).exists().label('changed'),
+        ),
+    )).one()
+    await session.commit()
 
-    return {
-        'id': tweet.id,
-        'content': tweet.tweet_data,
-        'attachments': media_links,
-        'author': owner.to_json(),
-        'likes': likes,
-    }
+    if not row.found:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    if row.changed:
+        feed_cache.invalidate()
@@ -0,0 +1,220 @@
+"""Модуль чтения ленты твитов из базы данных."""
+from typing import Any, AsyncIterator, Optional
+
+import orjson
+from sqlalchemy import func, literal_column, select, tuple_
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from src.auth.models import User
+from src.config import Settings, get_settings
+from src.pagination import decode_cursor, encode_cursor
+from src.tweet.models import Media, Tweet, likes_table
+from src.tweet.timeline import timeline_entries
+
+settings: Settings = get_settings()
+
+
+async def get_all_tweets(
+    session: AsyncSession,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> dict | None:
+    """
+    Функция для получения твитов из базы данных.
+
+    Твиты упорядочены по рейтингу (см. src.tweet.ranking), сортировка и
+    пагинация выполняются в базе данных по индексу (score DESC, id DESC).
+    Без limit и cursor возвращает всю ленту, как и раньше. Иначе возвращает
+    одну страницу ленты, выбранную keyset-запросом (без OFFSET), и курсор
+    для запроса следующей страницы.
+    Лента любого размера собирается одним запросом к базе данных.
+
+    Args:
+        session: асинхронная сессия подключения к базе данных
+        limit: количество твитов на странице
+        cursor: курсор, полученный вместе с предыдущей страницей
+
+    Returns:
+        dict: полная информация по твитам
+    """
+    query: Any = feed_query().order_by(Tweet.score.desc(), Tweet.id.desc())
+    if limit is None and cursor is None:
+        rows: Any = await session.execute(query)
+        return {
+            'result': 'true',
+            'tweets': [create_tweet_info(row) for row in rows],
+            'next_cursor': None,
+        }
+
+    limit = limit or settings.feed_page_size
+    if cursor is not None:
+        query = query.where(
+            tuple_(Tweet.score, Tweet.id) < decode_cursor(cursor, size=2),
+        )
+
+    rows = list(await session.execute(query.limit(limit + 1)))
+    next_cursor: Optional[str] = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].score, rows[-1].id)
+
+    return {
+        'result': 'true',
+        'tweets': [create_tweet_info(row) for row in rows],
+        'next_cursor': next_cursor,
+    }
+
+
+async def stream_all_tweets(session: AsyncSession) -> AsyncIterator[bytes]:
+    """
+    Функция для потоковой выдачи всей ленты в формате TweetAllSchema.
+
+    Строки читаются серверным курсором пачками по feed_stream_batch_size
+    и сразу сериализуются, поэтому память не растет вместе с лентой.
+
+    Args:
+        session: асинхронная сессия подключения к базе данных
+
+    Yields:
+        bytes: очередная часть JSON ответа
+    """
+    query: Any = (
+        feed_query().
+        order_by(Tweet.score.desc(), Tweet.id.desc()).
+        execution_options(yield_per=settings.feed_stream_batch_size)
+    )
+    rows: Any = await session.stream(query)
+    yield b'{"result":"true","tweets":['
+    separator: bytes = b''
+    async for partition in rows.partitions():
+        yield separator + b','.join(
+            orjson.dumps(create_tweet_info(row)) for row in partition
+        )
+        separator = b','
+    yield b'],"next_cursor":null}'
+
+
+async def get_user_timeline(
+    user_id: int,
+    session: AsyncSession,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> dict:
+    """
+    Функция для получения домашней ленты (timeline) пользователя.
+
+    Записи ленты выбирает timeline_entries, к ним присоединяются
+    данные твитов.
+
+    Args:
+        user_id: id пользователя, чью ленту читаем
+        session: асинхронная сессия подключения к базе данных
+        limit: количество твитов на странице
+        cursor: курсор, полученный вместе с предыдущей страницей
+
+    Returns:
+        dict: информация о твитах ленты и курсор следующей страницы
+    """
+    limit = limit or settings.feed_page_size
+    entries: Any = timeline_entries(
+        user_id=user_id, limit=limit, cursor=cursor,
+    )
+    query: Any = (
+        feed_query().
+        add_columns(entries.c.score.label('timeline_score')).
+        join(entries, entries.c.tweet_id == Tweet.id).
+        order_by(entries.c.score.desc(), entries.c.tweet_id.desc()).
+        limit(limit + 1)
+    )
+
+    rows: list = list(await session.execute(query))
+    next_cursor: Optional[str] = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].timeline_score, rows[-1].id)
+
+    return {
+        'result': 'true',
+        'tweets': [create_tweet_info(row) for row in rows],
+        'next_cursor': next_cursor,
+    }
+
+
+def feed_query() -> Any:
+    """
+    Вспомогательная функция.
+
+    Запрос ленты: автор присоединяется через JOIN, ссылки на изображения
+    и лайки агрегируются в самом запросе, без отдельных запросов на твит.
+
+    Returns:
+        Any: запрос со всеми полями твита для ленты
+    """
+    liker: Any = aliased(User)
+    attachments: Any = (
+        select(
+            func.coalesce(
+                func.array_agg(
+                    aggregate_order_by(Media.media_path, Media.id),
+                ),
+                literal_column('ARRAY[]::varchar[]'),
+            ),
+        ).
+        where(Media.tweet_id == Tweet.id).
+        scalar_subquery()
+    )
+    likes: Any = (
+        select(
+            func.coalesce(
+                func.json_agg(
+                    aggregate_order_by(
+                        func.json_build_object(
+                            'user_id', liker.id, 'name', liker.name,
+                        ),
+                        liker.id,
+                    ),
+                ),
+                literal_column("'[]'::json"),
+            ),
+        ).
+        select_from(likes_table).
+        join(liker, liker.id == likes_table.c.user_id).
+        where(likes_table.c.tweet_id == Tweet.id).
+        scalar_subquery()
+    )
+
+    return (
+        select(
+            Tweet.id,
+            Tweet.tweet_data,
+            Tweet.score,
+            User.id.label('author_id'),
+            User.name.label('author_name'),
+            attachments.label('attachments'),
+            likes.label('likes'),
+        ).
+        join(User, User.id == Tweet.owner_id)
+    )
+
+
+def create_tweet_info(row: Any) -> dict:
+    """
+    Вспомогательная функция.
+
+    Приведение строки ленты к виду BaseTweetSchema.
+
+    Args:
+        row: строка запроса ленты с информацией по твиту
+
+    Returns:
+        dict: информация по твиту в dict формате
+    """
+    return {
+        'id': row.id,
+        'content': row.tweet_data,
+        'attachments': row.attachments,
+        'author': {'id': row.author_id, 'name': row.author_name},
+        'likes': row.likes,
+    }
@@ -0,0 +1,152 @@
+"""Модуль с эндпоинтами ленты твитов."""
+from typing import Annotated, Any, Optional
+
+from fastapi import APIRouter, Depends, Query, Request, Security, status
+from fastapi.exceptions import HTTPException
+from fastapi.responses import Response, StreamingResponse
+
+from src.auth.dependencies import api_key_header, get_authorized_user
+from src.auth.schemas import UserSchema
+from src.config import ODD_RESPONSES, Settings, get_settings
+from src.database import SessionDep
+from src.etag import etag_matches, not_modified
+from src.tweet.cache import VARY, FeedSnapshot, feed_cache, feed_etag
+from src.tweet.feed import get_all_tweets, get_user_timeline, stream_all_tweets
+from src.tweet.schemas import TweetAllSchema
+
+settings: Settings = get_settings()
+FeedLimit = Annotated[
+    Optional[int], Query(ge=1, le=settings.feed_max_page_size),
+]
+
+
+class FeedQuery(object):
+    """Класс параметров запроса ленты."""
+
+    def __init__(
+        self,
+        limit: FeedLimit = None,
+        cursor: Optional[str] = None,
+        stream: bool = False,
+    ) -> None:
+        """
+        Метод проверки параметров запроса ленты.
+
+        Поток отдает всю ленту целиком, поэтому stream=true нельзя
+        передавать вместе с limit или cursor.
+
+        Args:
+            limit: количество твитов на странице
+            cursor: курсор следующей страницы из предыдущего ответа
+            stream: отдать всю ленту потоком
+
+        Raises:
+            HTTPException: если stream=true передан с limit или cursor
+        """
+        if stream and (limit is not None or cursor is not None):
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail='stream cannot be combined with limit or cursor',
+            )
+        self.limit: Optional[int] = limit
+        self.cursor: Optional[str] = cursor
+        self.stream: bool = stream
+
+
+router: APIRouter = APIRouter(
+    prefix='',
+    tags=['Tweet'],
+    dependencies=[Security(api_key_header)],
+)
+
+
+@router.get(
+    '/tweets',
+    response_model=TweetAllSchema,
+    description='Get all tweets',
+    responses=ODD_RESPONSES,
+)
+async def get_tweets(
+    request: Request,
+    response: Response,
+    session: SessionDep,
+    query: Annotated[FeedQuery, Depends()],
+) -> Any:
+    """
+    Endpoint для получения твитов.
+
+    Без параметров возвращает всю ленту, с limit и/или cursor - страницу.
+    С stream=true вся лента отдается потоком по мере чтения из базы данных,
+    минуя кэш; вместе с limit или cursor stream=true дает 422.
+    При feed_raw_snapshots страница хранится в кэше уже сериализованной
+    в JSON и отдается без повторной валидации и сериализации.
+    Если ETag из If-None-Match совпадает с версией ленты, отдается 304.
+
+    Args:
+        request: request
+        response: response
+        session: асинхронная сессия для работы с базой данных
+        query: параметры запроса ленты (limit, cursor и stream)
+
+    Returns:
+        Any: информация о твитах и курсор следующей страницы
+    """
+    if query.stream:
+        return StreamingResponse(
+            stream_all_tweets(session=session),
+            media_type='application/json',
+        )
+
+    version: int = feed_cache.version
+    etag: str = feed_etag(request, version)
+    if etag_matches(request, etag):
+        return not_modified(
+            etag, vary=VARY if settings.feed_raw_snapshots else None,
+        )
+
+    feed: Any = feed_cache.get(
+        version=version, limit=query.limit, cursor=query.cursor,
+    )
+    if feed is None:
+        feed = await get_all_tweets(
+            session=session, limit=query.limit, cursor=query.cursor,
+        )
+        if settings.feed_raw_snapshots:
+            feed = FeedSnapshot(feed)
+        feed_cache.set(
+            version=version, limit=query.limit, cursor=query.cursor, page=feed,
+        )
+
+    if settings.feed_raw_snapshots:
+        return feed.response(request, etag)
+    response.headers['etag'] = etag
+    return feed
+
+
+@router.get(
+    '/timeline',
+    response_model=TweetAllSchema,
+    description='Get home timeline of current user',
+    responses=ODD_RESPONSES,
+)
+async def get_timeline(
+    user: Annotated[UserSchema, Depends(get_authorized_user)],
+    session: SessionDep,
+    limit: FeedLimit = None,
+    cursor: Optional[str] = None,
+) -> dict:
+    """
+    Endpoint для получения домашней ленты текущего пользователя.
+
+    Args:
+        user: текущий пользователь
+        session: асинхронная сессия для работы с базой данных
+        limit: количество твитов на странице
+        cursor: курсор следующей страницы из предыдущего ответа
+
+    Returns:
+        dict: твиты пользователя и его подписок и курсор следующей страницы
+    """
+    return await get_user_timeline(
+        user_id=user.id, session=session, limit=limit, cursor=cursor,
+    )
@@ -0,0 +1,281 @@
+"""
+Модуль буфера лайков с отложенной записью (write-behind).
+
+При like_buffer_enabled лайки и их отмены не пишутся в базу сразу, а
+копятся в памяти процесса: для каждой пары (tweet_id, user_id) хранится
+только последнее состояние. Буфер сбрасывается фоновой задачей каждые
+like_buffer_interval секунд или сразу после like_buffer_max_events
+разных пар. Сброс - один запрос: вставка и удаление в likes_table
+и изменение счетчиков like_count в одной транзакции.
+
+Гарантии:
+
+* ответ на лайк отправляется до записи в базу, поэтому лайки, не
+  сброшенные до падения процесса, теряются (не больше интервала сброса
+  или like_buffer_max_events пар);
+* при остановке приложения буфер сбрасывается в lifespan после остановки
+  фоновых задач;
+* если сброс не удался, события возвращаются в буфер (кроме пар, для
+  которых уже пришло более новое состояние) и записываются при
+  следующем сбросе;
+* буфер у каждого процесса свой, порядок событий одной пары из разных
+  процессов не гарантируется, а лента и счетчики отстают от лайков
+  на время до сброса.
+"""
+import asyncio
+from contextlib import suppress
+from logging import getLogger
+from typing import Any, Dict, Tuple
+
+from prometheus_client import Counter, Gauge
+from sqlalchemy import (
+    and_,
+    column,
+    func,
+    literal,
+    select,
+    union_all,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.types import Boolean, Integer
+
+from src.config import Settings, get_settings
+from src.tweet.cache import feed_cache
+from src.tweet.models import Tweet, likes_table
+
+settings: Settings = get_settings()
+logger: Any = getLogger(__name__)
+
+LIKE_BUFFER_PENDING: Gauge = Gauge(
+    'app_like_buffer_pending',
+    'Number of (tweet, user) like states waiting to be flushed',
+)
+LIKE_BUFFER_FLUSHED: Counter = Counter(
+    'app_like_buffer_flushed_total',
+    'Number of (tweet, user) like states flushed to the database',
+)
+
+
+class LikeBuffer(object):
+    """Класс буфера последних состояний лайков."""
+
+    def __init__(self, max_events: int) -> None:
+        """
+        Метод инициализации пустого буфера.
+
+        Args:
+            max_events: количество пар, после которого буфер сбрасывается
+        """
+        self.max_events: int = max_events
+        self.pending: Dict[Tuple[int, int], bool] = {}
+        self._full: asyncio.Event = asyncio.Event()
+
+    def add(self, tweet_id: int, user_id: int, liked: bool) -> None:
+        """
+        Метод записи нового состояния лайка.
+
+        Args:
+            tweet_id: id твита
+            user_id: id пользователя
+            liked: True - лайк, False - отмена лайка
+        """
+        self.pending[(tweet_id, user_id)] = liked
+        LIKE_BUFFER_PENDING.set(len(self.pending))
+        if len(self.pending) >= self.max_events:
+            self._full.set()
+
+    async def flush(self, session: AsyncSession) -> int:
+        """
+        Метод записи накопленных состояний в базу данных.
+
+        Лайки твитов, которых уже нет, и лайки своих твитов пропускаются.
+
+        Args:
+            session: асинхронная сессия подключения к базе данных
+
+        Returns:
+            int: количество записанных пар
+
+        Raises:
+            BaseException: ошибка записи, состояния при этом уже в буфере
+        """
+        events: Dict[Tuple[int, int], bool] = self.pending
+        self.pending = {}
+        self._full.clear()
+        if not events:
+            return 0
+
+        # При любой ошибке, включая отмену задачи при остановке сервиса,
+        # состояния возвращаются в буфер, чтобы не потерять лайки.
+        try:
+            await write_likes(session, events)
+        except BaseException:  # noqa: WPS424
+            self._requeue(events)
+            raise
+        LIKE_BUFFER_PENDING.set(len(self.pending))
+        LIKE_BUFFER_FLUSHED.inc(len(events))
+        feed_cache.invalidate()
+
+        return len(events)
+
+    async def wait(self, timeout: float) -> None:
+        """
+        Метод ожидания следующего сброса.
+
+        Args:
+            timeout: максимальное время ожидания в секундах
+        """
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._full.wait(), timeout=timeout)
+
+    def _requeue(self, events: Dict[Tuple[int, int], bool]) -> None:
+        for key, liked in events.items():
+            self.pending.setdefault(key, liked)
+        LIKE_BUFFER_PENDING.set(len(self.pending))
+
+
+async def write_likes(
+    session: AsyncSession,
+    events: Dict[Tuple[int, int], bool],
+) -> None:
+    """
+    Функция записи состояний лайков в базу данных одним запросом.
+
+    Args:
+        session: асинхронная сессия подключения к базе данных
+        events: последнее состояние для каждой пары твит-пользователь
+    """
+    await session.execute(flush_query(events))
+    await session.commit()
+
+
+def flush_query(events: Dict[Tuple[int, int], bool]) -> Any:
+    """
+    Функция построения запроса сброса буфера.
+
+    Args:
+        events: последние состояния лайков по парам (tweet_id, user_id)
+
+    Returns:
+        Any: UPDATE счетчиков с вставкой и удалением лайков в CTE
+    """
+    deltas: Any = like_deltas(buffered_likes(events))
+
+    return (
+        update(Tweet).
+        where(Tweet.id == deltas.c.tweet_id).
+        values(like_count=Tweet.like_count + deltas.c.delta, score_dirty=True)
+    )
+
+
+def buffered_likes(events: Dict[Tuple[int, int], bool]) -> Any:
+    """
+    Функция построения списка VALUES состояний лайков.
+
+    Args:
+        events: последние состояния лайков по парам (tweet_id, user_id)
+
+    Returns:
+        Any: VALUES (tweet_id, user_id, liked)
+    """
+    rows: list = [(*key, liked) for key, liked in events.items()]
+
+    return values(
+        column('tweet_id', Integer),
+        column('user_id', Integer),
+        column('liked', Boolean),
+        name='buffered',
+    ).data(rows)
+
+
+def like_deltas(buffered: Any) -> Any:
+    """
+    Функция построения подзапроса изменений счетчиков лайков.
+
+    Лайки вставляются, а отмены удаляются в CTE, изменение счетчика
+    твита считается только по реально вставленным и удаленным строкам.
+
+    Args:
+        buffered: VALUES состояний лайков
+
+    Returns:
+        Any: подзапрос (tweet_id, delta)
+    """
+    inserted: Any = (
+        pg_insert(likes_table).
+        from_select(
+            ['tweet_id', 'user_id'],
+            select(buffered.c.tweet_id, buffered.c.user_id).
+            join(Tweet, Tweet.id == buffered.c.tweet_id).
+            where(buffered.c.liked, Tweet.owner_id != buffered.c.user_id),
+        ).
+        on_conflict_do_nothing().
+        returning(likes_table.c.tweet_id).
+        cte('inserted')
+    )
+    deleted: Any = (
+        likes_table.delete().
+        where(
+            and_(
+                likes_table.c.tweet_id == buffered.c.tweet_id,
+                likes_table.c.user_id == buffered.c.user_id,
+                ~buffered.c.liked,
+            ),
+        ).
+        returning(likes_table.c.tweet_id).
+        cte('deleted')
+    )
+    changes: Any = union_all(
+        select(inserted.c.tweet_id, literal(1).label('delta')),
+        select(deleted.c.tweet_id, literal(-1).label('delta')),
+    ).subquery('changes')
+    delta: Any = func.sum(changes.c.delta).label('delta')
+
+    return (
+        select(changes.c.tweet_id, delta).
+        group_by(changes.c.tweet_id).
+        subquery('deltas')
+    )
+
+
+like_buffer: LikeBuffer = LikeBuffer(
+    max_events=settings.like_buffer_max_events,
+)
+
+
+async def run_like_buffer(session_maker: async_sessionmaker) -> None:
+    """
+    Фоновая задача периодического сброса буфера лайков.
+
+    Args:
+        session_maker: фабрика асинхронных сессий
+    """
+    while True:
+        await like_buffer.wait(timeout=settings.like_buffer_interval)
+        try:
+            async with session_maker() as session:
+                await like_buffer.flush(session=session)
+        except Exception:
+            logger.exception('Like buffer flush failed')
+            await asyncio.sleep(settings.like_buffer_interval)
+
+
+async def close_like_buffer(session_maker: async_sessionmaker) -> None:
+    """
+    Функция сброса оставшихся лайков при остановке приложения.
+
+    Args:
+        session_maker: фабрика асинхронных сессий
+    """
+    try:
+        async with session_maker() as session:
+            await like_buffer.flush(session=session)
+    except Exception:
+        logger.exception(
+            'Like buffer flush on shutdown failed, {count} likes lost'.format(
+                count=len(like_buffer.pending),
+            ),
+        )
@@ -0,0 +1,200 @@
+"""
+Модуль отложенного удаления файлов изображений.
+
+При удалении твита пути его изображений записываются в таблицу
+media_deletion в той же транзакции, поэтому файлы удаляются только
+после фиксации удаления твита и не теряются при сбое процесса.
+Фоновая задача удаляет файлы пачками. При ошибке удаление повторяется
+через media_cleanup_retry_delay * 2 ** (попытка - 1) секунд, после
+media_cleanup_max_attempts попыток запись удаляется с ошибкой в логе.
+"""
+import asyncio
+from datetime import timedelta
+from logging import getLogger
+from typing import Any, List, Optional
+
+from prometheus_client import Counter, Gauge
+from sqlalchemy import Row, delete, extract, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.config import Settings, get_settings
+from src.tweet.models import media_deletion
+from src.tweet.utils import delete_media
+
+settings: Settings = get_settings()
+logger: Any = getLogger(__name__)
+
+MEDIA_FILES_DELETED: Counter = Counter(
+    'app_media_files_deleted_total',
+    'Number of media files deleted after their tweet was deleted',
+)
+MEDIA_DELETE_FAILURES: Counter = Counter(
+    'app_media_delete_failures_total',
+    'Number of failed media file deletion attempts',
+)
+MEDIA_DELETION_LAG: Gauge = Gauge(
+    'app_media_deletion_lag_seconds',
+    'Age of the oldest media file waiting for deletion',
+)
+
+
+async def delete_queued_medias(session: AsyncSession, batch_size: int) -> int:
+    """
+    Функция удаления пачки файлов из очереди media_deletion.
+
+    Пачка выбирается с FOR UPDATE SKIP LOCKED, поэтому несколько
+    процессов приложения могут удалять файлы одновременно.
+
+    Args:
+        session: асинхронная сессия подключения к базе данных
+        batch_size: максимальное количество файлов в пачке
+
+    Returns:
+        int: количество обработанных записей очереди
+    """
+    rows: List[Row] = list(
+        await session.execute(queued_medias_query(batch_size)),
+    )
+    errors: List[Optional[BaseException]] = await asyncio.gather(
+        *[delete_media(row.media_path) for row in rows],
+        return_exceptions=True,
+    )
+    await record_attempts(session, rows, errors)
+    lag: Optional[float] = await session.scalar(deletion_lag_query())
+    await session.commit()
+
+    MEDIA_FILES_DELETED.inc(errors.count(None))
+    MEDIA_DELETION_LAG.set(lag or 0)
+
+    return len(rows)
+
+
+def queued_medias_query(batch_size: int) -> Any:
+    """
+    Функция построения запроса пачки файлов, готовых к удалению.
+
+    Args:
+        batch_size: максимальное количество файлов в пачке
+
+    Returns:
+        Any: запрос записей очереди, заблокированных FOR UPDATE
+    """
+    return (
+        select(
+            media_deletion.c.id,
+            media_deletion.c.media_path,
+            media_deletion.c.attempts,
+        ).
+        where(media_deletion.c.next_attempt_at <= func.now()).
+        order_by(media_deletion.c.next_attempt_at).
+        limit(batch_size).
+        with_for_update(skip_locked=True)
+    )
+
+
+async def record_attempts(
+    session: AsyncSession,
+    rows: List[Row],
+    errors: List[Optional[BaseException]],
+) -> None:
+    """
+    Функция записи результатов удаления пачки в очередь.
+
+    Удаленные файлы и файлы, попытки удаления которых закончились,
+    убираются из очереди, остальные откладываются до следующей попытки.
+
+    Args:
+        session: асинхронная сессия подключения к базе данных
+        rows: записи очереди
+        errors: ошибки удаления в порядке rows, None - файл удален
+    """
+    done: List[int] = []
+    for row, error in zip(rows, errors):
+        if error is not None:
+            MEDIA_DELETE_FAILURES.inc()
+        if error is None or attempts_exhausted(row, error):
+            done.append(row.id)
+        else:
+            await session.execute(retry_query(row))
+    if done:
+        await session.execute(
+            delete(media_deletion).where(media_deletion.c.id.in_(done)),
+        )
+
+
+def attempts_exhausted(row: Row, error: BaseException) -> bool:
+    """
+    Функция проверки, что попытки удаления файла закончились.
+
+    Args:
+        row: запись очереди
+        error: ошибка последней попытки удаления
+
+    Returns:
+        bool: True, если это была последняя попытка
+    """
+    if row.attempts + 1 < settings.media_cleanup_max_attempts:
+        return False
+    logger.error('Giving up deleting media file {path}: {error}'.format(
+        path=row.media_path, error=error,
+    ))
+
+    return True
+
+
+def retry_query(row: Row) -> Any:
+    """
+    Функция построения запроса откладывания следующей попытки удаления.
+
+    Args:
+        row: запись очереди
+
+    Returns:
+        Any: UPDATE попыток и времени следующей попытки
+    """
+    delay: float = settings.media_cleanup_retry_delay * 2 ** row.attempts
+
+    return (
+        update(media_deletion).
+        where(media_deletion.c.id == row.id).
+        values(
+            attempts=row.attempts + 1,
+            next_attempt_at=func.now() + timedelta(seconds=delay),
+        )
+    )
+
+
+def deletion_lag_query() -> Any:
+    """
+    Функция построения запроса возраста самой старой записи очереди.
+
+    Returns:
+        Any: запрос возраста в секундах, NULL для пустой очереди
+    """
+    oldest: Any = func.min(media_deletion.c.created_at)
+
+    return select(extract('epoch', func.now() - oldest))
+
+
+async def run_media_cleanup(session_maker: async_sessionmaker) -> None:
+    """
+    Фоновая задача удаления файлов изображений удаленных твитов.
+
+    Удаляет пачки, пока в очереди есть готовые к удалению файлы, затем
+    ждет media_cleanup_interval секунд.
+
+    Args:
+        session_maker: фабрика асинхронных сессий
+    """
+    while True:
+        try:
+            async with session_maker() as session:
+                processed: int = await delete_queued_medias(
+                    session=session,
+                    batch_size=settings.media_cleanup_batch_size,
+                )
+        except Exception:
+            logger.exception('Media cleanup failed')
+            processed = 0
+        if processed < settings.media_cleanup_batch_size:
+            await asyncio.sleep(settings.media_cleanup_interval)
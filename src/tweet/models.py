@@ -2,13 +2,8 @@
 from typing import Any
 
 from sqlalchemy.orm import declarative_base, relationship
-from sqlalchemy import (
-    Column,
-    Integer,
-    String,
-    ForeignKey,
-    Table,
-)
+from sqlalchemy import Column, ForeignKey, Index, Table, false, func
+from sqlalchemy.types import Boolean, DateTime, Float, Integer, String
 
 from src.auth.models import User
 
@@ -39,19 +34,82 @@ class Tweet(BaseTweet):
     id = Column(Integer, primary_key=True)
     tweet_data = Column(String, nullable=False)
     owner_id = Column(Integer, ForeignKey(User.id), nullable=False)
+    like_count = Column(Integer, nullable=False, default=0, server_default='0')
+    fanout_on_read = Column(
+        Boolean,
+        nullable=False,
+        default=False,
+        server_default=false(),
+    )
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+    score = Column(Float, nullable=False, default=0, server_default='0')
+    score_dirty = Column(
+        Boolean,
+        nullable=False,
+        default=False,
+        server_default=false(),
+    )
     users_likes = relationship(
         User,
         secondary=likes_table,
-        lazy='selectin',
+        lazy='raise',
         cascade='all, delete',
     )
     tweet_media_ids = relationship(
         'Media',
-        lazy='selectin',
+        lazy='raise',
         cascade='all, delete',
     )
 
 
+Index(
+    'ix_tweet_fanout_on_read',
+    Tweet.id.desc(),
+    postgresql_where=Tweet.fanout_on_read,
+)
+Index('ix_tweet_score_id', Tweet.score.desc(), Tweet.id.desc())
+Index('ix_tweet_score_dirty', Tweet.id, postgresql_where=Tweet.score_dirty)
+
+timeline: Table = Table(
+    'timeline',
+    BaseTweet.metadata,
+    Column(
+        'user_id',
+        ForeignKey(User.id, ondelete='CASCADE'),
+        primary_key=True,
+    ),
+    Column(
+        'tweet_id',
+        ForeignKey('tweet.id', ondelete='CASCADE'),
+        primary_key=True,
+    ),
+    Column('score', Integer, nullable=False),
+)
+Index(
+    'ix_timeline_user_id_score',
+    timeline.c.user_id,
+    timeline.c.score.desc(),
+    timeline.c.tweet_id.desc(),
+)
+Index('ix_timeline_tweet_id', timeline.c.tweet_id)
+
+media_deletion: Table = Table(
+    'media_deletion',
+    BaseTweet.metadata,
+    Column('id', Integer, primary_key=True),
+    Column('media_path', String, nullable=False),
+    Column('created_at', DateTime, nullable=False, server_default=func.now()),
+    Column('attempts', Integer, nullable=False, server_default='0'),
+    Column(
+        'next_attempt_at',
+        DateTime,
+        nullable=False,
+        server_default=func.now(),
+    ),
+)
+Index('ix_media_deletion_next_attempt_at', media_deletion.c.next_attempt_at)
+
+
 class Media(BaseTweet):
     """Класс для описания загруженного изображения для твита."""
 
@@ -60,3 +118,4 @@ class Media(BaseTweet):
     id = Column(Integer, primary_key=True)
     media_path = Column(String, nullable=True)
     tweet_id = Column(Integer, ForeignKey('tweet.id', ondelete='CASCADE'))
+    uploader_id = Column(Integer, ForeignKey(User.id, ondelete='CASCADE'))
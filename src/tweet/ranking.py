@@ -0,0 +1,289 @@
+"""
+Модуль ранжирования твитов в ленте.
+
+Рейтинг твита считается по формуле с затуханием по времени:
+
+    score = log10(1 + лайки)
+        + ranking_author_weight * log10(1 + подписчики автора)
+        + (время создания - RANK_EPOCH) / ranking_decay_seconds
+
+Вклад времени растет для новых твитов, а не уменьшается для старых,
+поэтому порядок твитов со временем не меняется и рейтинг нужно
+пересчитывать только у твитов, входные данные которых изменились:
+каждые ranking_decay_seconds новизна весит как десятикратный рост лайков.
+Твиты с новыми лайками помечаются score_dirty и пересчитываются фоновой
+задачей. Подписка не трогает твиты автора: вклад подписчиков обновляется
+той же задачей, которая за каждый проход перебирает по кругу не больше
+ranking_batch_size твитов, поэтому он отстает от подписок.
+"""
+import asyncio
+from logging import getLogger
+from typing import Any, Optional
+
+from sqlalchemy import ColumnElement, extract, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.auth.models import followers
+from src.config import Settings, get_settings
+from src.tweet.cache import feed_cache
+from src.tweet.models import Tweet
+
+settings: Settings = get_settings()
+logger: Any = getLogger(__name__)
+
+RANK_EPOCH: int = 1694217600  # 2023-09-09, дата первой миграции
+
+
+def score_expression(
+    like_count: Any,
+    created_at: Any,
+    author_followers: Any,
+) -> ColumnElement:
+    """
+    Функция построения SQL выражения рейтинга твита.
+
+    Args:
+        like_count: количество лайков твита
+        created_at: время создания твита
+        author_followers: количество подписчиков автора
+
+    Returns:
+        ColumnElement: выражение рейтинга для запроса
+    """
+    popularity: Any = func.log(1 + author_followers)
+    age: Any = extract('epoch', created_at) - RANK_EPOCH
+    weighted_popularity: Any = settings.ranking_author_weight * popularity
+    freshness: Any = age / settings.ranking_decay_seconds
+
+    return func.log(1 + like_count) + weighted_popularity + freshness
+
+
+def author_followers_count(owner_id: Any) -> Any:
+    """
+    Функция построения подзапроса количества подписчиков автора.
+
+    Args:
+        owner_id: id автора твита
+
+    Returns:
+        Any: скалярный подзапрос количества подписчиков
+    """
+    return (
+        select(func.count()).
+        select_from(followers).
+        where(followers.c.following_id == owner_id).
+        scalar_subquery()
+    )
+
+
+async def recompute_scores(session: AsyncSession, batch_size: int) -> int:
+    """
+    Функция пересчета рейтинга пачки твитов, помеченных score_dirty.
+
+    Пачка выбирается с FOR UPDATE SKIP LOCKED, поэтому несколько
+    процессов приложения могут пересчитывать рейтинг одновременно.
+    Подписчики авторов считаются одним проходом на всю пачку. Если
+    рейтинг изменился, кэш ленты сбрасывается.
+
+    Args:
+        session: асинхронная сессия подключения к базе данных
+        batch_size: максимальное количество твитов в пачке
+
+    Returns:
+        int: количество пересчитанных твитов
+    """
+    recomputed: int = len(
+        (await session.execute(recompute_query(batch_size))).all(),
+    )
+    await session.commit()
+    if recomputed:
+        feed_cache.invalidate()
+
+    return recomputed
+
+
+def recompute_query(batch_size: int) -> Any:
+    """
+    Функция построения запроса пересчета рейтинга пачки твитов.
+
+    Args:
+        batch_size: максимальное количество твитов в пачке
+
+    Returns:
+        Any: UPDATE рейтинга с выбором пачки и подписчиков авторов в CTE
+    """
+    batch: Any = dirty_batch(batch_size)
+
+    return (
+        update(Tweet).
+        where(Tweet.id == batch.c.id).
+        values(score=batch_score(batch), score_dirty=False).
+        returning(Tweet.id)
+    )
+
+
+def batch_score(batch: Any) -> Any:
+    """
+    Функция построения выражения нового рейтинга твитов пачки.
+
+    Подписчики авторов считаются одним проходом на всю пачку.
+
+    Args:
+        batch: CTE пачки с колонками id и owner_id
+
+    Returns:
+        Any: выражение рейтинга твита
+    """
+    total: Any = func.count().label('total')
+    authors: Any = (
+        select(followers.c.following_id, total).
+        where(followers.c.following_id.in_(select(batch.c.owner_id))).
+        group_by(followers.c.following_id).
+        cte('authors')
+    )
+    author_followers: Any = (
+        select(authors.c.total).
+        where(authors.c.following_id == Tweet.owner_id).
+        scalar_subquery()
+    )
+
+    return score_expression(
+        Tweet.like_count,
+        Tweet.created_at,
+        func.coalesce(author_followers, 0),
+    )
+
+
+def dirty_batch(batch_size: int) -> Any:
+    """
+    Функция построения CTE пачки твитов, помеченных score_dirty.
+
+    Args:
+        batch_size: максимальное количество твитов в пачке
+
+    Returns:
+        Any: CTE с id и автором твитов, заблокированных FOR UPDATE
+    """
+    dirty: Any = select(Tweet.id, Tweet.owner_id).where(Tweet.score_dirty)
+
+    return (
+        dirty.
+        order_by(Tweet.id).
+        limit(batch_size).
+        with_for_update(skip_locked=True).
+        cte('batch')
+    )
+
+
+async def refresh_popularity(
+    session: AsyncSession,
+    after_id: int,
+    batch_size: int,
+) -> Optional[int]:
+    """
+    Функция обновления вклада подписчиков в рейтинг пачки твитов.
+
+    Пачка - следующие после after_id твиты по порядку id. Записываются
+    только изменившиеся рейтинги, если такие есть, кэш ленты сбрасывается.
+
+    Args:
+        session: асинхронная сессия подключения к базе данных
+        after_id: id последнего твита предыдущей пачки
+        batch_size: максимальное количество твитов в пачке
+
+    Returns:
+        int: id последнего твита пачки
+        None: если после after_id твитов нет
+    """
+    row: Any = (
+        await session.execute(popularity_query(after_id, batch_size))
+    ).one()
+    await session.commit()
+    if row.changed:
+        feed_cache.invalidate()
+
+    return row.last_id
+
+
+def popularity_query(after_id: int, batch_size: int) -> Any:
+    """
+    Функция построения запроса обновления рейтинга пачки твитов по id.
+
+    Args:
+        after_id: id последнего твита предыдущей пачки
+        batch_size: максимальное количество твитов в пачке
+
+    Returns:
+        Any: запрос id последнего твита пачки и числа измененных рейтингов
+    """
+    batch: Any = clean_batch(after_id, batch_size)
+    score: Any = batch_score(batch)
+    changed: Any = (
+        update(Tweet).
+        where(Tweet.id == batch.c.id, Tweet.score != score).
+        values(score=score).
+        returning(Tweet.id).
+        cte('changed')
+    )
+    last_id: Any = select(func.max(batch.c.id)).scalar_subquery()
+    changed_count: Any = (
+        select(func.count()).
+        select_from(changed).
+        scalar_subquery()
+    )
+
+    return select(last_id.label('last_id'), changed_count.label('changed'))
+
+
+def clean_batch(after_id: int, batch_size: int) -> Any:
+    """
+    Функция построения CTE пачки непомеченных твитов, следующих за after_id.
+
+    Args:
+        after_id: id последнего твита предыдущей пачки
+        batch_size: максимальное количество твитов в пачке
+
+    Returns:
+        Any: CTE с id и автором твитов, заблокированных FOR UPDATE
+    """
+    clean: Any = select(Tweet.id, Tweet.owner_id).where(~Tweet.score_dirty)
+
+    return (
+        clean.
+        where(Tweet.id > after_id).
+        order_by(Tweet.id).
+        limit(batch_size).
+        with_for_update(skip_locked=True).
+        cte('batch')
+    )
+
+
+async def run_ranking(session_maker: async_sessionmaker) -> None:
+    """
+    Фоновая задача пересчета рейтинга твитов.
+
+    Пересчитывает пачки, пока есть помеченные твиты, затем ждет
+    ranking_interval секунд. За каждый проход также обновляет вклад
+    подписчиков в рейтинг одной пачки твитов.
+
+    Args:
+        session_maker: фабрика асинхронных сессий
+    """
+    after_id: int = 0
+    while True:
+        try:
+            async with session_maker() as session:
+                recomputed: int = await recompute_scores(
+                    session=session,
+                    batch_size=settings.ranking_batch_size,
+                )
+                after_id = await refresh_popularity(
+                    session=session,
+                    after_id=after_id,
+                    batch_size=settings.ranking_batch_size,
+                ) or 0
+        except Exception:
+            logger.exception('Tweet ranking failed')
+            recomputed = 0
+        if recomputed < settings.ranking_batch_size:
+            await asyncio.sleep(settings.ranking_interval)
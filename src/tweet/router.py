@@ -1,30 +1,34 @@
 """Модуль с эндпоинтами для твитов."""
-from typing import Annotated, Type
+from typing import Annotated, List, Type
 
-from fastapi import APIRouter, Depends, Security, Request, UploadFile
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Body, Depends, Security, Request, UploadFile
 from starlette.datastructures import FormData
 
-from src.auth.router import get_current_user
+from src.auth.dependencies import api_key_header, get_authorized_user
 from src.auth.schemas import UserSchema, ResultSchema
-from src.config import ODD_RESPONSES
-from src.database import get_session
+from src.config import ODD_RESPONSES, Settings, get_settings
+from src.database import SessionDep
 from src.tweet.crud import (
     save_image_path,
     create_tweet,
+    create_tweets,
     delete_tweet_by_id,
     add_new_like,
-    get_all_tweets,
     delete_like,
 )
 from src.tweet.schemas import (
     TweetSchema,
+    TweetBatchResultSchema,
     TweetResponseSchema,
-    TweetAllSchema,
     MediaSchema,
 )
 from src.tweet.utils import save_media
-from src.auth.router import api_key_header
+
+settings: Settings = get_settings()
+TweetBatch = Annotated[
+    List[TweetSchema],
+    Body(min_length=1, max_length=settings.tweet_batch_max_size),
+]
 
 router: APIRouter = APIRouter(
     prefix='',
@@ -41,13 +45,15 @@ router: APIRouter = APIRouter(
 )
 async def save_image(
     request: Request,
-    session: Annotated[AsyncSession, Depends(get_session)],
+    user: Annotated[UserSchema, Depends(get_authorized_user)],
+    session: SessionDep,
 ) -> MediaSchema:
     """
     Endpoint для сохранения изображения.
 
     Args:
         request: request
+        user: пользователь, загружающий изображение
         session: асинхронная сессия для работы с базой данных
 
     Returns:
@@ -56,32 +62,13 @@ async def save_image(
     body: FormData = await request.form()
     media_file: UploadFile = body.get('file')
     file_name: str = await save_media(media_file=media_file)
-    media_id: int = await save_image_path(file_name=file_name, session=session)
+    media_id: int = await save_image_path(
+        file_name=file_name, user_id=user.id, session=session,
+    )
 
     return MediaSchema(media_id=media_id)
 
 
-@router.get(
-    '/tweets',
-    response_model=TweetAllSchema,
-    description='Get all tweets',
-    responses=ODD_RESPONSES,
-)
-async def get_tweets(
-    session: Annotated[AsyncSession, Depends(get_session)],
-) -> dict:
-    """
-    Endpoint для получения всех твитов.
-
-    Args:
-        session: асинхронная сессия для работы с базой данных
-
-    Returns:
-        dict: информация о всех твитах
-    """
-    return await get_all_tweets(session=session)
-
-
 @router.post(
     '/tweets',
     response_model=TweetResponseSchema,
@@ -90,8 +77,8 @@ async def get_tweets(
 )
 async def add_tweet(
     tweet: TweetSchema,
-    user: Annotated[UserSchema, Depends(get_current_user)],
-    session: Annotated[AsyncSession, Depends(get_session)],
+    user: Annotated[UserSchema, Depends(get_authorized_user)],
+    session: SessionDep,
 ) -> TweetResponseSchema:
     """
     Endpoint для добавления твита.
@@ -111,6 +98,37 @@ async def add_tweet(
     return TweetResponseSchema(tweet_id=tweet_id)
 
 
+@router.post(
+    '/tweets:batch',
+    response_model=TweetBatchResultSchema,
+    description='Add several tweets at once',
+    responses=ODD_RESPONSES,
+)
+async def add_tweets_batch(
+    tweets: TweetBatch,
+    user: Annotated[UserSchema, Depends(get_authorized_user)],
+    session: SessionDep,
+) -> dict:
+    """
+    Endpoint для пакетного добавления твитов.
+
+    Args:
+        tweets: добавляемые твиты
+        user: создатель твитов
+        session: асинхронная сессия для работы с базой данных
+
+    Returns:
+        dict: id и статус каждого твита в порядке запроса
+    """
+    results: list = await create_tweets(
+        tweets=[tweet.model_dump() for tweet in tweets],
+        user_id=user.id,
+        session=session,
+    )
+
+    return {'result': 'true', 'results': results}
+
+
 @router.delete(
     '/tweets/{idx}',
     response_model=ResultSchema,
@@ -119,8 +137,8 @@ async def add_tweet(
 )
 async def delete_tweet(
     idx: int,
-    user: Annotated[UserSchema, Depends(get_current_user)],
-    session: Annotated[AsyncSession, Depends(get_session)],
+    user: Annotated[UserSchema, Depends(get_authorized_user)],
+    session: SessionDep,
 ) -> Type[ResultSchema]:
     """
     Endpoint для удаления твита по id.
@@ -146,8 +164,8 @@ async def delete_tweet(
 )
 async def add_like(
     idx: int,
-    user: Annotated[UserSchema, Depends(get_current_user)],
-    session: Annotated[AsyncSession, Depends(get_session)],
+    user: Annotated[UserSchema, Depends(get_authorized_user)],
+    session: SessionDep,
 ) -> Type[ResultSchema]:
     """
     Endpoint для добавления лайка твиту по id.
@@ -173,8 +191,8 @@ async def add_like(
 )
 async def delete_user_like(
     idx: int,
-    user: Annotated[UserSchema, Depends(get_current_user)],
-    session: Annotated[AsyncSession, Depends(get_session)],
+    user: Annotated[UserSchema, Depends(get_authorized_user)],
+    session: SessionDep,
 ):
     """
     Endpoint для удаления лайка твита по id.
@@ -25,6 +25,19 @@ class TweetResponseSchema(ResultSchema, BaseModel):
     tweet_id: int
 
 
+class TweetOutcomeSchema(BaseModel):
+    """Класс для описания результата добавления одного твита из пакета."""
+
+    tweet_id: Optional[int] = None
+    status: str
+
+
+class TweetBatchResultSchema(ResultSchema, BaseModel):
+    """Класс для валидации и описания ответа при пакетном добавлении твитов."""
+
+    results: List[TweetOutcomeSchema]
+
+
 class UserLikeSchema(BaseModel):
     """Класс для валидации и описания добавления лайка к твиту."""
 
@@ -50,3 +63,4 @@ class TweetAllSchema(ResultSchema, BaseModel):
     """Класс для валидации и описания всех доступных твитов."""
 
     tweets: List[BaseTweetSchema]
+    next_cursor: Optional[str] = None
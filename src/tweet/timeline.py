@@ -0,0 +1,243 @@
+"""
+Модуль материализованных домашних лент (timeline).
+
+Новый твит копируется в ленты автора и его подписчиков (fan-out при
+записи), кроме твитов авторов с числом подписчиков больше
+timeline_fanout_limit: они подмешиваются при чтении ленты. При подписке
+в ленту подписчика добавляются последние timeline_backfill_size твитов
+автора, при отписке твиты автора из ленты удаляются.
+"""
+from typing import Any, List, Optional
+
+from sqlalchemy import (
+    column,
+    func,
+    literal,
+    select,
+    true,
+    tuple_,
+    union,
+    values,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from sqlalchemy.types import Integer
+
+from src.auth.models import followers
+from src.config import Settings, get_settings
+from src.pagination import decode_cursor
+from src.tweet.models import Tweet, timeline
+
+settings: Settings = get_settings()
+
+
+async def is_fanout_on_read(user_id: int, session: AsyncSession) -> bool:
+    """
+    Функция проверки, нужно ли раздавать твиты автора при чтении.
+
+    У авторов с числом подписчиков больше timeline_fanout_limit твиты
+    не копируются в ленты подписчиков, а подмешиваются при чтении ленты.
+    Подписчики считаются не дальше limit + 1.
+
+    Args:
+        user_id: id автора твита
+        session: асинхронная сессия подключения к базе данных
+
+    Returns:
+        bool: True, если твиты автора раздаются при чтении
+    """
+    limit: int = settings.timeline_fanout_limit
+    followers_sample: Any = (
+        select(followers.c.user_id).
+        where(followers.c.following_id == user_id).
+        limit(limit + 1).
+        subquery()
+    )
+    total: int = await session.scalar(
+        select(func.count()).select_from(followers_sample),
+    )
+
+    return total > limit
+
+
+async def fan_out_tweet(
+    tweet_ids: List[int],
+    owner_id: int,
+    to_followers: bool,
+    session: AsyncSession,
+) -> None:
+    """
+    Функция добавления новых твитов автора в ленты (timeline) пользователей.
+
+    Твиты всегда попадают в ленту автора, а при to_followers - еще и в ленты
+    всех его подписчиков, после чего их ленты обрезаются до
+    timeline_max_length записей.
+
+    Args:
+        tweet_ids: id новых твитов
+        owner_id: id автора твита
+        to_followers: добавлять ли твит в ленты подписчиков
+        session: асинхронная сессия подключения к базе данных
+    """
+    readers: Any = select(literal(owner_id).label('user_id'))
+    if to_followers:
+        readers = union(
+            readers,
+            select(followers.c.user_id).
+            where(followers.c.following_id == owner_id),
+        )
+    readers = readers.subquery()
+    posted: Any = values(
+        column('tweet_id', Integer), name='posted',
+    ).data([(tweet_id,) for tweet_id in tweet_ids])
+    entries: Any = (
+        select(readers.c.user_id, posted.c.tweet_id, posted.c.tweet_id).
+        join(posted, true())
+    )
+    await session.execute(
+        pg_insert(timeline).
+        from_select(['user_id', 'tweet_id', 'score'], entries).
+        on_conflict_do_nothing(),
+    )
+    await trim_timelines(readers=readers, session=session)
+
+
+async def trim_timelines(readers: Any, session: AsyncSession) -> None:
+    """
+    Функция обрезки лент пользователей до timeline_max_length записей.
+
+    Args:
+        readers: подзапрос с колонкой user_id пользователей
+        session: асинхронная сессия подключения к базе данных
+    """
+    kept: Any = aliased(timeline)
+    ordered: Any = (
+        select(kept.c.score).
+        where(kept.c.user_id == readers.c.user_id).
+        order_by(kept.c.score.desc(), kept.c.tweet_id.desc())
+    )
+    oldest_kept_score: Any = (
+        ordered.
+        offset(settings.timeline_max_length - 1).
+        limit(1).
+        scalar_subquery()
+    )
+    bounds: Any = select(
+        readers.c.user_id,
+        oldest_kept_score.label('score'),
+    ).subquery()
+    await session.execute(
+        timeline.delete().
+        where(
+            timeline.c.user_id == bounds.c.user_id,
+            timeline.c.score < bounds.c.score,
+        ),
+    )
+
+
+def backfill_timelines(follows: Any) -> Any:
+    """
+    Функция построения CTE заполнения лент после подписки.
+
+    В ленту подписчика добавляются последние timeline_backfill_size
+    твитов каждого автора, кроме твитов авторов с fan-out при чтении.
+    Лента обрезается до timeline_max_length при следующем fan-out.
+
+    Args:
+        follows: CTE новых подписок с колонками user_id и following_id
+
+    Returns:
+        Any: CTE вставки в timeline
+    """
+    recent: Any = (
+        select(
+            follows.c.user_id,
+            Tweet.id.label('tweet_id'),
+            func.row_number().over(
+                partition_by=(follows.c.user_id, Tweet.owner_id),
+                order_by=Tweet.id.desc(),
+            ).label('position'),
+        ).
+        join(Tweet, Tweet.owner_id == follows.c.following_id).
+        where(~Tweet.fanout_on_read).
+        subquery('recent')
+    )
+
+    return (
+        pg_insert(timeline).
+        from_select(
+            ['user_id', 'tweet_id', 'score'],
+            select(recent.c.user_id, recent.c.tweet_id, recent.c.tweet_id).
+            where(recent.c.position <= settings.timeline_backfill_size),
+        ).
+        on_conflict_do_nothing().
+        returning(timeline.c.tweet_id).
+        cte('backfilled')
+    )
+
+
+def clear_timelines(unfollows: Any) -> Any:
+    """
+    Функция построения CTE удаления твитов автора из ленты после отписки.
+
+    Args:
+        unfollows: CTE удаленных подписок с колонками user_id и following_id
+
+    Returns:
+        Any: CTE удаления из timeline
+    """
+    return (
+        timeline.delete().
+        where(
+            timeline.c.user_id == unfollows.c.user_id,
+            timeline.c.tweet_id == Tweet.id,
+            Tweet.owner_id == unfollows.c.following_id,
+        ).
+        returning(timeline.c.tweet_id).
+        cte('cleared')
+    )
+
+
+def timeline_entries(
+    user_id: int,
+    limit: int,
+    cursor: Optional[str],
+) -> Any:
+    """
+    Функция построения подзапроса записей страницы ленты.
+
+    Записи читаются одним проходом по индексу (user_id, score DESC)
+    таблицы timeline, к ним подмешиваются твиты авторов с fan-out при
+    чтении, на которых подписан пользователь.
+
+    Args:
+        user_id: id пользователя, чью ленту читаем
+        limit: количество твитов на странице
+        cursor: курсор, полученный вместе с предыдущей страницей
+
+    Returns:
+        Any: подзапрос с колонками tweet_id и score
+    """
+    materialized: Any = (
+        select(timeline.c.tweet_id, timeline.c.score).
+        where(timeline.c.user_id == user_id)
+    )
+    on_read: Any = (
+        select(Tweet.id, Tweet.id.label('score')).
+        join(followers, followers.c.following_id == Tweet.owner_id).
+        where(followers.c.user_id == user_id, Tweet.fanout_on_read)
+    )
+    if cursor is not None:
+        last_key: tuple = decode_cursor(cursor, size=2)
+        materialized = materialized.where(
+            tuple_(timeline.c.score, timeline.c.tweet_id) < last_key,
+        )
+        on_read = on_read.where(Tweet.id < last_key[1])
+
+    return union(
+        materialized.
+        order_by(timeline.c.score.desc(), timeline.c.tweet_id.desc()).
+        limit(limit + 1),
+        on_read.order_by(Tweet.id.desc()).limit(limit + 1),
+    ).subquery()
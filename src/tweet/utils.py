@@ -1,4 +1,5 @@
 """Модуль для работы с загружаемыми файлами."""
+from contextlib import suppress
 from os import path
 from random import choice
 from string import ascii_letters, digits
@@ -6,20 +7,21 @@ from string import ascii_letters, digits
 from aiofiles.os import remove
 from aiofiles import open
 from fastapi import UploadFile
-from sqlalchemy import ScalarResult
 
 SYMBOLS = ascii_letters + digits
 
 
-async def delete_medias(medias: ScalarResult) -> None:
+async def delete_media(media_path: str) -> None:
     """
-    Функция для удаления изображения при удалении твита.
+    Функция для удаления файла изображения удаленного твита.
+
+    Уже отсутствующий файл считается удаленным.
 
     Args:
-        medias: путь до удаляемого файла
+        media_path: путь до удаляемого файла
     """
-    for media in medias.all():
-        await remove('/src/{}'.format(media.media_path))
+    with suppress(FileNotFoundError):
+        await remove('/src/{}'.format(media_path))
 
 
 async def save_media(media_file: UploadFile) -> str:
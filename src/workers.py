@@ -0,0 +1,62 @@
+"""Модуль запуска и остановки фоновых задач приложения."""
+import asyncio
+from typing import Callable, List, Tuple
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.auth.graph import run_follow_graph
+from src.auth.suggestions import run_suggestions
+from src.auth.utils_user import password_pool
+from src.config import Settings, get_settings
+from src.tweet.likes import close_like_buffer, run_like_buffer
+from src.tweet.media_cleanup import run_media_cleanup
+from src.tweet.ranking import run_ranking
+
+settings: Settings = get_settings()
+
+
+def start_workers(session_maker: async_sessionmaker) -> List[asyncio.Task]:
+    """
+    Функция запуска включенных в настройках фоновых задач.
+
+    Args:
+        session_maker: фабрика сессий для фоновых задач
+
+    Returns:
+        List[asyncio.Task]: запущенные фоновые задачи
+    """
+    workers: List[Tuple[bool, Callable]] = [
+        (settings.ranking_enabled, run_ranking),
+        (settings.follow_graph_enabled, run_follow_graph),
+        (settings.suggestions_enabled, run_suggestions),
+        (settings.like_buffer_enabled, run_like_buffer),
+        (settings.media_cleanup_enabled, run_media_cleanup),
+    ]
+
+    return [
+        asyncio.create_task(worker(session_maker=session_maker))
+        for enabled, worker in workers
+        if enabled
+    ]
+
+
+async def stop_workers(
+    tasks: List[asyncio.Task],
+    session_maker: async_sessionmaker,
+) -> None:
+    """
+    Функция остановки фоновых задач.
+
+    После отмены задач сбрасывается буфер лайков и закрывается пул
+    хэширования паролей.
+
+    Args:
+        tasks: запущенные фоновые задачи
+        session_maker: фабрика сессий для сброса буфера лайков
+    """
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    if settings.like_buffer_enabled:
+        await close_like_buffer(session_maker=session_maker)
+    password_pool.shutdown()
@@ -4,6 +4,7 @@ import pytest
 from typing import AsyncGenerator
 
 import sqlalchemy
+from sqlalchemy import event
 from httpx import AsyncClient
 from testcontainers.postgres import PostgresContainer
 from sqlalchemy.ext.asyncio import (
@@ -14,7 +15,7 @@ from sqlalchemy.ext.asyncio import (
 )
 
 from src.auth.models import BaseAuth
-from src.database import get_session
+from src.database import get_session, get_session_maker
 from src.main import app_api
 from src.tweet.models import BaseTweet
 from src.config import get_settings
@@ -43,6 +44,7 @@ async def override_get_session() -> AsyncGenerator:
 
 
 app_api.dependency_overrides[get_session] = override_get_session
+app_api.dependency_overrides[get_session_maker] = lambda: test_async_session
 
 
 @pytest.fixture(scope="session", autouse=True)
@@ -84,3 +86,20 @@ async def async_client() -> AsyncGenerator[AsyncClient, None]:
 async def async_session():
     async with test_async_session() as session:
         yield session
+
+
+@pytest.fixture(scope="session")
+def dsn() -> str:
+    return test_engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+@pytest.fixture
+def statements():
+    executed = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        executed.append(statement)
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    yield executed
+    event.remove(test_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
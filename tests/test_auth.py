@@ -3,6 +3,9 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.auth.models import User, followers
+from src.auth import utils_user
+from src.auth.utils_user import make_crypt_context, password_pool
+from src.config import get_settings
 
 
 async def test_register_user(async_client: AsyncClient, async_session: AsyncSession):
@@ -11,13 +14,6 @@ async def test_register_user(async_client: AsyncClient, async_session: AsyncSess
     assert response.status_code == 200
     assert 'apikey' in response.json()
 
-    response = await async_client.post("/api/register", json=data)
-    assert response.json() == {
-        'error_message': 'User with this email already exists',
-        'error_type': 'HTTPException',
-        'result': 'false'
-    }
-
     data = {"email": "example", "password": "123", "password_repeat": "123"}
     response = await async_client.post("/api/register", json=data)
     assert response.status_code == 422
@@ -39,6 +35,33 @@ async def test_login_user(async_client: AsyncClient):
     assert 'apikey' in response.json()
 
 
+async def test_login_upgrades_password_hash(
+    async_client: AsyncClient,
+    async_session: AsyncSession,
+    monkeypatch,
+):
+    monkeypatch.setattr(utils_user, "pwd_context", make_crypt_context("bcrypt", 4, 2, 19456))
+    data = {"email": "example@example.com", "password": "123"}
+    response = await async_client.post("/api/login", json=data)
+    assert response.status_code == 200
+
+    password = await async_session.scalar(select(User.password).where(User.email == data["email"]))
+    assert password.startswith("$2b$04$")
+    assert utils_user.validate_password("123", password)
+
+
+async def test_login_password_pool_busy(async_client: AsyncClient, monkeypatch):
+    monkeypatch.setattr(password_pool, "pending", password_pool.workers + password_pool.queue_size)
+    data = {"email": "example@example.com", "password": "123"}
+    response = await async_client.post("/api/login", json=data)
+    assert response.status_code == 503
+    assert response.json() == {
+        'error_message': 'Server is busy, try again later',
+        'error_type': 'HTTPException',
+        'result': 'false'
+    }
+
+
 async def test_login_invalid_email(async_client: AsyncClient):
     invalid_data = {"email": "user123@user.com", "password": "123"}
     response = await async_client.post("/api/login", json=invalid_data)
@@ -60,6 +83,17 @@ async def test_get_user_me_invalid_api_key(async_client: AsyncClient):
     }
 
 
+async def test_get_user_me_unknown_api_key(async_client: AsyncClient, statements: list):
+    headers = {"api-key": "00000000-0000-4000-8000-000000000000"}
+    response = await async_client.get("/api/users/me", headers=headers)
+    assert response.status_code == 404
+
+    statements.clear()
+    response = await async_client.get("/api/users/me", headers=headers)
+    assert response.status_code == 404
+    assert statements == []
+
+
 async def test_get_user_me(async_client: AsyncClient, user: dict):
     response = await async_client.get("/api/users/me", headers={"api-key": user["apikey"]})
     assert response.status_code == 200
@@ -67,14 +101,30 @@ async def test_get_user_me(async_client: AsyncClient, user: dict):
     assert user_info["user"]["name"] == "user"
 
 
+async def test_get_user_me_cached_api_key(async_client: AsyncClient, user: dict, statements: list):
+    headers = {"api-key": user["apikey"]}
+    response = await async_client.get("/api/users/me", headers=headers)
+    etag = response.headers["etag"]
+
+    statements.clear()
+    response = await async_client.get("/api/users/me", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert statements == []
+
+
 async def test_get_user_by_id(async_client: AsyncClient, user: dict):
     response = await async_client.get("/api/users/2", headers={"api-key": user["apikey"]})
     assert response.status_code == 200
     assert response.json() == {
         'result': 'true',
         'user': {
+            'followers_count': 0,
+            'following_count': 0,
+            'is_followed': False,
             'followers': [],
             'following': [],
+            'followers_preview': [],
+            'following_preview': [],
             'id': 2,
             'name': 'user1'}
     }
@@ -107,10 +157,17 @@ async def test_add_new_follower(async_client: AsyncClient, user: dict, async_ses
     follow = await async_session.execute(followers.select())
     assert len(follow.all()) == 1
 
+    response_unknown_user = await async_client.post("/api/users/99/follow", headers={"api-key": user["apikey"]})
+    assert response_unknown_user.status_code == 404
+
     response_without_user = await async_client.post("/api/users/2/follow")
     assert response_without_user.status_code == 403
     assert response_without_user.json() == {'detail': 'Not authenticated'}
 
+    unknown_headers = {"api-key": "00000000-0000-4000-8000-000000000000"}
+    response_unknown_key = await async_client.delete("/api/users/2/follow", headers=unknown_headers)
+    assert response_unknown_key.status_code == 404
+
 
 async def test_delete_follower(async_client: AsyncClient, user: dict, async_session: AsyncSession):
     response = await async_client.delete(
@@ -133,3 +190,133 @@ async def test_delete_follower(async_client: AsyncClient, user: dict, async_sess
         'error_type': 'HTTPException',
         'result': 'false'
     }
+
+
+async def test_get_user_by_id_etag(async_client: AsyncClient, user: dict):
+    headers = {"api-key": user["apikey"]}
+    response = await async_client.get("/api/users/2", headers=headers)
+    etag = response.headers["etag"]
+
+    response = await async_client.get("/api/users/2", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+    await async_client.post("/api/users/2/follow", headers=headers)
+    response = await async_client.get("/api/users/2", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["user"]["followers"] == [{"id": 3, "name": "user"}]
+
+    await async_client.delete("/api/users/2/follow", headers=headers)
+
+
+async def test_get_user_followers_pages(async_client: AsyncClient, user: dict, monkeypatch):
+    headers = {"api-key": user["apikey"]}
+    login = await async_client.post("/api/login", json={"email": "example@example.com", "password": "123"})
+    example_headers = {"api-key": login.json()["apikey"]}
+    await async_client.post("/api/users/2/follow", headers=headers)
+    await async_client.post("/api/users/2/follow", headers=example_headers)
+
+    response = await async_client.get("/api/users/2/followers", params={"limit": 1}, headers=headers)
+    assert response.status_code == 200
+    page = response.json()
+    assert page["users"] == [{"id": 1, "name": "example"}]
+    assert page["next_cursor"] is not None
+
+    response = await async_client.get(
+        "/api/users/2/followers", params={"limit": 1, "cursor": page["next_cursor"]}, headers=headers,
+    )
+    assert response.json() == {"result": "true", "users": [{"id": 3, "name": "user"}], "next_cursor": None}
+
+    response = await async_client.get("/api/users/3/following", headers=headers)
+    assert response.json() == {"result": "true", "users": [{"id": 2, "name": "user1"}], "next_cursor": None}
+
+    response = await async_client.get("/api/users/2", headers=headers)
+    profile = response.json()["user"]
+    assert profile["followers_count"] == 2
+    assert profile["following_count"] == 0
+    assert profile["followers"] == [{"id": 1, "name": "example"}, {"id": 3, "name": "user"}]
+    assert profile["is_followed"] is True
+
+    monkeypatch.setattr(get_settings(), "profile_preview_size", 1)
+    response = await async_client.get("/api/users/2", headers=headers)
+    profile = response.json()["user"]
+    assert profile["followers"] == [{"id": 1, "name": "example"}, {"id": 3, "name": "user"}]
+    assert profile["followers_preview"] == [{"id": 1, "name": "example"}]
+
+    response = await async_client.get("/api/users/99/followers", headers=headers)
+    assert response.status_code == 404
+
+    await async_client.delete("/api/users/2/follow", headers=headers)
+    await async_client.delete("/api/users/2/follow", headers=example_headers)
+
+
+async def test_statement_counts(async_client: AsyncClient, user: dict, statements: list):
+    headers = {"api-key": user["apikey"]}
+    await async_client.get("/api/users/me", headers=headers)
+    requests = [
+        ("post", "/api/login", {"json": {"email": "example@example.com", "password": "123"}}, 2),
+        ("get", "/api/users/me", {}, 1),
+        ("get", "/api/users/2", {}, 1),
+        ("post", "/api/users/2/follow", {}, 1),
+        ("get", "/api/users/2/followers", {}, 1),
+        ("get", "/api/users/3/following", {}, 1),
+        ("delete", "/api/users/2/follow", {}, 1),
+    ]
+    for method, url, kwargs, count in requests:
+        statements.clear()
+        response = await async_client.request(method, url, headers=headers, **kwargs)
+        assert response.status_code == 200
+        assert len(statements) == count, (method, url, statements)
+
+
+async def test_follow_batch(async_client: AsyncClient, user: dict, statements: list):
+    headers = {"api-key": user["apikey"]}
+    await async_client.post("/api/users/2/follow", headers=headers)
+
+    statements.clear()
+    response = await async_client.post("/api/users/follow:batch", json={"ids": [1, 2, 99, 1]}, headers=headers)
+    assert response.status_code == 200
+    assert len(statements) == 1
+    assert response.json() == {
+        "result": "true",
+        "results": [
+            {"id": 1, "status": "followed"},
+            {"id": 2, "status": "already_following"},
+            {"id": 99, "status": "not_found"},
+        ],
+    }
+
+    response = await async_client.get("/api/users/3", headers=headers)
+    assert response.json()["user"]["following_count"] == 2
+
+    response = await async_client.request("DELETE", "/api/users/follow:batch", json={"ids": [1, 2, 4]}, headers=headers)
+    assert response.json() == {
+        "result": "true",
+        "results": [
+            {"id": 1, "status": "unfollowed"},
+            {"id": 2, "status": "unfollowed"},
+            {"id": 4, "status": "not_following"},
+        ],
+    }
+
+    response = await async_client.post("/api/users/follow:batch", json={"ids": []}, headers=headers)
+    assert response.status_code == 422
+
+
+async def test_get_user_suggestions(async_client: AsyncClient, user: dict):
+    response = await async_client.get("/api/users/me/suggestions", headers={"api-key": user["apikey"]})
+    assert response.status_code == 200
+    assert response.json() == {"result": "true", "users": []}
+
+
+async def test_register_user_duplicate_email(async_client: AsyncClient, async_session: AsyncSession):
+    data = {"email": "example@example.com", "password": "123", "password_repeat": "123"}
+    response = await async_client.post("/api/register", json=data)
+    assert response.json() == {
+        'error_message': 'User with this email already exists',
+        'error_type': 'HTTPException',
+        'result': 'false'
+    }
+
+    users = await async_session.execute(select(User).where(User.email == data["email"]))
+    assert len(users.all()) == 1
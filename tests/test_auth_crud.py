@@ -1,19 +1,24 @@
-from sqlalchemy.ext.asyncio import AsyncSession
-
-from src.auth.crud import (
-    create_user,
-    get_user_by_email,
-    get_all_info_user,
-    add_follower_by_id,
-    delete_follower_by_id,
-)
+import asyncio
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.auth.bulk_import import ImportOptions, bulk_import
+from src.auth.graph import FollowGraph
+from src.auth.models import ApiKey, User
+
+from src.auth.crud import create_user, get_user_by_email, get_follow_page
+from src.auth.follows import add_follower_by_id, delete_follower_by_id
+from src.auth.profile import get_all_info_user
 from src.auth.schemas import UserRegisterSchema
+from src.auth.suggestions import get_user_suggestions, refresh_suggestions, stale_users_query
 
 
-async def test_register_user_crud(async_session: AsyncSession):
+async def test_register_user_crud(async_session: AsyncSession, statements: list):
     user = UserRegisterSchema(email='new_user@user.com', password='123', password_repeat='123')
     result = await create_user(user, async_session)
     assert result != ''
+    assert len(statements) == 1
 
 
 async def test_get_user_by_email(async_session: AsyncSession):
@@ -22,7 +27,8 @@ async def test_get_user_by_email(async_session: AsyncSession):
 
 
 async def test_get_all_info_user(async_session: AsyncSession):
-    user_info = await get_all_info_user(user_id=4, session=async_session)
+    user = await get_user_by_email('new_user@user.com', async_session)
+    user_info = await get_all_info_user(user_id=user.id, session=async_session)
     assert user_info['name'] == 'new_user'
 
 
@@ -31,6 +37,7 @@ async def test_add_follower_by_id(async_session: AsyncSession):
     user_info = await get_all_info_user(user_id=3, session=async_session)
     assert user_info['followers'] == []
     assert user_info['following'] == [{'id': 2, 'name': 'user1'}]
+    assert user_info['following_count'] == 1
 
 
 async def test_delete_follower_by_id(async_session: AsyncSession):
@@ -38,3 +45,133 @@ async def test_delete_follower_by_id(async_session: AsyncSession):
     user_info = await get_all_info_user(user_id=3, session=async_session)
     assert user_info['followers'] == []
     assert user_info['following'] == []
+
+
+async def test_bulk_import(async_session: AsyncSession, dsn: str, tmp_path, capsys):
+    source = tmp_path / "users.csv"
+    source.write_text(
+        "email,password\n"
+        "bulk1@user.com,123\n"
+        "not-an-email,123\n"
+        "example@example.com,123\n"
+        "bulk2@user.com,123\n"
+        "bulk2@user.com,456\n"
+    )
+    checkpoint = str(tmp_path / "users.checkpoint")
+    output = tmp_path / "users.keys"
+    options = ImportOptions(file_format="csv", batch_size=2, workers=1, checkpoint=checkpoint, output=str(output))
+
+    assert await bulk_import(path=str(source), dsn=dsn, options=options) == 2
+    keys = dict(line.split(",") for line in output.read_text().splitlines())
+    assert list(keys) == ["bulk1@user.com", "bulk2@user.com"]
+    assert "skip record 2" in capsys.readouterr().err
+    with open(checkpoint) as file:
+        assert file.read() == "5"
+
+    user = await get_user_by_email("bulk2@user.com", async_session)
+    assert user.name == "bulk2"
+    api_key = await async_session.scalar(select(ApiKey.apikey).where(ApiKey.user_id == user.id))
+    assert api_key == keys["bulk2@user.com"]
+
+    assert await bulk_import(path=str(source), dsn=dsn, options=options) == 0
+    users = await async_session.scalar(select(func.count()).select_from(User).where(User.email.like("bulk%")))
+    assert users == 2
+
+
+async def test_bulk_import_malformed_ndjson(async_session: AsyncSession, dsn: str, tmp_path, capsys):
+    source = tmp_path / "users.ndjson"
+    source.write_text(
+        '{"email": "bulk3@user.com", "password": "123"}\n'
+        '{"email": \n'
+        '["bulk4@user.com"]\n'
+        '{"email": "bulk4@user.com", "password": "123"}\n'
+    )
+    options = ImportOptions(
+        file_format="ndjson",
+        batch_size=10,
+        workers=1,
+        checkpoint=str(tmp_path / "users.checkpoint"),
+        output=str(tmp_path / "users.keys"),
+    )
+
+    assert await bulk_import(path=str(source), dsn=dsn, options=options) == 2
+    err = capsys.readouterr().err
+    assert "skip record 2: record is not a JSON object" in err
+    assert "skip record 3: record is not a JSON object" in err
+
+
+async def test_refresh_suggestions(async_session: AsyncSession):
+    new_user = await get_user_by_email('new_user@user.com', async_session)
+    follows = [(3, 2), (2, 1), (2, new_user.id), (new_user.id, 1)]
+    for user_id, idx in follows:
+        await add_follower_by_id(idx=idx, user_id=user_id, session=async_session)
+
+    assert await refresh_suggestions(session=async_session, batch_size=100) >= len(follows)
+    assert await refresh_suggestions(session=async_session, batch_size=100) == 0
+    suggestions = await get_user_suggestions(user_id=3, limit=10, session=async_session)
+    assert suggestions == [
+        {'id': 1, 'name': 'example', 'mutual_count': 1},
+        {'id': new_user.id, 'name': 'new_user', 'mutual_count': 1},
+    ]
+
+    await add_follower_by_id(idx=1, user_id=3, session=async_session)
+    suggestions = await get_user_suggestions(user_id=3, limit=10, session=async_session)
+    assert suggestions == [{'id': new_user.id, 'name': 'new_user', 'mutual_count': 1}]
+
+    for user_id, idx in follows + [(3, 1)]:
+        await delete_follower_by_id(idx=idx, user_id=user_id, session=async_session)
+
+
+async def test_refresh_suggestions_lock_allows_follows(async_session: AsyncSession):
+    await async_session.execute(update(User).values(suggestions_refreshed_at=None))
+    await async_session.commit()
+
+    async with async_sessionmaker(async_session.bind)() as locker:
+        assert len((await locker.scalars(stale_users_query(batch_size=100))).all()) >= 3
+        await asyncio.wait_for(add_follower_by_id(idx=2, user_id=3, session=async_session), timeout=5)
+        await locker.rollback()
+
+    await delete_follower_by_id(idx=2, user_id=3, session=async_session)
+
+
+async def test_follow_graph(async_session: AsyncSession, monkeypatch):
+    new_user = await get_user_by_email('new_user@user.com', async_session)
+    follows = [(3, 2), (1, 2), (2, 1)]
+    for user_id, idx in follows:
+        await add_follower_by_id(idx=idx, user_id=user_id, session=async_session)
+    graph = FollowGraph()
+    for module in ('crud', 'follows', 'profile'):
+        monkeypatch.setattr('src.auth.{0}.follow_graph'.format(module), graph)
+    await graph.load(session=async_session)
+
+    assert graph.following.page(3, after=None, limit=10) == [2]
+    assert graph.following.page(2, after=None, limit=10) == [1]
+    assert graph.followers.count(2) == 2
+    assert graph.following.count(2) == 1
+    assert graph.followers.page(2, after=None, limit=10) == [1, 3]
+    assert graph.followers.page(2, after=1, limit=10) == [3]
+
+    await delete_follower_by_id(idx=2, user_id=1, session=async_session)
+    await add_follower_by_id(idx=2, user_id=new_user.id, session=async_session)
+    assert graph.following.count(1) == 0
+    assert graph.followers.page(2, after=None, limit=10) == [3, new_user.id]
+    assert graph.following.page(new_user.id, after=None, limit=10) == [2]
+
+    page = await get_follow_page(user_id=2, following=False, session=async_session, limit=1)
+    assert page['users'] == [{'id': 3, 'name': 'user'}]
+    page = await get_follow_page(user_id=2, following=False, session=async_session, cursor=page['next_cursor'])
+    assert page == {'result': 'true', 'users': [{'id': new_user.id, 'name': 'new_user'}], 'next_cursor': None}
+    user_info = await get_all_info_user(user_id=2, session=async_session, viewer_id=3)
+    assert user_info['followers_count'] == 2
+    assert user_info['following_count'] == 1
+    assert user_info['is_followed'] is True
+    assert user_info['followers'] == [{'id': 3, 'name': 'user'}, {'id': new_user.id, 'name': 'new_user'}]
+    graph.add(new_user.id, 3)
+    user_info = await get_all_info_user(user_id=3, session=async_session, viewer_id=new_user.id)
+    assert user_info['is_followed'] is True
+    assert user_info['followers'] == [{'id': new_user.id, 'name': 'new_user'}]
+    graph.remove(new_user.id, 3)
+
+    for user_id, idx in [(3, 2), (2, 1), (new_user.id, 2)]:
+        await delete_follower_by_id(idx=idx, user_id=user_id, session=async_session)
+    assert graph.followers.count(2) == 0
@@ -2,17 +2,21 @@ from httpx import AsyncClient
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.config import get_settings
+from src.tweet.cache import FeedCache, feed_cache
 from tweet.models import Tweet, likes_table
 
+settings = get_settings()
+
 
 async def test_add_tweet(async_client: AsyncClient, user: dict, async_session: AsyncSession):
-    data = {"tweet_data": "tweet", "tweet_media_ids": []}
-    response = await async_client.post("/api/tweets", json=data, headers={"api-key": user["apikey"]})
+    data = {'tweet_data': 'tweet', 'tweet_media_ids': []}
+    response = await async_client.post('/api/tweets', json=data, headers={'api-key': user['apikey']})
     assert response.status_code == 200
     assert response.json() == {'result': 'true', 'tweet_id': 1}
 
-    invalid_data = {"tweet_data": "tweet"}
-    response = await async_client.post("/api/tweets", json=invalid_data, headers={"api-key": user["apikey"]})
+    invalid_data = {'tweet_data': 'tweet'}
+    response = await async_client.post('/api/tweets', json=invalid_data, headers={'api-key': user['apikey']})
     assert response.status_code == 422
     assert response.json() == {
         'error_message': 'Field required',
@@ -25,16 +29,63 @@ async def test_add_tweet(async_client: AsyncClient, user: dict, async_session: A
 
 
 async def test_get_tweets(async_client: AsyncClient, user: dict):
-    response = await async_client.get("/api/tweets", headers={"api-key": user["apikey"]})
+    response = await async_client.get('/api/tweets', headers={'api-key': user['apikey']})
     assert response.status_code == 200
-    assert response.json()["result"] == "true"
+    assert response.json()['result'] == 'true'
+
+
+async def test_get_tweets_stream(async_client: AsyncClient, user: dict):
+    response = await async_client.get('/api/tweets', headers={'api-key': user['apikey']})
+    stream_response = await async_client.get(
+        '/api/tweets', params={'stream': True}, headers={'api-key': user['apikey']}
+    )
+    assert stream_response.status_code == 200
+    assert stream_response.json() == response.json()
+    assert len(stream_response.json()['tweets']) == 1
+
+
+async def test_get_tweets_stream_with_pagination(async_client: AsyncClient, user: dict):
+    for params in ({'stream': True, 'limit': 1}, {'stream': True, 'cursor': 'x'}):
+        response = await async_client.get('/api/tweets', params=params, headers={'api-key': user['apikey']})
+        assert response.status_code == 422
+        assert response.json()['error_message'] == 'stream cannot be combined with limit or cursor'
+
+
+async def test_statement_counts(async_client: AsyncClient, user: dict, statements: list):
+    login = await async_client.post('/api/login', json={'email': 'example@example.com', 'password': '123'})
+    headers = {'api-key': login.json()['apikey']}
+    await async_client.get('/api/users/me', headers=headers)
+    feed_cache.invalidate()
+    requests = [
+        ('get', '/api/tweets', 1),
+        ('get', '/api/tweets', 0),
+        ('get', '/api/timeline', 1),
+        ('post', '/api/tweets/1/likes', 1),
+        ('delete', '/api/tweets/1/likes', 1),
+    ]
+    for method, url, count in requests:
+        statements.clear()
+        response = await async_client.request(method, url, headers=headers)
+        assert response.status_code == 200
+        assert len(statements) == count, (method, url, statements)
+
+
+def test_feed_cache_skips_stale_page():
+    cache = FeedCache(maxsize=10, ttl=60)
+    version = cache.version
+    cache.invalidate()
+    cache.set(version=version, limit=None, cursor=None, page={'tweets': []})
+    assert cache.get(version=cache.version, limit=None, cursor=None) is None
+
+    cache.set(version=cache.version, limit=None, cursor=None, page={'tweets': []})
+    assert cache.get(version=cache.version, limit=None, cursor=None) == {'tweets': []}
 
 
 async def test_add_like_invalid_id(async_client: AsyncClient, user: dict, async_session: AsyncSession):
-    response = await async_client.post("/api/tweets/3/likes", headers={"api-key": user["apikey"]})
+    response = await async_client.post('/api/tweets/3/likes', headers={'api-key': user['apikey']})
     assert response.status_code == 404
     assert response.json() == {
-        "result": "false",
+        'result': 'false',
         'error_message': 'Not Found',
         'error_type': 'HTTPException'
     }
@@ -44,16 +95,16 @@ async def test_add_like_invalid_id(async_client: AsyncClient, user: dict, async_
 
 
 async def test_add_like(async_client: AsyncClient, user: dict, async_session: AsyncSession):
-    response = await async_client.post("/api/tweets/1/likes", headers={"api-key": user["apikey"]})
+    response = await async_client.post('/api/tweets/1/likes', headers={'api-key': user['apikey']})
     assert response.status_code == 200
-    assert response.json() == {"result": "true"}
+    assert response.json() == {'result': 'true'}
 
     likes = await async_session.execute(likes_table.select())
     assert len(likes.all()) == 0
 
 
 async def test_delete_tweet(async_client: AsyncClient, user: dict, async_session: AsyncSession):
-    response_invalid_id = await async_client.delete("/api/tweets/3", headers={"api-key": user["apikey"]})
+    response_invalid_id = await async_client.delete('/api/tweets/3', headers={'api-key': user['apikey']})
     assert response_invalid_id.status_code == 404
     assert response_invalid_id.json() == {
         'error_message': 'Not Found',
@@ -61,9 +112,89 @@ async def test_delete_tweet(async_client: AsyncClient, user: dict, async_session
         'result': 'false'
     }
 
-    response = await async_client.delete("/api/tweets/1", headers={"api-key": user["apikey"]})
+    response = await async_client.delete('/api/tweets/1', headers={'api-key': user['apikey']})
     assert response.status_code == 200
     assert response.json() == {'result': 'true'}
 
     likes = await async_session.execute(likes_table.select())
     assert len(likes.all()) == 0
+
+
+async def test_get_tweets_invalid_cursor(async_client: AsyncClient, user: dict):
+    response = await async_client.get(
+        '/api/tweets', params={'cursor': 'invalid'}, headers={'api-key': user['apikey']}
+    )
+    assert response.status_code == 422
+    assert response.json() == {
+        'error_message': 'Invalid cursor',
+        'error_type': 'HTTPException',
+        'result': 'false'
+    }
+
+
+async def test_get_tweets_gzip(async_client: AsyncClient, user: dict, monkeypatch):
+    monkeypatch.setattr(settings, 'feed_raw_snapshots', True)
+    feed_cache.invalidate()
+    response = await async_client.get(
+        '/api/tweets', headers={'api-key': user['apikey'], 'Accept-Encoding': 'gzip'}
+    )
+    assert response.headers['content-encoding'] == 'gzip'
+    assert response.headers['vary'] == 'Accept-Encoding'
+    assert response.json()['result'] == 'true'
+    gzip_etag = response.headers['etag']
+    assert gzip_etag.endswith('-gz"')
+
+    response = await async_client.get(
+        '/api/tweets', headers={'api-key': user['apikey'], 'Accept-Encoding': 'identity'}
+    )
+    assert 'content-encoding' not in response.headers
+    assert response.headers['vary'] == 'Accept-Encoding'
+    assert int(response.headers['content-length']) == len(response.content)
+    assert response.json()['result'] == 'true'
+    assert response.headers['etag'] != gzip_etag
+
+    response = await async_client.get(
+        '/api/tweets',
+        headers={'api-key': user['apikey'], 'Accept-Encoding': 'identity', 'If-None-Match': gzip_etag},
+    )
+    assert response.status_code == 200
+    response = await async_client.get(
+        '/api/tweets',
+        headers={'api-key': user['apikey'], 'Accept-Encoding': 'gzip', 'If-None-Match': gzip_etag},
+    )
+    assert response.status_code == 304
+    assert response.headers['vary'] == 'Accept-Encoding'
+    feed_cache.invalidate()
+
+
+async def test_get_tweets_etag(async_client: AsyncClient, user: dict):
+    response = await async_client.get('/api/tweets', headers={'api-key': user['apikey']})
+    etag = response.headers['etag']
+
+    response = await async_client.get(
+        '/api/tweets', headers={'api-key': user['apikey'], 'If-None-Match': etag}
+    )
+    assert response.status_code == 304
+    assert response.headers['etag'] == etag
+
+
+async def test_add_tweets_batch_rejected(async_client: AsyncClient, user: dict, async_session: AsyncSession):
+    data = [
+        {'tweet_data': 'batch', 'tweet_media_ids': [998]},
+        {'tweet_data': 'batch', 'tweet_media_ids': [999]},
+    ]
+    response = await async_client.post('/api/tweets:batch', json=data, headers={'api-key': user['apikey']})
+    assert response.status_code == 200
+    assert response.json() == {
+        'result': 'true',
+        'results': [
+            {'tweet_id': None, 'status': 'media_not_found'},
+            {'tweet_id': None, 'status': 'media_not_found'},
+        ],
+    }
+
+    response = await async_client.post('/api/tweets:batch', json=[], headers={'api-key': user['apikey']})
+    assert response.status_code == 422
+
+    tweets = await async_session.execute(select(Tweet))
+    assert len(tweets.all()) == 0
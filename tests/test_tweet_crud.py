@@ -1,16 +1,29 @@
+import pytest
+from fastapi import HTTPException
+from httpx import AsyncClient
+from sqlalchemy import delete, func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.auth.follows import add_follower_by_id, delete_follower_by_id
+from src.tweet import crud, media_cleanup
 from src.tweet.crud import (
     create_tweet,
+    create_tweets,
     delete_tweet_by_id,
-    get_all_tweets,
     add_new_like,
     delete_like,
+    save_image_path,
+    settings,
 )
+from src.tweet.feed import get_all_tweets, get_user_timeline
+from src.tweet.cache import feed_cache
+from src.tweet.likes import LikeBuffer
+from src.tweet.models import Media, Tweet, likes_table, media_deletion
+from src.tweet.ranking import recompute_scores, refresh_popularity
 
 
 async def test_create_tweet(async_session: AsyncSession):
-    tweet = {'tweet_data': 'tweet', "tweet_media_ids": []}
+    tweet = {'tweet_data': 'tweet', 'tweet_media_ids': []}
     tweet_id = await create_tweet(tweet=tweet, user_id=2, session=async_session)
     assert tweet_id == 2
 
@@ -32,7 +45,365 @@ async def test_delete_like(async_session: AsyncSession):
     assert len(result['tweets'][0]['likes']) == 0
 
 
-async def test_delete_tweet_by_id(async_session: AsyncSession):
+async def test_delete_tweet_by_id(async_session: AsyncSession, statements):
+    with pytest.raises(HTTPException) as exc:
+        await delete_tweet_by_id(idx=999, user_id=2, session=async_session)
+    assert exc.value.status_code == 404
+    with pytest.raises(HTTPException) as exc:
+        await delete_tweet_by_id(idx=2, user_id=1, session=async_session)
+    assert exc.value.status_code == 403
+    tweets = await get_all_tweets(session=async_session)
+    assert len(tweets['tweets']) == 1
+
+    statements.clear()
     await delete_tweet_by_id(idx=2, user_id=2, session=async_session)
+    assert len(statements) == 1
     tweets = await get_all_tweets(session=async_session)
     assert len(tweets['tweets']) == 0
+
+
+async def test_get_all_tweets_pagination(async_session: AsyncSession):
+    tweet_ids = [
+        await create_tweet(
+            tweet={'tweet_data': 'page', 'tweet_media_ids': []},
+            user_id=2,
+            session=async_session,
+        )
+        for _ in range(3)
+    ]
+    first_page = await get_all_tweets(session=async_session, limit=2)
+    assert [tweet['id'] for tweet in first_page['tweets']] == tweet_ids[:0:-1]
+    assert first_page['next_cursor'] is not None
+
+    second_page = await get_all_tweets(
+        session=async_session, limit=2, cursor=first_page['next_cursor'],
+    )
+    assert [tweet['id'] for tweet in second_page['tweets']] == tweet_ids[:1]
+    assert second_page['next_cursor'] is None
+
+    for tweet_id in tweet_ids:
+        await delete_tweet_by_id(idx=tweet_id, user_id=2, session=async_session)
+
+
+async def test_get_all_tweets_statement_count(async_session: AsyncSession, statements: list):
+    tweet_ids = [
+        await create_tweet(
+            tweet={'tweet_data': 'count', 'tweet_media_ids': []},
+            user_id=2,
+            session=async_session,
+        )
+    ]
+    statements.clear()
+    await get_all_tweets(session=async_session)
+    single_tweet_count = len(statements)
+
+    for _ in range(5):
+        tweet_id = await create_tweet(
+            tweet={'tweet_data': 'count', 'tweet_media_ids': []},
+            user_id=2,
+            session=async_session,
+        )
+        await add_new_like(tweet_id=tweet_id, user_id=1, session=async_session)
+        tweet_ids.append(tweet_id)
+    statements.clear()
+    result = await get_all_tweets(session=async_session)
+    assert len(statements) == single_tweet_count == 1
+    assert result['tweets'][0]['likes'] == [{'user_id': 1, 'name': 'example'}]
+
+    for tweet_id in tweet_ids:
+        await delete_tweet_by_id(idx=tweet_id, user_id=2, session=async_session)
+
+
+async def test_like_count(async_session: AsyncSession):
+    tweet_id = await create_tweet(
+        tweet={'tweet_data': 'likes', 'tweet_media_ids': []},
+        user_id=2,
+        session=async_session,
+    )
+    await add_new_like(tweet_id=tweet_id, user_id=1, session=async_session)
+    await add_new_like(tweet_id=tweet_id, user_id=1, session=async_session)
+    await add_new_like(tweet_id=tweet_id, user_id=3, session=async_session)
+    tweet = await async_session.scalar(select(Tweet.like_count).where(Tweet.id == tweet_id))
+    assert tweet == 2
+
+    await delete_like(tweet_id=tweet_id, user_id=1, session=async_session)
+    await delete_like(tweet_id=tweet_id, user_id=1, session=async_session)
+    tweet = await async_session.scalar(select(Tweet.like_count).where(Tweet.id == tweet_id))
+    assert tweet == 1
+
+    await delete_tweet_by_id(idx=tweet_id, user_id=2, session=async_session)
+
+
+async def test_get_tweets_cache_invalidation(async_client: AsyncClient, user: dict):
+    headers = {'api-key': user['apikey']}
+    tweets_before = (await async_client.get('/api/tweets', headers=headers)).json()['tweets']
+
+    data = {'tweet_data': 'cached', 'tweet_media_ids': []}
+    tweet_id = (await async_client.post('/api/tweets', json=data, headers=headers)).json()['tweet_id']
+    tweets = (await async_client.get('/api/tweets', headers=headers)).json()['tweets']
+    assert len(tweets) == len(tweets_before) + 1
+
+    await async_client.delete('/api/tweets/{}'.format(tweet_id), headers=headers)
+    tweets = (await async_client.get('/api/tweets', headers=headers)).json()['tweets']
+    assert tweets == tweets_before
+
+
+async def test_get_user_timeline(async_session: AsyncSession, monkeypatch):
+    await add_follower_by_id(idx=2, user_id=3, session=async_session)
+    tweet_id = await create_tweet(
+        tweet={'tweet_data': 'timeline', 'tweet_media_ids': []},
+        user_id=2,
+        session=async_session,
+    )
+    monkeypatch.setattr(settings, 'timeline_fanout_limit', 0)
+    on_read_tweet_id = await create_tweet(
+        tweet={'tweet_data': 'timeline', 'tweet_media_ids': []},
+        user_id=2,
+        session=async_session,
+    )
+
+    follower_timeline = await get_user_timeline(user_id=3, session=async_session)
+    assert [tweet['id'] for tweet in follower_timeline['tweets']] == [on_read_tweet_id, tweet_id]
+    owner_timeline = await get_user_timeline(user_id=2, session=async_session, limit=1)
+    assert [tweet['id'] for tweet in owner_timeline['tweets']] == [on_read_tweet_id]
+    owner_timeline = await get_user_timeline(
+        user_id=2, session=async_session, limit=1, cursor=owner_timeline['next_cursor'],
+    )
+    assert [tweet['id'] for tweet in owner_timeline['tweets']] == [tweet_id]
+    other_timeline = await get_user_timeline(user_id=1, session=async_session)
+    assert other_timeline['tweets'] == []
+
+    await delete_tweet_by_id(idx=tweet_id, user_id=2, session=async_session)
+    await delete_tweet_by_id(idx=on_read_tweet_id, user_id=2, session=async_session)
+    await delete_follower_by_id(idx=2, user_id=3, session=async_session)
+    follower_timeline = await get_user_timeline(user_id=3, session=async_session)
+    assert follower_timeline['tweets'] == []
+
+
+async def test_timeline_follow_backfill(async_session: AsyncSession, monkeypatch):
+    monkeypatch.setattr(settings, 'timeline_backfill_size', 2)
+    tweet_ids = [
+        await create_tweet(
+            tweet={'tweet_data': 'backfill', 'tweet_media_ids': []},
+            user_id=2,
+            session=async_session,
+        )
+        for _ in range(3)
+    ]
+
+    await add_follower_by_id(idx=2, user_id=3, session=async_session)
+    follower_timeline = await get_user_timeline(user_id=3, session=async_session)
+    assert [tweet['id'] for tweet in follower_timeline['tweets']] == tweet_ids[:0:-1]
+
+    await delete_follower_by_id(idx=2, user_id=3, session=async_session)
+    follower_timeline = await get_user_timeline(user_id=3, session=async_session)
+    assert follower_timeline['tweets'] == []
+    owner_timeline = await get_user_timeline(user_id=2, session=async_session)
+    assert [tweet['id'] for tweet in owner_timeline['tweets']] == tweet_ids[::-1]
+    for tweet_id in tweet_ids:
+        await delete_tweet_by_id(idx=tweet_id, user_id=2, session=async_session)
+
+
+async def test_recompute_scores(async_session: AsyncSession):
+    tweet_id = await create_tweet(
+        tweet={'tweet_data': 'rank', 'tweet_media_ids': []},
+        user_id=2,
+        session=async_session,
+    )
+    score = await async_session.scalar(select(Tweet.score).where(Tweet.id == tweet_id))
+    await add_new_like(tweet_id=tweet_id, user_id=1, session=async_session)
+    assert await async_session.scalar(select(Tweet.score_dirty).where(Tweet.id == tweet_id))
+
+    version = feed_cache.version
+    assert await recompute_scores(session=async_session, batch_size=10) == 1
+    tweet = (await async_session.execute(
+        select(Tweet.score, Tweet.score_dirty).where(Tweet.id == tweet_id),
+    )).one()
+    assert tweet.score > score
+    assert not tweet.score_dirty
+    assert feed_cache.version > version
+    version = feed_cache.version
+    assert await recompute_scores(session=async_session, batch_size=10) == 0
+    assert feed_cache.version == version
+
+    score = tweet.score
+    await add_follower_by_id(idx=2, user_id=3, session=async_session)
+    assert not await async_session.scalar(select(Tweet.score_dirty).where(Tweet.id == tweet_id))
+    assert await refresh_popularity(session=async_session, after_id=tweet_id - 1, batch_size=1) == tweet_id
+    assert await async_session.scalar(select(Tweet.score).where(Tweet.id == tweet_id)) > score
+    assert feed_cache.version > version
+    version = feed_cache.version
+    assert await refresh_popularity(session=async_session, after_id=tweet_id - 1, batch_size=1) == tweet_id
+    assert feed_cache.version == version
+    await delete_follower_by_id(idx=2, user_id=3, session=async_session)
+    assert await refresh_popularity(session=async_session, after_id=tweet_id - 1, batch_size=1) == tweet_id
+    assert await async_session.scalar(select(Tweet.score).where(Tweet.id == tweet_id)) == score
+    assert await refresh_popularity(session=async_session, after_id=tweet_id, batch_size=1) is None
+
+    await delete_tweet_by_id(idx=tweet_id, user_id=2, session=async_session)
+
+
+async def test_create_tweet_with_medias(async_session: AsyncSession, statements):
+    own_ids = [
+        await save_image_path(file_name='own.png', user_id=2, session=async_session)
+        for _ in range(3)
+    ]
+    other_id = await save_image_path(file_name='other.png', user_id=3, session=async_session)
+    tweets_count = await async_session.scalar(select(func.count()).select_from(Tweet))
+
+    with pytest.raises(HTTPException) as exc:
+        await create_tweet(
+            tweet={'tweet_data': 'medias', 'tweet_media_ids': [own_ids[0], other_id, 999]},
+            user_id=2,
+            session=async_session,
+        )
+    assert exc.value.status_code == 404
+    assert exc.value.detail == 'Media not found: {other_id}, 999'.format(other_id=other_id)
+    assert await async_session.scalar(select(func.count()).select_from(Tweet)) == tweets_count
+    assert await async_session.scalar(select(Media.tweet_id).where(Media.id == own_ids[0])) is None
+
+    statements.clear()
+    tweet_id = await create_tweet(
+        tweet={'tweet_data': 'medias', 'tweet_media_ids': own_ids},
+        user_id=2,
+        session=async_session,
+    )
+    assert len([query for query in statements if query.startswith('UPDATE media')]) == 1
+    attached = await async_session.scalars(select(Media.id).where(Media.tweet_id == tweet_id))
+    assert sorted(attached) == own_ids
+
+    with pytest.raises(HTTPException):
+        await create_tweet(
+            tweet={'tweet_data': 'medias', 'tweet_media_ids': own_ids[:1]},
+            user_id=2,
+            session=async_session,
+        )
+
+    await async_session.execute(delete(Media).where(Media.id.in_(own_ids + [other_id])))
+    await async_session.commit()
+    await delete_tweet_by_id(idx=tweet_id, user_id=2, session=async_session)
+
+
+async def test_create_tweets(async_session: AsyncSession, statements):
+    await add_follower_by_id(idx=2, user_id=3, session=async_session)
+    media_ids = [
+        await save_image_path(file_name='batch.png', user_id=2, session=async_session)
+        for _ in range(2)
+    ]
+
+    statements.clear()
+    results = await create_tweets(
+        tweets=[
+            {'tweet_data': 'first', 'tweet_media_ids': media_ids},
+            {'tweet_data': 'rejected', 'tweet_media_ids': [media_ids[0]]},
+            {'tweet_data': 'second', 'tweet_media_ids': None},
+            {'tweet_data': 'third', 'tweet_media_ids': []},
+        ],
+        user_id=2,
+        session=async_session,
+    )
+    assert len([query for query in statements if query.startswith('INSERT INTO tweet')]) == 1
+    assert [result['status'] for result in results] == [
+        'created', 'media_not_found', 'created', 'created',
+    ]
+    tweet_ids = [result['tweet_id'] for result in results if result['tweet_id']]
+    contents = dict(list(await async_session.execute(
+        select(Tweet.id, Tweet.tweet_data).where(Tweet.id.in_(tweet_ids)),
+    )))
+    assert [contents[tweet_id] for tweet_id in tweet_ids] == ['first', 'second', 'third']
+    attached = await async_session.scalars(select(Media.id).where(Media.tweet_id == tweet_ids[0]))
+    assert sorted(attached) == media_ids
+    follower_timeline = await get_user_timeline(user_id=3, session=async_session)
+    assert [tweet['id'] for tweet in follower_timeline['tweets']] == tweet_ids[::-1]
+
+    await async_session.execute(delete(Media).where(Media.id.in_(media_ids)))
+    await async_session.commit()
+    for tweet_id in tweet_ids:
+        await delete_tweet_by_id(idx=tweet_id, user_id=2, session=async_session)
+    await delete_follower_by_id(idx=2, user_id=3, session=async_session)
+
+
+async def test_like_buffer(async_session: AsyncSession, monkeypatch):
+    buffer = LikeBuffer(max_events=3)
+    monkeypatch.setattr(crud, 'like_buffer', buffer)
+    monkeypatch.setattr(crud.settings, 'like_buffer_enabled', True)
+    tweet_id = await create_tweet(
+        tweet={'tweet_data': 'buffered', 'tweet_media_ids': []},
+        user_id=2,
+        session=async_session,
+    )
+
+    await add_new_like(tweet_id=tweet_id, user_id=1, session=async_session)
+    await add_new_like(tweet_id=tweet_id, user_id=3, session=async_session)
+    await delete_like(tweet_id=tweet_id, user_id=3, session=async_session)
+    buffer.add(tweet_id=tweet_id, user_id=2, liked=True)
+    assert buffer.pending == {(tweet_id, 1): True, (tweet_id, 3): False, (tweet_id, 2): True}
+    assert buffer._full.is_set()
+    likes = await async_session.execute(likes_table.select().where(likes_table.c.tweet_id == tweet_id))
+    assert likes.all() == []
+
+    assert await buffer.flush(session=async_session) == 3
+    assert buffer.pending == {}
+    likes = await async_session.scalars(
+        select(likes_table.c.user_id).where(likes_table.c.tweet_id == tweet_id),
+    )
+    assert list(likes) == [1]
+    tweet = (await async_session.execute(
+        select(Tweet.like_count, Tweet.score_dirty).where(Tweet.id == tweet_id),
+    )).one()
+    assert tweet.like_count == 1
+    assert tweet.score_dirty
+
+    await delete_like(tweet_id=tweet_id, user_id=1, session=async_session)
+    await delete_tweet_by_id(idx=tweet_id, user_id=2, session=async_session)
+    assert await buffer.flush(session=async_session) == 1
+    assert buffer.pending == {}
+
+    class FailingSession:
+        async def execute(self, query):
+            buffer.add(tweet_id=tweet_id, user_id=1, liked=True)
+            raise ConnectionError
+
+    buffer.add(tweet_id=tweet_id, user_id=1, liked=False)
+    buffer.add(tweet_id=tweet_id, user_id=3, liked=True)
+    with pytest.raises(ConnectionError):
+        await buffer.flush(session=FailingSession())
+    assert buffer.pending == {(tweet_id, 1): True, (tweet_id, 3): True}
+    buffer.pending.clear()
+
+
+async def test_delete_queued_medias(async_session: AsyncSession, monkeypatch):
+    deleted_paths = []
+
+    async def fake_delete_media(media_path):
+        if media_path == 'media/locked.png':
+            raise PermissionError(media_path)
+        deleted_paths.append(media_path)
+
+    monkeypatch.setattr(media_cleanup, 'delete_media', fake_delete_media)
+    media_ids = [
+        await save_image_path(file_name=file_name, user_id=2, session=async_session)
+        for file_name in ('removed.png', 'locked.png')
+    ]
+    tweet_id = await create_tweet(
+        tweet={'tweet_data': 'cleanup', 'tweet_media_ids': media_ids},
+        user_id=2,
+        session=async_session,
+    )
+    await delete_tweet_by_id(idx=tweet_id, user_id=2, session=async_session)
+    assert deleted_paths == []
+    queued = await async_session.scalars(select(media_deletion.c.media_path).order_by(media_deletion.c.id))
+    assert sorted(queued) == ['media/locked.png', 'media/removed.png']
+
+    assert await media_cleanup.delete_queued_medias(session=async_session, batch_size=10) == 2
+    assert deleted_paths == ['media/removed.png']
+    retry = (await async_session.execute(select(media_deletion))).one()
+    assert retry.media_path == 'media/locked.png'
+    assert retry.attempts == 1
+    assert await media_cleanup.delete_queued_medias(session=async_session, batch_size=10) == 0
+
+    monkeypatch.setattr(media_cleanup.settings, 'media_cleanup_max_attempts', 2)
+    await async_session.execute(update(media_deletion).values(next_attempt_at=func.now()))
+    await async_session.commit()
+    assert await media_cleanup.delete_queued_medias(session=async_session, batch_size=10) == 1
+    assert list(await async_session.execute(select(media_deletion))) == []